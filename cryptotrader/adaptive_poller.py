@@ -0,0 +1,191 @@
+'''
+Polls REST endpoints more often where the market is moving.
+
+The REST pipelines used to each poll on a fixed interval, so a quiet market
+cost as many requests as a busy one and a busy one was only seen every 15
+seconds. An AdaptivePoller keeps every market's next poll in one heap and
+changes each market's interval after every poll: it is shortened when what
+the poll returned changed (e.g. the top of the book) and lengthened when it
+did not. A market whose strategy is close to acting can be marked urgent to
+be polled as often as allowed. All polls share one request budget, a token
+bucket, so the exchange's rate limit is never exceeded however many markets
+are busy at once; when there are not enough requests to go around the
+markets that have waited longest go first.
+
+@author: Tobias Carryer
+'''
+
+import heapq
+import itertools
+from threading import Condition, Thread
+from cryptotrader.helper_methods import monotonic
+
+class PollJob(object):
+    ''' One endpoint polled by an AdaptivePoller. Returned by AdaptivePoller.add() '''
+
+    def __init__(self, poll, name, interval, min_interval, max_interval, is_urgent):
+        self.poll = poll
+        self.name = name
+        self.interval = interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.is_urgent = is_urgent
+        self.fingerprint = None
+        self.polls = 0
+        self.changes = 0
+        self.removed = False
+
+class AdaptivePoller(object):
+
+    def __init__(self, requests_per_second=1.0, burst=5, speed_up=0.5, slow_down=1.5,
+                 min_interval=1, max_interval=60, name="AdaptivePoller"):
+        '''
+        requests_per_second is the budget every poll shares. burst is how many requests can be
+            made at once after a quiet spell.
+        An interval is multiplied by speed_up after a poll that saw a change and by slow_down
+            after one that did not, staying between a job's min_interval and max_interval.
+        min_interval and max_interval are the defaults for jobs that do not give their own.
+        '''
+
+        self.requests_per_second = float(requests_per_second)
+        self.burst = burst
+        self.speed_up = speed_up
+        self.slow_down = slow_down
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.name = name
+
+        self._tokens = float(burst)
+        self._refilled = monotonic()
+
+        self._jobs = [] # heap of (due, order, job)
+        self._order = itertools.count()
+        self._condition = Condition()
+        self._thread = None
+        self._stop = False
+
+    def add(self, poll, interval=15, min_interval=None, max_interval=None, is_urgent=None, name=None):
+        '''
+        poll() makes one request, hands the result to whoever needs it and returns a fingerprint
+            of it, e.g. (highest bid, lowest ask). The interval shrinks when the fingerprint
+            changes between polls.
+        interval is how many seconds apart the first polls are.
+        is_urgent() returns True when the job should be polled every min_interval seconds.
+        Returns: The PollJob, to give to remove(). The first poll is due straight away.
+        '''
+
+        job = PollJob(poll, name or getattr(poll, "__name__", "poll"), interval,
+                      self.min_interval if min_interval is None else min_interval,
+                      self.max_interval if max_interval is None else max_interval,
+                      is_urgent)
+        job.interval = self._bounded(job, interval)
+        with self._condition:
+            heapq.heappush(self._jobs, (monotonic(), next(self._order), job))
+            self._condition.notify()
+        return job
+
+    def remove(self, job):
+        ''' Post: job is not polled again. '''
+        with self._condition:
+            job.removed = True
+            self._condition.notify()
+
+    def __len__(self):
+        return len([entry for entry in self._jobs if not entry[2].removed])
+
+    def _bounded(self, job, interval):
+        return max(job.min_interval, min(job.max_interval, interval))
+
+    def next_interval(self, job, changed):
+        '''
+        Returns: How many seconds to wait before polling job again.
+        '''
+
+        if job.is_urgent is not None:
+            try:
+                if job.is_urgent():
+                    return job.min_interval
+            except Exception as e:
+                print(self.name + ": " + job.name + "'s is_urgent failed: " + str(e))
+        return self._bounded(job, job.interval * (self.speed_up if changed else self.slow_down))
+
+    def _take_token(self):
+        '''
+        Pre: self._condition is held
+        Returns: 0 if a request can be made now, otherwise how many seconds until one can.
+        '''
+
+        now = monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.requests_per_second)
+        self._refilled = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0
+        return (1 - self._tokens) / self.requests_per_second
+
+    def _next_job(self):
+        '''
+        Returns: The job that is due and has a request from the budget, None once stop() is called.
+        '''
+
+        with self._condition:
+            while not self._stop:
+                while self._jobs and self._jobs[0][2].removed:
+                    heapq.heappop(self._jobs)
+                if not self._jobs:
+                    self._condition.wait(1)
+                    continue
+                wait = self._jobs[0][0] - monotonic()
+                if wait <= 0:
+                    wait = self._take_token()
+                    if wait == 0:
+                        return heapq.heappop(self._jobs)[2]
+                self._condition.wait(wait)
+        return None
+
+    def run_job(self, job):
+        '''
+        Post: job was polled once and is scheduled again.
+        '''
+
+        changed = False
+        try:
+            fingerprint = job.poll()
+            job.polls += 1
+            changed = job.polls > 1 and fingerprint != job.fingerprint
+            job.fingerprint = fingerprint
+        except Exception as e:
+            # Keep polling. A failing endpoint is backed off like a quiet one.
+            print(self.name + ": " + job.name + " failed: " + str(e))
+        if changed:
+            job.changes += 1
+        job.interval = self.next_interval(job, changed)
+
+        with self._condition:
+            if not job.removed:
+                heapq.heappush(self._jobs, (monotonic() + job.interval, next(self._order), job))
+
+    def start(self):
+        '''
+        Post: Jobs are polled when they are due in a background thread until stop().
+        '''
+
+        def _go():
+            while True:
+                job = self._next_job()
+                if job is None:
+                    break
+                self.run_job(job)
+            print("Stopping " + self.name + ".")
+
+        if self._thread is not None:
+            return
+        self._stop = False
+        self._thread = Thread(target=_go, name=self.name)
+        self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._stop = True
+            self._condition.notify()
+        self._thread = None
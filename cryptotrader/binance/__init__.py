@@ -1 +1,2 @@
-from cryptotrader.binance.binance_pipeline import BinancePipeline
\ No newline at end of file
+from cryptotrader.binance.binance_pipeline import BinancePipeline
+from cryptotrader.binance.binance_stream import BinanceStream, LocalDepth
\ No newline at end of file
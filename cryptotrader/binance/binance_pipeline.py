@@ -4,91 +4,65 @@ Loads data from Binance.
 @author: Tobias Carryer
 '''
 
-import time
-from threading import Thread
 import requests
+from cryptotrader import clock_sync
+from cryptotrader.binance.binance_stream import BinanceStream
    
 class BinancePipeline(object):
-    def __init__(self, on_market_summary, market, poll_time=15):
+    def __init__(self, on_market_summary, market, stream=None, multiplexer=None):
         '''
-        Pre: poll_time is a positive integer
-             on_market_summary has 2 parameters: the highest bid and the lowest ask
-        Post: on_market_summary is called every [poll_time] seconds for every market that has
-              [minor_currency] as the minor currency.
-        '''
-        
-        self.on_market_summary = on_market_summary
-        self.poll_time = poll_time
-        self._time_started = 0
-        self.market = market
+        on_market_summary has 2 parameters: the highest bid and the lowest ask. They are
+        strings, the way Binance sends them.
         
-        self.stop = False
-        self.thread = None
+        stream is a BinanceStream to share with other pipelines so every market is followed
+        over one connection. The pipeline opens its own if it is None. A shared stream is
+        started and stopped by its owner, not the pipeline.
         
-        self.get_average_latency()
+        multiplexer is a started WebSocketMultiplexer to read the pipeline's own stream from.
         
-    def start(self):
-        def _go():
-            last_time = 0
-            while True:
-                if self._stop:
-                    print "Stopping Binance pipeline."
-                    break
-                elif time.time() - last_time >= self.poll_time:
-                    last_time = time.time()
-                    orderbook = self.get_orderbook(self.market)
-                    bids = orderbook["bids"]
-                    asks = orderbook["asks"]
-                    self.on_market_summary(bids[0][0], asks[0][0])
-
-        self.thread = Thread(target=_go)
-        self._stop = False
-        self.thread.start()
-            
-        print("Started Binance pipeline for market: " + self.market)
-        
-    def get_average_latency(self):
+        Post: on_market_summary is called every time the highest bid or the lowest ask of market
+              changes, as soon as Binance sends it.
         '''
-        Based on the algorithm by Zachary Booth Simpson (2000)
-        http://www.mine-control.com/zack/timesync/timesync.html
         
-        Latency is measured in milliseconds.
-        '''
+        self.on_market_summary = on_market_summary
+        self.market = market.upper()
+        self._last_summary = None
         
-        print("Calculating the average latency to Binance.")
+        self.owns_stream = stream is None
+        if stream is None:
+            stream = BinanceStream(multiplexer=multiplexer)
+        self.stream = stream
+        self.stream.subscribe(self.market, on_book_ticker=self._on_book_ticker)
         
-        client_times = []
-        server_times = []
-            
-        # Exclude the first ping. It is abnormally long for some reason.
-        requests.get("https://api.binance.com/api/v1/time")
+        # Measures the difference between Binance's clock and ours in the background.
+        self.clock = clock_sync.clock_for("binance")
         
-        i = 0
-        while i < 8: # Arbitrary, but change averages below if this is changed
-            client_times.append(round(time.time()*1000)) # seconds to milliseconds
-            server_times.append(requests.get("https://api.binance.com/api/v1/time").json()["serverTime"])
-            i += 1
+    def start(self):
+        if self.owns_stream:
+            self.stream.start()
+        print("Started Binance pipeline for market: " + self.market)
         
-        # Divide by two because the latency exists when the package is being sent there AND back
-        average_server_time = sum(server_times) / 8.0
-        average_client_time = sum(client_times) / 8.0
-        time_dif = average_server_time - average_client_time
-        self.latency_between_server_and_client = int(round(time_dif / 2.0))
+    def _on_book_ticker(self, symbol, ticker):
+        summary = (ticker["b"], ticker["a"])
+        # bookTicker also changes with the quantities at the best prices.
+        if summary != self._last_summary:
+            self._last_summary = summary
+            self.on_market_summary(*summary)
         
     def get_timestamp(self):
         '''
-        Accounts for the difference between the client and the server time.
+        Returns: Binance's time in milliseconds, corrected for the difference between the
+                 client and the server clock. See cryptotrader.clock_sync
         '''
-        client_time = int(round(time.time() * 1000))
-        return client_time + self.latency_between_server_and_client
+        return self.clock.timestamp_ms()
         
     def get_orderbook(self, market):
         params = [("symbol", market)]
         return requests.get("https://api.binance.com/api/v1/depth", params=params).json()
 
     def stop(self):
-        if not self.stop:
-            self.stop = True
+        if self.owns_stream:
+            self.stream.stop()
 
 if __name__ == "__main__":
 
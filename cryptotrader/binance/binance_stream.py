@@ -0,0 +1,253 @@
+'''
+Streams Binance's books and trades over one websocket.
+
+A BinanceStream subscribes to the combined streams of any number of symbols:
+bookTicker for every change to the best bid and ask, depth@100ms for the diffs
+that keep a local order book, and aggTrade for trades. Every message names its
+stream, so it is routed with one dictionary lookup. Local books are started
+from a REST snapshot fetched in the background and the diffs received in the
+meantime, the way Binance documents it, and start over when a diff is missed.
+
+@author: Tobias Carryer
+'''
+
+import json
+from threading import Lock, Thread
+import requests
+from cryptotrader.streaming import ManagedWebSocket
+from cryptotrader.latency import tick_trace
+
+URL = "wss://stream.binance.com:9443/stream"
+
+BOOK_TICKER = "bookTicker"
+DEPTH = "depth@100ms"
+AGG_TRADE = "aggTrade"
+
+# How many levels the snapshot a local book starts from has.
+SNAPSHOT_LIMIT = 1000
+
+# Binance closes connections after 24 hours.
+ROTATE_AFTER = 12 * 60 * 60
+
+def stream_name(symbol, kind):
+    ''' Returns: The name of a stream, e.g. ("ETHBTC", "bookTicker") -> "ethbtc@bookTicker" '''
+    return symbol.lower() + "@" + kind
+
+def get_depth_snapshot(symbol, limit=SNAPSHOT_LIMIT):
+    params = [("symbol", symbol.upper()), ("limit", limit)]
+    return requests.get("https://api.binance.com/api/v1/depth", params=params).json()
+
+class LocalDepth(object):
+    '''
+    An order book kept from Binance's depth diffs. Prices and quantities are floats.
+    '''
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.bids = {} # price -> quantity
+        self.asks = {} # price -> quantity
+        self.last_update_id = None # None until the snapshot has been applied
+
+    def is_synced(self):
+        return self.last_update_id is not None
+
+    def apply_snapshot(self, snapshot):
+        self.bids = dict((float(price), float(quantity)) for price, quantity in snapshot["bids"])
+        self.asks = dict((float(price), float(quantity)) for price, quantity in snapshot["asks"])
+        self.last_update_id = snapshot["lastUpdateId"]
+
+    def apply_diff(self, diff):
+        '''
+        Returns: False if diff does not follow the last one applied and the book has to be
+                 fetched again, True otherwise.
+        '''
+
+        if diff["u"] <= self.last_update_id:
+            return True # Already in the book.
+        if diff["U"] > self.last_update_id + 1:
+            return False
+        for side, levels in ((self.bids, diff["b"]), (self.asks, diff["a"])):
+            for price, quantity in levels:
+                quantity = float(quantity)
+                if quantity == 0:
+                    side.pop(float(price), None)
+                else:
+                    side[float(price)] = quantity
+        self.last_update_id = diff["u"]
+        return True
+
+    def top_bids(self, levels=None):
+        ''' Returns: [(price, quantity), ..] highest price first. '''
+        return sorted(self.bids.items(), reverse=True)[:levels]
+
+    def top_asks(self, levels=None):
+        ''' Returns: [(price, quantity), ..] lowest price first. '''
+        return sorted(self.asks.items())[:levels]
+
+    def best_bid(self):
+        return max(self.bids) if self.bids else None
+
+    def best_ask(self):
+        return min(self.asks) if self.asks else None
+
+class BinanceStream(object):
+
+    def __init__(self, on_book_ticker=None, on_depth=None, on_trade=None, multiplexer=None):
+        '''
+        on_book_ticker(symbol, ticker) is called every time the best bid or ask of a symbol
+            changes with Binance's message, e.g. {"u": 400900217, "s": "BNBUSDT",
+            "b": "25.35190000", "B": "31.21000000", "a": "25.36520000", "A": "40.66000000"}
+        on_depth(symbol, book) is called with the LocalDepth after every diff once the book is synced.
+        on_trade(symbol, trade) is called with every aggregated trade message.
+        multiplexer is a started WebSocketMultiplexer to read the connection from.
+
+        Binance allows 1024 streams on one connection.
+        '''
+
+        self.on_book_ticker = on_book_ticker
+        self.on_depth = on_depth
+        self.on_trade = on_trade
+
+        self.books = {} # symbol -> LocalDepth
+        self.resyncs = 0
+
+        self._streams = {} # stream name -> (symbol, kind)
+        self._book_ticker_listeners = {} # symbol -> [on_book_ticker, ..]
+        self._pending_diffs = {} # symbol -> diffs received while its snapshot is fetched
+        self._lock = Lock()
+        self._request_id = 0
+
+        self.ws = ManagedWebSocket(URL, self._on_message, self._subscribe_all,
+                                   sequence_of=self._sequence_of, name="BinanceStream",
+                                   rotate_after=ROTATE_AFTER,
+                                   # The feed is trusted so its text is not checked for valid UTF-8.
+                                   connection_options={"skip_utf8_validation": True},
+                                   multiplexer=multiplexer)
+
+    def subscribe(self, symbol, book_ticker=True, depth=False, trades=False, on_book_ticker=None):
+        '''
+        symbol is in Binance's format, e.g. "ETHBTC"
+        on_book_ticker(symbol, ticker) is called for this symbol only, as well as self.on_book_ticker.
+        '''
+
+        symbol = symbol.upper()
+        kinds = [kind for kind, wanted in ((BOOK_TICKER, book_ticker), (DEPTH, depth), (AGG_TRADE, trades)) if wanted]
+        with self._lock:
+            if on_book_ticker is not None:
+                self._book_ticker_listeners.setdefault(symbol, []).append(on_book_ticker)
+            if depth and symbol not in self.books:
+                self.books[symbol] = LocalDepth(symbol)
+            names = []
+            for kind in kinds:
+                name = stream_name(symbol, kind)
+                if name not in self._streams:
+                    self._streams[name] = (symbol, kind)
+                    names.append(name)
+        if names:
+            try:
+                self.ws.send(self._subscribe_request(names))
+            except Warning:
+                pass # Not connected yet. Every stream is subscribed to once it is.
+
+    def _subscribe_request(self, names):
+        with self._lock:
+            self._request_id += 1
+            return json.dumps({"method": "SUBSCRIBE", "params": names, "id": self._request_id})
+
+    def _subscribe_all(self, ws):
+        ''' Called by the ManagedWebSocket on every new connection. '''
+
+        with self._lock:
+            names = sorted(self._streams)
+        if names:
+            ws.send(self._subscribe_request(names))
+        else:
+            # Binance sends nothing until something is subscribed to.
+            ws.send(json.dumps({"method": "LIST_SUBSCRIPTIONS", "id": 0}))
+
+    def start(self):
+        self.ws.start()
+        print("Started Binance stream. Uses Binance's websocket API.")
+
+    def stop(self):
+        self.ws.stop()
+
+    def _sequence_of(self, msg):
+        # Both connections send the same numbered messages while the websocket is replaced.
+        data = msg.get("data")
+        if data is None:
+            return None
+        number = data.get("u", data.get("a"))
+        return None if number is None else (msg["stream"], number)
+
+    def _on_message(self, msg):
+        route = self._streams.get(msg.get("stream"))
+        if route is None:
+            return # Replies to subscription requests.
+        symbol, kind = route
+        data = msg["data"]
+        tick_trace.tracer.received("binance")
+
+        if kind == BOOK_TICKER:
+            if self.on_book_ticker is not None:
+                self.on_book_ticker(symbol, data)
+            for on_book_ticker in self._book_ticker_listeners.get(symbol, ()):
+                on_book_ticker(symbol, data)
+        elif kind == DEPTH:
+            self._on_diff(symbol, data)
+        elif kind == AGG_TRADE:
+            if self.on_trade is not None:
+                self.on_trade(symbol, data)
+
+    def _on_diff(self, symbol, diff):
+        with self._lock:
+            book = self.books[symbol]
+            if not book.is_synced():
+                self._buffer(symbol, diff)
+                return
+            if not book.apply_diff(diff):
+                # A diff was missed. Start the book over.
+                self.resyncs += 1
+                book.last_update_id = None
+                self._buffer(symbol, diff)
+                return
+        if self.on_depth is not None:
+            self.on_depth(symbol, book)
+
+    def _buffer(self, symbol, diff):
+        '''
+        Pre: self._lock is held
+        Post: diff is applied once the snapshot of symbol's book is fetched.
+        '''
+
+        pending = self._pending_diffs.get(symbol)
+        if pending is not None:
+            pending.append(diff)
+            return
+        self._pending_diffs[symbol] = [diff]
+        # The snapshot is slow to fetch, the other streams keep being read meanwhile.
+        thread = Thread(target=self._sync, args=(symbol,), name="BinanceStream " + symbol + " snapshot")
+        thread.daemon = True
+        thread.start()
+
+    def _sync(self, symbol):
+        try:
+            snapshot = get_depth_snapshot(symbol)
+        except Exception as e:
+            print("BinanceStream: Could not fetch the " + symbol + " book (" + str(e) + "). Retrying on the next diff.")
+            with self._lock:
+                self._pending_diffs.pop(symbol, None)
+            return
+
+        with self._lock:
+            book = self.books[symbol]
+            book.apply_snapshot(snapshot)
+            pending = self._pending_diffs.pop(symbol, [])
+            for i, diff in enumerate(pending):
+                if not book.apply_diff(diff):
+                    # The snapshot is older than the first diff buffered after it.
+                    book.last_update_id = None
+                    for diff in pending[i:]:
+                        self._buffer(symbol, diff)
+                    return
+        print("BinanceStream: Synced the " + symbol + " book.")
@@ -1,2 +1,3 @@
+from bitfinex_client import BitfinexClient, LocalBook
 from bitfinex_pipeline import BitfinexPipeline
 from bitfinex_trader import BitfinexTrader
\ No newline at end of file
@@ -0,0 +1,331 @@
+'''
+Follows many Bitfinex pairs over one websocket.
+
+A BitfinexClient subscribes to the ticker, trades and order book channels of
+any number of pairs with Bitfinex's version 2 websocket API. Bitfinex numbers
+each subscription with a chanId, so messages are routed with one dictionary
+lookup. Order books are kept locally from the snapshot and updates, and are
+checked against the checksum Bitfinex sends. A book that does not match is
+subscribed to again.
+
+Bitfinex does not number its messages the same way on two connections, so
+while the websocket is replaced the new connection's trades and book messages
+are held back instead of being matched by sequence. When the new connection
+takes over they are replayed: its book snapshot replaces the old book with the
+updates received since, and trades are delivered once by their ID.
+
+@author: Tobias Carryer
+'''
+
+import json
+import zlib
+from decimal import Decimal
+from threading import Lock
+from cryptotrader.streaming import ManagedWebSocket
+from cryptotrader.latency import tick_trace
+
+URL = "wss://api.bitfinex.com/ws/2"
+
+TICKER = "ticker"
+TRADES = "trades"
+BOOK = "book"
+
+# Asks Bitfinex to send a checksum of the top of every book after each update.
+_CHECKSUM_FLAG = 131072
+
+# How many levels of each side go into a book's checksum.
+_CHECKSUM_LEVELS = 25
+
+def symbol_for(market_ticker):
+    ''' Returns: The Bitfinex symbol of a trading pair, e.g. "ETHBTC" -> "tETHBTC" '''
+    return "t" + market_ticker.upper()
+
+def _checksum_number(number):
+    # Bitfinex computes the checksum from the numbers as JavaScript prints them,
+    # which never uses an exponent for the prices and amounts on the exchange.
+    if number == int(number):
+        return str(int(number))
+    text = repr(number)
+    if "e" in text:
+        text = format(Decimal(text), "f")
+    return text
+
+class LocalBook(object):
+    '''
+    An order book kept from Bitfinex's book channel. Levels are [price, count, amount],
+    amount is negative for asks.
+    '''
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.bids = {} # price -> amount
+        self.asks = {} # price -> amount (negative)
+
+    def apply_snapshot(self, levels):
+        self.bids = {}
+        self.asks = {}
+        for level in levels:
+            self.apply(level)
+
+    def apply(self, level):
+        price, count, amount = level
+        side = self.bids if amount > 0 else self.asks
+        if count == 0:
+            side.pop(price, None)
+        else:
+            side[price] = amount
+
+    def top_bids(self, levels=None):
+        ''' Returns: [(price, amount), ..] highest price first. '''
+        return sorted(self.bids.items(), reverse=True)[:levels]
+
+    def top_asks(self, levels=None):
+        ''' Returns: [(price, amount), ..] lowest price first. amount is negative. '''
+        return sorted(self.asks.items())[:levels]
+
+    def best_bid(self):
+        return max(self.bids) if self.bids else None
+
+    def best_ask(self):
+        return min(self.asks) if self.asks else None
+
+    def checksum(self):
+        ''' Returns: The signed CRC32 Bitfinex sends for the book. '''
+
+        bids = self.top_bids(_CHECKSUM_LEVELS)
+        asks = self.top_asks(_CHECKSUM_LEVELS)
+        values = []
+        for i in range(_CHECKSUM_LEVELS):
+            for side in (bids, asks):
+                if i < len(side):
+                    values.append(_checksum_number(side[i][0]))
+                    values.append(_checksum_number(side[i][1]))
+        crc = zlib.crc32(":".join(values).encode("ascii")) & 0xffffffff
+        return crc - (1 << 32) if crc >= (1 << 31) else crc
+
+class BitfinexClient(object):
+
+    def __init__(self, on_ticker=None, on_trade=None, on_book=None, verify_checksums=True,
+                 rotate_after=None, multiplexer=None):
+        '''
+        on_ticker(symbol, ticker) is called with Bitfinex's ticker array:
+            [BID, BID_SIZE, ASK, ASK_SIZE, DAILY_CHANGE, DAILY_CHANGE_PERC, LAST_PRICE, VOLUME, HIGH, LOW]
+            and with ticker None on the channel's heartbeats, which Bitfinex sends when the
+            ticker has not changed.
+        on_trade(symbol, trade) is called with every executed trade: [ID, MTS, AMOUNT, PRICE]
+        on_book(symbol, book) is called with the LocalBook after every book update.
+        verify_checksums asks Bitfinex for book checksums and resubscribes books that do not match.
+        rotate_after is how many seconds the connection is used before it is replaced.
+            Bitfinex does not close quiet connections so it is only replaced when it fails by default.
+        multiplexer is a started WebSocketMultiplexer to read the connection from.
+        '''
+
+        self.on_ticker = on_ticker
+        self.on_trade = on_trade
+        self.on_book = on_book
+        self.verify_checksums = verify_checksums
+
+        self.books = {} # symbol -> LocalBook
+        self.checksum_failures = 0
+        self._last_trade_ids = {} # symbol -> ID of the last trade delivered
+
+        # (channel, symbol) -> the subscribe request, resent on every new connection.
+        self._subscriptions = {}
+        # ws -> {chanId -> (channel, symbol)}. chanIds belong to the connection they were
+        # given on, and the old and new connections are both open while it is replaced.
+        self._channels = {}
+        # symbol -> [on_ticker, ..] given to subscribe_ticker()
+        self._ticker_listeners = {}
+        # The connection replacing the current one and the trades and book messages it
+        # received before taking over: [(channel, symbol, message), ..]
+        self._replacement = None
+        self._held = []
+        self._lock = Lock()
+
+        self.ws = ManagedWebSocket(URL, self._on_message, self._subscribe_all, name="BitfinexClient",
+                                   rotate_after=rotate_after,
+                                   # The feed is trusted so its text is not checked for valid UTF-8,
+                                   # and asking for compression shrinks the book snapshots.
+                                   connection_options={"enable_compression": True,
+                                                       "skip_utf8_validation": True},
+                                   multiplexer=multiplexer, on_control=self._on_control)
+
+    def subscribe_ticker(self, symbol, on_ticker=None):
+        '''
+        on_ticker(symbol, ticker) is called for this symbol only, as well as self.on_ticker.
+        '''
+
+        if on_ticker is not None:
+            with self._lock:
+                self._ticker_listeners.setdefault(symbol, []).append(on_ticker)
+        self._subscribe({"event": "subscribe", "channel": TICKER, "symbol": symbol})
+
+    def subscribe_trades(self, symbol):
+        self._subscribe({"event": "subscribe", "channel": TRADES, "symbol": symbol})
+
+    def subscribe_book(self, symbol, precision="P0", length=25, frequency="F0"):
+        '''
+        precision is P0 (most precise) to P4 (least precise). length is 1, 25 or 100 levels.
+        frequency is F0 for real time or F1 for every 2 seconds.
+        '''
+
+        self._subscribe({"event": "subscribe", "channel": BOOK, "symbol": symbol,
+                         "prec": precision, "len": str(length), "freq": frequency})
+
+    def _subscribe(self, request):
+        with self._lock:
+            self._subscriptions[(request["channel"], request["symbol"])] = request
+        try:
+            self.ws.send(json.dumps(request))
+        except Warning:
+            pass # Not connected yet. Every subscription is sent once it is.
+
+    def _subscribe_all(self, ws):
+        ''' Called by the ManagedWebSocket on every new connection. '''
+
+        with self._lock:
+            # Only the connection being replaced, if any, is still worth routing for.
+            current = self.ws.current_ws()
+            channels = {ws: {}}
+            if current is not None and current is not ws and current in self._channels:
+                channels[current] = self._channels[current]
+            self._channels = channels
+            self._replacement = ws if current is not ws else None
+            self._held = []
+            requests = list(self._subscriptions.values())
+        if self.verify_checksums:
+            ws.send(json.dumps({"event": "conf", "flags": _CHECKSUM_FLAG}))
+        for request in requests:
+            ws.send(json.dumps(request))
+
+    def start(self):
+        self.ws.start()
+        print("Started Bitfinex client. Uses Bitfinex's version 2 websocket API.")
+
+    def stop(self):
+        self.ws.stop()
+
+    def _on_control(self, ws, msg):
+        '''
+        Called with the events of every connection, including one that is not current yet.
+        '''
+
+        if isinstance(msg, dict):
+            self._on_event(ws, msg)
+            return True
+        if ws is self._replacement and ws is not self.ws.current_ws():
+            self._hold(ws, msg)
+            return True
+        return False
+
+    def _hold(self, ws, msg):
+        '''
+        Post: msg is delivered when ws takes over if it is a trade or book message.
+              Tickers and checksums only matter from the current connection.
+        '''
+
+        route = self._channels.get(ws, {}).get(msg[0])
+        if route is None or msg[1] in ("hb", "cs"):
+            return
+        channel, symbol = route
+        if channel in (TRADES, BOOK):
+            self._held.append((channel, symbol, msg))
+
+    def _take_over(self):
+        '''
+        Post: The messages held back from the replacement are delivered. Its book snapshots
+              replace the books kept from the old connection.
+        '''
+
+        held = self._held
+        self._replacement = None
+        self._held = []
+        for channel, symbol, msg in held:
+            if channel == TRADES:
+                self._on_trades(symbol, msg)
+            else:
+                self._on_book(symbol, msg[1])
+
+    def _on_message(self, msg):
+        current = self.ws.current_ws()
+        if current is not None and current is self._replacement:
+            self._take_over()
+        route = self._channels.get(current, {}).get(msg[0])
+        if route is None:
+            return # From a channel that was unsubscribed.
+        channel, symbol = route
+        tick_trace.tracer.received("bitfinex")
+
+        if msg[1] == "cs":
+            self._verify(msg[0], symbol, msg[2])
+        elif channel == TICKER:
+            self._on_ticker(symbol, None if msg[1] == "hb" else msg[1])
+        elif msg[1] == "hb":
+            pass
+        elif channel == TRADES:
+            self._on_trades(symbol, msg)
+        elif channel == BOOK:
+            self._on_book(symbol, msg[1])
+
+    def _on_event(self, ws, msg):
+        event = msg.get("event")
+        if event == "subscribed":
+            with self._lock:
+                self._channels.setdefault(ws, {})[msg["chanId"]] = (msg["channel"], msg["symbol"])
+            if msg["channel"] == BOOK and msg["symbol"] not in self.books:
+                # The snapshot that follows replaces the book's levels.
+                self.books[msg["symbol"]] = LocalBook(msg["symbol"])
+        elif event == "error":
+            print("Bitfinex error: " + str(msg.get("msg")) + " (" + str(msg.get("code")) + ")")
+
+    def _on_ticker(self, symbol, ticker):
+        if self.on_ticker is not None:
+            self.on_ticker(symbol, ticker)
+        for on_ticker in self._ticker_listeners.get(symbol, ()):
+            on_ticker(symbol, ticker)
+
+    def _on_trades(self, symbol, msg):
+        if self.on_trade is None:
+            return
+        if msg[1] == "te":
+            self._trade(symbol, msg[2])
+        elif isinstance(msg[1], list):
+            # The snapshot, most recent first.
+            for trade in reversed(msg[1]):
+                self._trade(symbol, trade)
+        # "tu" repeats a "te" trade with its final ID.
+
+    def _trade(self, symbol, trade):
+        # Both connections send the trades made while the websocket is replaced.
+        last = self._last_trade_ids.get(symbol)
+        if last is not None and trade[0] <= last:
+            return
+        self._last_trade_ids[symbol] = trade[0]
+        self.on_trade(symbol, trade)
+
+    def _on_book(self, symbol, data):
+        book = self.books.get(symbol)
+        if book is None:
+            return
+        if data and isinstance(data[0], list):
+            book.apply_snapshot(data)
+        else:
+            book.apply(data)
+        if self.on_book is not None:
+            self.on_book(symbol, book)
+
+    def _verify(self, channel_id, symbol, checksum):
+        book = self.books.get(symbol)
+        if book is None or book.checksum() == checksum:
+            return
+        self.checksum_failures += 1
+        print("BitfinexClient: The " + symbol + " book does not match its checksum. Subscribing again.")
+        with self._lock:
+            self._channels.get(self.ws.current_ws(), {}).pop(channel_id, None)
+            request = self._subscriptions.get((BOOK, symbol))
+        try:
+            self.ws.send(json.dumps({"event": "unsubscribe", "chanId": channel_id}))
+            if request is not None:
+                self.ws.send(json.dumps(request))
+        except Warning:
+            pass # The books are subscribed to again on the next connection.
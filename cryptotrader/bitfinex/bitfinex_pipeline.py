@@ -4,101 +4,62 @@ Loads data from Bitfinex.
 @author: Tobias Carryer
 '''
 
-import json
-import time
-from threading import Thread
-import urllib2
-import ast
-
-#Requires websocket-client from https://github.com/websocket-client/websocket-client
-from cryptotrader.librariesrequired.websocket import create_connection, WebSocketConnectionClosedException
+from bitfinex_client import BitfinexClient, symbol_for
     
 class BitfinexPipeline(object):
-    def __init__(self, on_market_value, market_ticker, use_ask_value=False, minutes_to_reset=15):
+    def __init__(self, on_market_value, market_ticker, use_ask_value=False, minutes_to_reset=15,
+                 multiplexer=None, client=None):
         '''
-        on_market_value is called every time a new data point is received from the websocket.
-        on_market_value should have 2 parameters, websocket, and message.
-        message["last_price"] can be used to get the currency price of market_ticker.
+        on_market_value is called with the currency price of market_ticker every time Bitfinex
+        sends its ticker, including the heartbeats it sends while the price has not changed.
+        
+        minutes_to_reset is how often the websocket is replaced. The replacement is connected
+        before the old one is closed so no messages are missed.
+        
+        multiplexer is a started WebSocketMultiplexer to share with other pipelines.
+        The pipeline reads its websocket on its own thread if it is None.
         
-        minutes_to_reset is used to force a disconnect and reconnect to the websocket
-        every so many minutes
+        client is a BitfinexClient to share with other pipelines so every pair is followed over
+        one connection. The pipeline opens its own if it is None. A shared client is started
+        and closed by its owner, not the pipeline.
         
         Pre: market_ticker is a String
              minutes_to_reset is positive
         '''
         
         self.on_market_value = on_market_value
-        self.url = "wss://api.bitfinex.com/ws"
         self.market_ticker = market_ticker.lower()
+        self.symbol = symbol_for(market_ticker)
         self.use_ask_value = use_ask_value
         self.seconds_to_reset = minutes_to_reset * 60 #Time in seconds
-        self._time_started = 0
         
-        #GET Request the API to get the current value
-        #Value is only set when it changes so multiple seconds could pass without
-        #calling on_market_value if this is not done
-        ticker = urllib2.urlopen("https://api.bitfinex.com/v1/pubticker/"+str(self.market_ticker)).read()
-        self.last_market_value = float(json.loads(ticker)["last_price"])
+        #Set by the ticker snapshot Bitfinex sends as soon as the pipeline subscribes
+        self.last_market_value = None
         
-        self.stop = False
-        self.ws = None
-        self.thread = None
+        self.owns_client = client is None
+        if client is None:
+            client = BitfinexClient(rotate_after=self.seconds_to_reset, multiplexer=multiplexer)
+        self.client = client
+        self.client.subscribe_ticker(self.symbol, self._on_ticker)
 
     def start(self):
-        def _go():
-            self._connect()
-            self._listen()
-
-        self.thread = Thread(target=_go)
-        self.thread.start()
+        if self.owns_client:
+            self.client.start()
         print("Started Bitfinex pipeline. Uses Bitfinex's websocket API.")
-
-    def _connect(self):
-        '''
-        Post: self.ws is not None
-              self.stop == False
-        '''
-        
-        sub_params = {'event': 'subscribe', 'channel':'ticker', 'pair': self.market_ticker}
-
-        self.ws = create_connection(self.url)
-        self.ws.send(json.dumps(sub_params))
-        self._time_started = int(time.time())
-        self.stop = False
         
-    def _listen(self):
-        while not self.stop:
-            #Force websocket reset every given amount of time
-            if int(time.time()) - self._time_started >= self.seconds_to_reset:
-                print("BitfinexPipeline: Forcing websocket reconnect.")
-                self.close()
-                self._connect()
+    def _on_ticker(self, symbol, ticker):
+        if ticker is not None:
+            #Index 2 is ask price, Index 6 is last price
+            if self.use_ask_value:
+                self.last_market_value = float(ticker[2])
             else:
-                try:
-                    if int(time.time() % 30) == 0:
-                        # Set a 30 second ping to keep connection alive
-                        self.ws.ping("keepalive")
-                    
-                    msg = ast.literal_eval(self.ws.recv())
-                    
-                    if len(msg) == 11:
-                        #Index 3 is ask price, Index 7 is last price
-                        if self.use_ask_value:
-                            self.last_market_value = float(msg[3])
-                        else:
-                            self.last_market_value = float(msg[7])
-                    self.on_market_value(self.last_market_value)
-                except Exception as e:
-                    print("Exception: "+str(e))
+                self.last_market_value = float(ticker[6])
+        if self.last_market_value is not None:
+            self.on_market_value(self.last_market_value)
 
     def close(self):
-        if not self.stop:
-            self.stop = True
-            try:
-                if self.ws:
-                    self.ws.close()
-            except WebSocketConnectionClosedException as e:
-                print("WebSocketConnectionClosedException: " + e)
+        if self.owns_client:
+            self.client.stop()
 
 if __name__ == "__main__":
     def on_market_value(value):
@@ -1,7 +1,10 @@
-''' This is the file a human should run to trade on Bittrex. '''
+'''
+This is the file a human should run to trade on Bittrex.
+Run python -m cryptotrader bittrex --help to see the options.
+'''
 
 from cryptotrader.bittrex import BittrexSecret
-from cryptotrader.librariesrequired.bittrex.bittrex import Bittrex
+from cryptotrader.librariesrequired.bittrex.bittrex import Bittrex, TICKINTERVAL_FIVEMIN
 from cryptotrader import DefaultPosition
 from decimal import Decimal
 from cryptotrader.tradesignals.indicators import SpreadSize
@@ -12,9 +15,11 @@ from cryptotrader.bittrex.bittrex_options import bittrex_fee, bittrex_btc_underc
 from cryptotrader.tradesignals.strategy_observer import StrategyObserver
 from cryptotrader.bittrex import BittrexTrader
 from cryptotrader.tradesignals.strategies.investing_dot_com_strategy import InvestingDotComStrategy
+from cryptotrader.tradesignals.strategies.moving_average_strategy import MovingAverageStrategy
+from cryptotrader.tradesignals.bars import TimeBarBuilder
+from cryptotrader.bittrex.candle_loader import CandleLoader, SECONDS_PER_INTERVAL
     
-# Set the options in one place to make it simple to edit later.
-# These are used in trade()
+# The defaults used when an option is not given on the command line.
 
 is_simulation = True
 percentage_to_allocate = 0.2
@@ -24,8 +29,17 @@ minor_currency = "BTC" #Doesn't matter if single market trader
 minimum_return = 1.01
 default_position = DefaultPosition.SELL
 undercut = bittrex_eth_undercut + Decimal(0.0000009)
+tick_interval = TICKINTERVAL_FIVEMIN
 
-def trade_single_market_spread():
+class _DecimalPriceObserver(StrategyObserver):
+    ''' Moving averages are floats. BittrexTrader places orders with Decimals. '''
+    
+    def notify_significant_change(self, should_buy, market_value):
+        StrategyObserver.notify_significant_change(self, should_buy, Decimal(repr(market_value)))
+
+def trade_single_market_spread(single_market=single_market, is_simulation=is_simulation,
+                               percentage_to_allocate=percentage_to_allocate, minimum_return=minimum_return,
+                               default_position=default_position, undercut=undercut):
     trader = BittrexTrader(percentage_to_allocate=percentage_to_allocate, market=single_market)
     trader.should_default_to(default_position)
     if not is_simulation:
@@ -40,7 +54,9 @@ def trade_single_market_spread():
     pipeline = BittrexPipeline(on_market_summary, minor_currency=minor_currency)
     pipeline.start_singlemarket(single_market)
         
-def trade_investing_dot_com_strategy(market_url):
+def trade_investing_dot_com_strategy(market_url, single_market=single_market, is_simulation=is_simulation,
+                                     percentage_to_allocate=percentage_to_allocate,
+                                     default_position=default_position, undercut=undercut):
     trader = BittrexTrader(percentage_to_allocate=percentage_to_allocate, market=single_market)
     trader.should_default_to(default_position)
     if not is_simulation:
@@ -55,6 +71,34 @@ def trade_investing_dot_com_strategy(market_url):
     pipeline = BittrexPipeline(on_market_summary, minor_currency=minor_currency, poll_time=300)
     pipeline.start_singlemarket(single_market)
     
+def trade_moving_averages(single_market=single_market, is_simulation=is_simulation,
+                          percentage_to_allocate=percentage_to_allocate,
+                          default_position=default_position, tick_interval=tick_interval):
+    '''
+    tick_interval is one of the Bittrex TICKINTERVAL_ constants. The strategy is warmed up with
+    candles of that length and then fed bars of the same length, so its moving averages cover
+    the same amount of time before and after it starts trading.
+    '''
+    
+    trader = BittrexTrader(percentage_to_allocate=percentage_to_allocate, market=single_market)
+    trader.should_default_to(default_position)
+    if not is_simulation:
+        trader.authenticate()
+    
+    seconds_per_bar = SECONDS_PER_INTERVAL[tick_interval]
+    strategy = MovingAverageStrategy(0, 9, 0, 21, data_points_per_minute=60.0 / seconds_per_bar)
+    CandleLoader(tick_interval).warm_up({single_market: strategy})
+    strategy.attach_observer(_DecimalPriceObserver(trader))
+    
+    bars = TimeBarBuilder(seconds_per_bar, strategy.on_bar)
+    
+    def on_market_summary(market_summary, market):
+        # A market summary's volume is of the last 24 hours, not of the bar.
+        bars.add(market_summary["Last"])
+    
+    pipeline = BittrexPipeline(on_market_summary, minor_currency=minor_currency)
+    pipeline.start_singlemarket(single_market)
+    
 def what_is_profitable():
     
     spread_size_indicator = SpreadSize(minimum_return=1, market_fee=bittrex_fee)
@@ -85,7 +129,7 @@ def what_is_profitable():
         print("Nothing is profitable right now.")
     
 if __name__ == "__main__":
-    #what_is_profitable()
-    #trade_single_market_spread()
-    trade_investing_dot_com_strategy("https://www.investing.com/currencies/eth-btc?cid=1031045")
+    import sys
+    from cryptotrader.cli import main
+    main(["bittrex"] + sys.argv[1:])
     
@@ -8,13 +8,18 @@ from cryptotrader.librariesrequired.bittrex.bittrex import Bittrex
 import time
 from threading import Thread
 from bittrex_ignore import BittrexSecret
+from cryptotrader.latency import tick_trace
    
 class BittrexPipeline(object):
-    def __init__(self, on_market_summary, poll_time=15, minor_currency="BTC"):
+    def __init__(self, on_market_summary, poll_time=15, minor_currency="BTC", poller=None, is_urgent=None):
         '''
         on_market_summary should have 1 parameter: the json object containing the market summary
                                                    as specified by Bittrex's API.
         
+        poller is an AdaptivePoller to share with other pipelines. The market summaries are then
+        polled every poll_time seconds at first, more often while the bids and asks are changing
+        or is_urgent() returns True, and less often while they are not.
+        
         Pre: poll_time is a positive integer
         Post: on_market_summary is called every [poll_time] seconds for every market that has
               [minor_currency] as the minor currency.
@@ -25,15 +30,27 @@ class BittrexPipeline(object):
         self.poll_time = poll_time
         self._time_started = 0
         self.minor_currency = minor_currency
+        self.poller = poller
+        self.is_urgent = is_urgent
+        self.job = None
         
-        self.stop = False
+        self._stop = False
         self.thread = None
 
     def _start(self, get_market):
+        '''
+        get_market() returns the bids and asks it saw so the poller can tell when they change.
+        '''
+        
+        if self.poller is not None:
+            self.job = self.poller.add(get_market, self.poll_time, is_urgent=self.is_urgent,
+                                       name="Bittrex market summaries")
+            return
+        
         def _go():
             last_time = 0
             while True:
-                if self.stop:
+                if self._stop:
                     print "Stopping Bittrex pipeline."
                     break
                 elif time.time() - last_time >= self.poll_time:
@@ -41,14 +58,16 @@ class BittrexPipeline(object):
                     get_market()
 
         self.thread = Thread(target=_go)
-        self.stop = False
+        self._stop = False
         self.thread.start()
 
     def start_singlemarket(self, market):
         def _get_market():
             market_summary = self.bittrex_api.get_marketsummary(self.market)["result"][0]
+            tick_trace.tracer.received("bittrex")
             trading = market_summary["MarketName"].replace(self.minor_currency+"-", '')
             self.on_market_summary(market_summary, trading)
+            return (market_summary["Bid"], market_summary["Ask"])
             
         self.market = market
         self._start(_get_market)
@@ -58,17 +77,23 @@ class BittrexPipeline(object):
     def start_multimarket(self):
         def _get_market():
             market_summaries = self.bittrex_api.get_market_summaries()
+            seen = []
             for market_summary in market_summaries["result"]:
                 if market_summary["MarketName"].startswith(self.minor_currency):
+                    tick_trace.tracer.received("bittrex")
                     trading = market_summary["MarketName"].replace(self.minor_currency+"-", '')
                     self.on_market_summary(market_summary, trading)
+                    seen.append((market_summary["MarketName"], market_summary["Bid"], market_summary["Ask"]))
+            return seen
 
         self._start(_get_market)
         print("Started Bittrex pipeline for all markets with the minor currency "+self.minor_currency+".")
 
     def stop(self):
-        if not self.stop:
-            self.stop = True
+        if self.job is not None:
+            self.poller.remove(self.job)
+            self.job = None
+        self._stop = True
 
 if __name__ == "__main__":
 
@@ -8,11 +8,14 @@ import sys
 from decimal import Decimal, localcontext
 from cryptotrader import Trader, DefaultPosition
 from cryptotrader.bittrex import BittrexSecret
+from cryptotrader.latency import timed_order_call
 from cryptotrader.librariesrequired.bittrex.bittrex import Bittrex
 from cryptotrader.bittrex.bittrex_options import bittrex_minimum_btc_trade_size,\
     bittrex_precision, bittrex_fee
 
 class BittrexTrader(Trader):
+    
+    exchange = "bittrex"
         
     simulation_buy_order_id = "1234"
     simulation_sell_order_id = "4321"
@@ -31,9 +34,10 @@ class BittrexTrader(Trader):
         self._waiting_for_order_to_fill = None
         
         # Used to place orders, cancel orders, get the order book during simulation mode
-        self.bittrex_api = Bittrex(BittrexSecret.api_key, BittrexSecret.api_secret)
+        self.bittrex_api = Bittrex(BittrexSecret.api_key, BittrexSecret.api_secret, clock=self.clock.time)
         
         # In test mode: Is used to prevent the same transaction from being counted twice.
+        # Bittrex's timestamps are in UTC on Bittrex's clock.
         self._last_simulation_transaction_check = 0
         
         # In test mode: tracks how much the trader's order has been filled.
@@ -69,6 +73,8 @@ class BittrexTrader(Trader):
             
     def authenticate(self):
         self.is_test = False
+        # Nonces and order timestamps are on the exchange's clock from now on.
+        self.clock.start()
         self.fetch_balance_and_assets()
         
     def validate_percentage_per_trade(self):
@@ -138,6 +144,7 @@ class BittrexTrader(Trader):
             else:
                 sys.stdout.write('wb ')
               
+    @timed_order_call("limit_buy_order", places_order=True)
     def limit_buy_order(self, quantity, market_value):
         if self.bittrex_api is not None:
             result = self.bittrex_api.buy_limit(self.market_ticker, quantity, market_value)
@@ -157,7 +164,7 @@ class BittrexTrader(Trader):
         
         # Only orders that matter are the ones that might fill us which can only
         # happen in the future.
-        self._last_simulation_transaction_check = datetime.datetime.now()
+        self._last_simulation_transaction_check = datetime.datetime.utcfromtimestamp(self.clock.time())
         
         self._active_buy_order = True
         
@@ -189,6 +196,7 @@ class BittrexTrader(Trader):
             else:
                 sys.stdout.write('ws ')
                 
+    @timed_order_call("limit_sell_order", places_order=True)
     def limit_sell_order(self, quantity, market_value):
         if self.bittrex_api is not None:
             result = self.bittrex_api.sell_limit(self.market_ticker, quantity, market_value)
@@ -211,7 +219,7 @@ class BittrexTrader(Trader):
         
         # Only orders that matter are the ones that might fill us which can only
         # happen in the future.
-        self._last_simulation_transaction_check = datetime.datetime.now()
+        self._last_simulation_transaction_check = datetime.datetime.utcfromtimestamp(self.clock.time())
         
         self._active_sell_order = True
             
@@ -260,7 +268,7 @@ class BittrexTrader(Trader):
                                 self._waiting_for_order_to_fill = None
                                 
             # Orders up to this moment have been processed, don't process them again.
-            self._last_simulation_transaction_check = datetime.datetime.now()
+            self._last_simulation_transaction_check = datetime.datetime.utcfromtimestamp(self.clock.time())
             
         else:
             
@@ -269,7 +277,7 @@ class BittrexTrader(Trader):
             # Note: The pipeline never knows the Trader's status so the pipeline will continue
             #       to pass data to the market observer.
             
-            json_result = self.bittrex_api.get_order(order_id)["result"]
+            json_result = self.lookup_order(order_id)
             
             if json_result["CancelInitiated"] == True:
                 print("The order was cancelled, likely because a human intervened.")
@@ -278,6 +286,7 @@ class BittrexTrader(Trader):
             elif json_result["Quantity"] > json_result["Quantity"] - json_result["QuantityRemaining"] > 0:
                 print("The order has been partially filled. Waiting until it is fully filled.")
             elif json_result["IsOpen"] == False:
+                self.record_fill()
                 order_type = json_result["Type"]
                 if order_type == "LIMIT_BUY":
                     self.assets = Decimal(json_result["Quantity"] - json_result["CommissionPaid"])
@@ -311,14 +320,19 @@ class BittrexTrader(Trader):
             self._waiting_for_order_to_fill = None
             self._active_buy_order = False
     
+    @timed_order_call("cancel_order")
     def cancel_order(self, order_id):
-        order_info = self.bittrex_api.get_order(order_id)["result"]
+        order_info = self.lookup_order(order_id)
         if order_info is not None:
             quantity_remaining = Decimal(order_info["QuantityRemaining"])
             self.balance = (quantity_remaining * Decimal(order_info["Limit"])) - Decimal(order_info["CommissionPaid"])
             self.assets = Decimal(order_info["Quantity"]) - quantity_remaining
             self.bittrex_api.cancel(order_id)
     
+    @timed_order_call("lookup_order")
+    def lookup_order(self, order_id):
+        return self.bittrex_api.get_order(order_id)["result"]
+    
     def abort(self):
         Trader.abort(self)
         self._waiting_for_order_to_fill = None
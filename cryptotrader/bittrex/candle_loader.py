@@ -0,0 +1,141 @@
+'''
+Loads historical candles from Bittrex so strategies start with warmed up indicators.
+
+Candles for every market are fetched in parallel and kept on disk, so a bot that
+restarts within one candle of the last run does not ask Bittrex again. The
+candles are handed to the strategies as numpy arrays and go through the
+indicators' batch path (Indicator.compute).
+
+@author: Tobias Carryer
+'''
+
+import calendar
+import json
+import os
+import tempfile
+import time
+from multiprocessing.pool import ThreadPool
+from cryptotrader.librariesrequired.bittrex.bittrex import Bittrex, API_V2_0, TICKINTERVAL_ONEMIN,\
+    TICKINTERVAL_FIVEMIN, TICKINTERVAL_THIRTYMIN, TICKINTERVAL_HOUR, TICKINTERVAL_DAY
+from cryptotrader.lazy_import import LazyModule
+
+np = LazyModule("numpy")
+
+SECONDS_PER_INTERVAL = {TICKINTERVAL_ONEMIN: 60, TICKINTERVAL_FIVEMIN: 300, TICKINTERVAL_THIRTYMIN: 1800,
+                        TICKINTERVAL_HOUR: 3600, TICKINTERVAL_DAY: 86400}
+
+DEFAULT_CACHE_DIRECTORY = os.path.join(tempfile.gettempdir(), "cryptotrader_candles")
+
+class Candles(object):
+    '''
+    A market's candles, oldest first, as numpy arrays.
+    '''
+
+    def __init__(self, market, tick_interval, candles):
+        '''
+        candles is the "result" of Bittrex.get_candles()
+        '''
+
+        self.market = market
+        self.tick_interval = tick_interval
+        self.timestamps = np.array([calendar.timegm(time.strptime(c["T"][:19], "%Y-%m-%dT%H:%M:%S"))
+                                    for c in candles], dtype=float)
+        self.opens = np.array([c["O"] for c in candles], dtype=float)
+        self.highs = np.array([c["H"] for c in candles], dtype=float)
+        self.lows = np.array([c["L"] for c in candles], dtype=float)
+        self.closes = np.array([c["C"] for c in candles], dtype=float)
+        self.volumes = np.array([c["V"] for c in candles], dtype=float)
+
+    def __len__(self):
+        return len(self.closes)
+
+class CandleLoader(object):
+
+    def __init__(self, tick_interval=TICKINTERVAL_ONEMIN, cache_directory=DEFAULT_CACHE_DIRECTORY, threads=8):
+        '''
+        tick_interval is one of the Bittrex TICKINTERVAL_ constants.
+        cache_directory is where candles are kept between runs. None turns the cache off.
+        threads is how many markets are downloaded at the same time.
+        '''
+
+        self.tick_interval = tick_interval
+        self.cache_directory = cache_directory
+        self.threads = threads
+
+    def _cache_path(self, market):
+        return os.path.join(self.cache_directory, market + "_" + self.tick_interval + ".json")
+
+    def _read_cache(self, market):
+        '''
+        Returns: The cached candles if they were saved less than one candle ago, otherwise None.
+        '''
+
+        if self.cache_directory is None:
+            return None
+        path = self._cache_path(market)
+        try:
+            if time.time() - os.path.getmtime(path) > SECONDS_PER_INTERVAL[self.tick_interval]:
+                return None
+            with open(path, "r") as f:
+                return json.load(f)
+        except (OSError, IOError, ValueError):
+            return None
+
+    def _write_cache(self, market, candles):
+        if self.cache_directory is None:
+            return
+        if not os.path.isdir(self.cache_directory):
+            try:
+                os.makedirs(self.cache_directory)
+            except OSError:
+                pass # Another thread made it first.
+        path = self._cache_path(market)
+        temporary_path = path + ".tmp"
+        with open(temporary_path, "w") as f:
+            json.dump(candles, f)
+        try:
+            os.rename(temporary_path, path)
+        except OSError:
+            # Windows will not rename over an existing file.
+            os.remove(path)
+            os.rename(temporary_path, path)
+
+    def load(self, market):
+        '''
+        market is a Bittrex market, e.g. "BTC-ETH"
+        Returns: Candles for the market.
+        Raises: Warning if Bittrex did not return any candles.
+        '''
+
+        candles = self._read_cache(market)
+        if candles is None:
+            # Every thread gets its own client because clients rate limit themselves.
+            response = Bittrex(None, None, api_version=API_V2_0).get_candles(market, self.tick_interval)
+            candles = response["result"]
+            if not response["success"] or candles is None:
+                raise Warning("Could not load candles for " + market + ": " + str(response["message"]))
+            self._write_cache(market, candles)
+        return Candles(market, self.tick_interval, candles)
+
+    def load_many(self, markets):
+        '''
+        Returns: A dictionary of market -> Candles, downloaded in parallel.
+        '''
+
+        pool = ThreadPool(max(1, min(self.threads, len(markets))))
+        try:
+            return dict(zip(markets, pool.map(self.load, markets)))
+        finally:
+            pool.close()
+
+    def warm_up(self, strategies):
+        '''
+        strategies is a dictionary of market -> strategy. Every strategy must have warm_up(candles).
+        Post: Every strategy has been warmed up with its market's candles.
+        '''
+
+        started = time.time()
+        candles = self.load_many(list(strategies.keys()))
+        for market, strategy in strategies.items():
+            strategy.warm_up(candles[market])
+        print("Warmed up " + str(len(strategies)) + " strategies in " + str(round(time.time() - started, 2)) + " seconds.")
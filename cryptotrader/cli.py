@@ -0,0 +1,216 @@
+'''
+One command line for every operator.
+
+    python -m cryptotrader quadrigacx trade --ticker btc_usd --simulation
+    python -m cryptotrader bittrex profitable
+    python -m cryptotrader cryptopia fast-buy --target-profit 1.22
+    python -m cryptotrader bench-imports
+
+An operator is only imported once its exchange is chosen, so asking for help
+or running one exchange does not pay for importing the others.
+Options that are not given, including whether to trade live, keep the
+operator's defaults.
+
+@author: Tobias Carryer
+'''
+
+import argparse
+import subprocess
+import sys
+from decimal import Decimal
+
+DEFAULT_POSITIONS = ["buy", "sell", "hold"]
+
+def _default_position(name):
+    from cryptotrader import DefaultPosition
+    return {"buy": DefaultPosition.BUY, "sell": DefaultPosition.SELL, "hold": DefaultPosition.HOLD}[name]
+
+def _add_simulation_arguments(parser):
+    # Neither flag keeps the operator's default.
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--simulation", dest="simulation", action="store_const", const=True, default=None,
+                      help="Trade with pretend money.")
+    mode.add_argument("--live", dest="simulation", action="store_const", const=False,
+                      help="Trade with real money.")
+
+def _add_first_trade_arguments(parser):
+    first = parser.add_mutually_exclusive_group()
+    first.add_argument("--buy-first", dest="start_by_buying", action="store_const", const=True, default=None,
+                       help="Start by buying.")
+    first.add_argument("--sell-first", dest="start_by_buying", action="store_const", const=False,
+                       help="Start by selling instead of buying.")
+
+def _add_minimum_return_argument(parser):
+    parser.add_argument("--minimum-return", type=float, default=None,
+                        help="Only trade when the return after fees is at least this, e.g. 1.01")
+
+def _add_common_arguments(parser):
+    _add_simulation_arguments(parser)
+    parser.add_argument("--default-position", choices=DEFAULT_POSITIONS, default=None,
+                        help="What to hold when the market is not profitable.")
+
+def _set_if_given(kwargs, name, value, convert=None):
+    if value is not None:
+        kwargs[name] = convert(value) if convert is not None else value
+
+def quadrigacx(args):
+    from cryptotrader.quadrigacx import quadriga_operator, QuadrigaOptions
+
+    if args.command == "profitable":
+        quadriga_operator.what_is_profitable()
+        return
+
+    kwargs = {}
+    _set_if_given(kwargs, "is_simulation", args.simulation)
+    _set_if_given(kwargs, "start_by_buying", args.start_by_buying)
+    _set_if_given(kwargs, "aggressive", args.aggressive)
+    _set_if_given(kwargs, "options", args.ticker, QuadrigaOptions)
+    _set_if_given(kwargs, "minimum_return", args.minimum_return)
+    _set_if_given(kwargs, "percentage_to_trade", args.percentage)
+    _set_if_given(kwargs, "number_of_traders", args.traders)
+    _set_if_given(kwargs, "default_position", args.default_position, _default_position)
+    quadriga_operator.trade(**kwargs)
+
+def bittrex(args):
+    from cryptotrader.bittrex import bittrex_operator
+
+    if args.command == "profitable":
+        bittrex_operator.what_is_profitable()
+        return
+
+    kwargs = {}
+    _set_if_given(kwargs, "is_simulation", args.simulation)
+    _set_if_given(kwargs, "single_market", args.market)
+    _set_if_given(kwargs, "percentage_to_allocate", args.percentage)
+    _set_if_given(kwargs, "default_position", args.default_position, _default_position)
+    if args.command != "moving-average":
+        _set_if_given(kwargs, "undercut", args.undercut, Decimal)
+    if args.command == "spread":
+        _set_if_given(kwargs, "minimum_return", args.minimum_return)
+        bittrex_operator.trade_single_market_spread(**kwargs)
+    elif args.command == "moving-average":
+        _set_if_given(kwargs, "tick_interval", args.interval)
+        bittrex_operator.trade_moving_averages(**kwargs)
+    else:
+        bittrex_operator.trade_investing_dot_com_strategy(args.url, **kwargs)
+
+def cryptopia(args):
+    from cryptotrader.cryptopia import cryptopia_operator
+
+    kwargs = {}
+    _set_if_given(kwargs, "is_simulation", args.simulation)
+    _set_if_given(kwargs, "trading_pair", args.pair)
+    _set_if_given(kwargs, "percentage_to_trade", args.percentage)
+    if args.command == "trade":
+        _set_if_given(kwargs, "start_by_buying", args.start_by_buying)
+        _set_if_given(kwargs, "minimum_return", args.minimum_return)
+        _set_if_given(kwargs, "default_position", args.default_position, _default_position)
+        _set_if_given(kwargs, "undercut", args.undercut)
+        cryptopia_operator.trade(**kwargs)
+    elif args.command == "mcafee":
+        cryptopia_operator.mcafee_pump(Decimal(args.target_profit), **kwargs)
+    else:
+        cryptopia_operator.fast_market_buy(Decimal(args.target_profit), **kwargs)
+
+# Imported in a fresh interpreter each by bench-imports.
+BENCHMARKED_MODULES = ["cryptotrader",
+                       "cryptotrader.tradesignals.indicators",
+                       "cryptotrader.tradesignals.strategies",
+                       "cryptotrader.quadrigacx.quadriga_operator",
+                       "cryptotrader.bittrex.bittrex_operator",
+                       "cryptotrader.cryptopia.cryptopia_operator",
+                       "cryptotrader.cli",
+                       # What the lazy imports avoid paying for.
+                       "tweepy", "matplotlib.pyplot", "bs4"]
+
+_TIME_IMPORT = "import time; started = time.time(); import %s; print(time.time() - started)"
+
+def bench_imports(args):
+    '''
+    Post: The fastest of [args.repeat] import times of every benchmarked module is printed.
+    '''
+
+    print("%-45s %12s" % ("module", "import (ms)"))
+    for module in BENCHMARKED_MODULES:
+        times = []
+        error = None
+        for _ in range(args.repeat):
+            process = subprocess.Popen([sys.executable, "-c", _TIME_IMPORT % module],
+                                       stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            out, err = process.communicate()
+            if process.returncode != 0:
+                error = err.decode("utf-8", "replace").strip().splitlines()[-1]
+                break
+            times.append(float(out.decode("utf-8").strip()))
+        if error is not None:
+            print("%-45s %12s  %s" % (module, "-", error))
+        else:
+            print("%-45s %12.1f" % (module, min(times) * 1000))
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m cryptotrader",
+                                     description="Trade on an exchange or measure how long the bot takes to start.")
+    exchanges = parser.add_subparsers(dest="exchange")
+
+    quadriga_parser = exchanges.add_parser("quadrigacx", help="Trade on QuadrigaCX.")
+    quadriga_commands = quadriga_parser.add_subparsers(dest="command")
+    quadriga_trade = quadriga_commands.add_parser("trade", help="Trade the spread with several traders.")
+    _add_common_arguments(quadriga_trade)
+    _add_minimum_return_argument(quadriga_trade)
+    _add_first_trade_arguments(quadriga_trade)
+    quadriga_trade.add_argument("--ticker", choices=["eth_cad", "btc_cad", "ltc_cad", "btc_usd", "eth_btc"])
+    quadriga_trade.add_argument("--percentage", type=float, help="Percentage of the balance to trade, e.g. 0.5")
+    quadriga_trade.add_argument("--traders", type=int, help="Number of traders to split the balance between.")
+    quadriga_trade.add_argument("--aggressive", action="store_const", const=True, default=None,
+                                help="Buy or sell at a loss to hold the default position.")
+    quadriga_commands.add_parser("profitable", help="Print which markets are profitable right now.")
+    quadriga_parser.set_defaults(run=quadrigacx)
+
+    bittrex_parser = exchanges.add_parser("bittrex", help="Trade on Bittrex.")
+    bittrex_commands = bittrex_parser.add_subparsers(dest="command")
+    bittrex_spread = bittrex_commands.add_parser("spread", help="Trade the spread on one market.")
+    bittrex_investing = bittrex_commands.add_parser("investing", help="Trade on investing.com's signals.")
+    bittrex_investing.add_argument("url", help="A market's page on investing.com")
+    bittrex_moving_average = bittrex_commands.add_parser("moving-average",
+                                                         help="Trade when moving averages cross, warmed up from candles.")
+    bittrex_moving_average.add_argument("--interval", choices=["oneMin", "fiveMin", "thirtyMin", "hour", "Day"],
+                                        help="Length of the candles and bars the strategy is fed.")
+    for command in (bittrex_spread, bittrex_investing, bittrex_moving_average):
+        _add_common_arguments(command)
+        command.add_argument("--market", help="e.g. BTC-ETH")
+        command.add_argument("--percentage", type=float, help="Percentage of the balance to allocate.")
+    for command in (bittrex_spread, bittrex_investing):
+        command.add_argument("--undercut", help="Amount to outbid/undercut other orders by.")
+    _add_minimum_return_argument(bittrex_spread)
+    bittrex_commands.add_parser("profitable", help="Print which markets are profitable right now.")
+    bittrex_parser.set_defaults(run=bittrex)
+
+    cryptopia_parser = exchanges.add_parser("cryptopia", help="Trade on Cryptopia.")
+    cryptopia_commands = cryptopia_parser.add_subparsers(dest="command")
+    cryptopia_trade = cryptopia_commands.add_parser("trade", help="Trade the spread.")
+    _add_common_arguments(cryptopia_trade)
+    _add_minimum_return_argument(cryptopia_trade)
+    _add_first_trade_arguments(cryptopia_trade)
+    cryptopia_trade.add_argument("--undercut", type=float, help="Amount to outbid/undercut other orders by.")
+    cryptopia_mcafee = cryptopia_commands.add_parser("mcafee", help="Buy the coin of the day McAfee tweets.")
+    cryptopia_fast_buy = cryptopia_commands.add_parser("fast-buy", help="Market buy a coin typed in.")
+    for command in (cryptopia_mcafee, cryptopia_fast_buy):
+        _add_simulation_arguments(command)
+        command.add_argument("--target-profit", required=True, help="e.g. 1.22 to sell at a 22%% profit")
+    for command in (cryptopia_trade, cryptopia_mcafee, cryptopia_fast_buy):
+        command.add_argument("--pair", help="e.g. GRN_BTC")
+        command.add_argument("--percentage", type=float, help="Percentage of the balance to trade.")
+    cryptopia_parser.set_defaults(run=cryptopia)
+
+    bench_parser = exchanges.add_parser("bench-imports", help="Measure how long the bot's modules take to import.")
+    bench_parser.add_argument("--repeat", type=int, default=5)
+    bench_parser.set_defaults(run=bench_imports)
+
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.run(args)
+
+if __name__ == "__main__":
+    main()
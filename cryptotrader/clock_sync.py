@@ -0,0 +1,188 @@
+'''
+Keeps track of how far the local clock is from each exchange's clock.
+
+A ClockSync asks the exchange for its time a few times in a background thread
+and estimates the offset the same way NTP does: assuming the request took as
+long to get there as the response took to come back, the server read its clock
+halfway through the round trip. Samples with a long round trip are the least
+trustworthy, so only the fastest ones are kept and the median of their offsets
+is used. Nothing on the hot path waits on the network; time() is the local
+clock plus the last offset.
+
+@author: Tobias Carryer
+'''
+
+import time
+from email.utils import parsedate_tz, mktime_tz
+from threading import Event, Lock, Thread
+
+# requests is imported by the fetchers so importing a Trader does not pay for it.
+
+def binance_server_time():
+    import requests
+    return requests.get("https://api.binance.com/api/v1/time").json()["serverTime"] / 1000.0
+
+def http_date_server_time(url):
+    '''
+    Returns: A function that reads the server's time from the Date header of a response from url.
+             The header only has a resolution of one second, the median of several samples is
+             still a lot closer than assuming the clocks agree.
+    '''
+
+    def _server_time():
+        import requests
+        # The header is the server's clock truncated to the second. On average it was read
+        # half way through that second, without this every sample would be 0.5s behind.
+        return float(mktime_tz(parsedate_tz(requests.head(url).headers["Date"]))) + 0.5
+    return _server_time
+
+# Cheap public endpoints for every exchange the traders sign requests for.
+SERVER_TIME_FETCHERS = {
+    "binance": binance_server_time,
+    "bittrex": http_date_server_time("https://bittrex.com/api/v1.1/public/getcurrencies"),
+    "cryptopia": http_date_server_time("https://www.cryptopia.co.nz/api/GetCurrencies"),
+    "quadrigacx": http_date_server_time("https://api.quadrigacx.com/v2/ticker"),
+}
+
+class ClockSync(object):
+
+    def __init__(self, fetch_server_time=None, refresh_interval=300, samples_per_refresh=8, samples_kept=4):
+        '''
+        fetch_server_time returns the exchange's time in seconds since the epoch. If it is None
+        the local clock is assumed to be correct.
+        refresh_interval is how many seconds to wait between estimates.
+        The samples_kept samples with the shortest round trip out of samples_per_refresh are used.
+        '''
+
+        self.fetch_server_time = fetch_server_time
+        self.refresh_interval = refresh_interval
+        self.samples_per_refresh = samples_per_refresh
+        self.samples_kept = samples_kept
+
+        # Seconds to add to the local clock to get the exchange's clock.
+        self.offset = 0.0
+        # Round trip of the fastest sample in the last estimate, in seconds.
+        self.rtt = None
+        self.last_synchronized = None
+
+        self._lock = Lock()
+        self._thread = None
+        # Set to stop the thread it was made for. Every thread gets its own so one started
+        # right after stop() does not bring the old one back to life.
+        self._stopped = None
+
+    def time(self):
+        ''' Returns: The exchange's current time in seconds since the epoch. '''
+        return time.time() + self.offset
+
+    def timestamp_ms(self):
+        ''' Returns: The exchange's current time in integer milliseconds since the epoch. '''
+        return int(round(self.time() * 1000))
+
+    def sample(self):
+        '''
+        Returns: (offset, round trip) of one request for the server's time.
+        '''
+
+        sent = time.time()
+        server_time = self.fetch_server_time()
+        received = time.time()
+        return server_time - (sent + received) / 2.0, received - sent
+
+    def synchronize(self):
+        '''
+        Post: offset and rtt are estimated from a new set of samples.
+        '''
+
+        if self.fetch_server_time is None:
+            return
+
+        # The first request pays for DNS, TCP and TLS set up so its round trip says nothing.
+        self.fetch_server_time()
+        samples = sorted((self.sample() for _ in range(self.samples_per_refresh)),
+                         key=lambda offset_and_rtt: offset_and_rtt[1])
+        kept = sorted(offset for offset, rtt in samples[:self.samples_kept])
+        middle = len(kept) // 2
+        if len(kept) % 2 == 1:
+            offset = kept[middle]
+        else:
+            offset = (kept[middle - 1] + kept[middle]) / 2.0
+
+        with self._lock:
+            self.offset = offset
+            self.rtt = samples[0][1]
+            self.last_synchronized = time.time()
+
+    def start(self):
+        '''
+        Post: The clock is synchronized now and every refresh_interval seconds in a background thread.
+        '''
+
+        def _go(stopped):
+            last_attempt = None
+            while not stopped.is_set():
+                if last_attempt is None or time.time() - last_attempt >= self.refresh_interval:
+                    last_attempt = time.time()
+                    try:
+                        self.synchronize()
+                    except Exception as e:
+                        # Keep the previous offset, it is better than nothing.
+                        print("Could not synchronize the clock: " + str(e))
+                stopped.wait(1)
+
+        if self.fetch_server_time is None or self._thread is not None:
+            return
+        self._stopped = Event()
+        self._thread = Thread(target=_go, args=(self._stopped,))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        if self._stopped is not None:
+            self._stopped.set()
+        self._thread = None
+
+_clocks = {}
+_clocks_lock = Lock()
+
+def clock_for(exchange, start=True):
+    '''
+    start is False to get the clock without synchronizing it yet, e.g. for a simulation that
+    does not sign requests. Call start() on it to synchronize it later.
+    Returns: The shared ClockSync for exchange, started the first time it is asked for with start.
+             Exchanges without a known time source get a clock that is never corrected.
+    '''
+
+    with _clocks_lock:
+        clock = _clocks.get(exchange)
+        if clock is None:
+            clock = ClockSync(SERVER_TIME_FETCHERS.get(exchange))
+            _clocks[exchange] = clock
+        if start:
+            clock.start()
+        return clock
+
+def prometheus_text():
+    '''
+    Returns: The offset and round trip of every clock in Prometheus' text exposition format.
+    '''
+
+    with _clocks_lock:
+        clocks = sorted(_clocks.items())
+
+    lines = ["# HELP cryptotrader_clock_offset_seconds Exchange clock minus local clock.",
+             "# TYPE cryptotrader_clock_offset_seconds gauge"]
+    for exchange, clock in clocks:
+        lines.append('cryptotrader_clock_offset_seconds{exchange="%s"} %.6f' % (exchange, clock.offset))
+    lines += ["# HELP cryptotrader_clock_rtt_seconds Round trip of the best clock sample.",
+              "# TYPE cryptotrader_clock_rtt_seconds gauge"]
+    for exchange, clock in clocks:
+        if clock.rtt is not None:
+            lines.append('cryptotrader_clock_rtt_seconds{exchange="%s"} %.6f' % (exchange, clock.rtt))
+    return "\n".join(lines) + "\n"
+
+if __name__ == "__main__":
+    clock = ClockSync(binance_server_time)
+    clock.synchronize()
+    print("Binance is " + str(round(clock.offset * 1000, 1)) + "ms ahead, best round trip "
+          + str(round(clock.rtt * 1000, 1)) + "ms")
@@ -0,0 +1,75 @@
+'''
+Fetches a polled endpoint only as much as it has changed.
+
+Polling an order book that has not changed still costs a download, a JSON
+parse and a round of strategy calculations. A ConditionalFetcher sends the
+ETag and Last-Modified the server gave last time so a server that supports
+conditional requests can answer 304 Not Modified with no body, and compares
+the bodies of servers that do not with the last one before parsing, so an
+unchanged book is neither parsed again nor reported as changed.
+
+@author: Tobias Carryer
+'''
+
+import json
+import requests
+
+class ConditionalFetcher(object):
+
+    def __init__(self, url, params=None, session=None, loads=json.loads):
+        '''
+        session is a requests.Session to share with other fetchers. One is made if it is None
+        so the connection is kept alive between polls.
+        loads parses the body of the response.
+        '''
+
+        self.url = url
+        self.params = params
+        self.session = session if session is not None else requests.Session()
+        self.loads = loads
+
+        self._etag = None
+        self._last_modified = None
+        self._body = None
+        self._data = None
+
+        self.requests = 0
+        self.not_modified = 0   # Answered 304 by the server.
+        self.unchanged = 0      # Sent the same body again.
+        self.parsed = 0
+
+    def fetch(self):
+        '''
+        Returns: (data, changed) where data is the parsed body, the one parsed before if it
+                 has not changed, and changed is False if it is the same as last time.
+        '''
+
+        headers = {}
+        if self._etag is not None:
+            headers["If-None-Match"] = self._etag
+        if self._last_modified is not None:
+            headers["If-Modified-Since"] = self._last_modified
+
+        response = self.session.get(self.url, params=self.params, headers=headers)
+        self.requests += 1
+        if response.status_code == 304 and self._body is not None:
+            self.not_modified += 1
+            return self._data, False
+        response.raise_for_status()
+
+        self._etag = response.headers.get("ETag")
+        self._last_modified = response.headers.get("Last-Modified")
+        body = response.content
+        if body == self._body:
+            self.unchanged += 1
+            return self._data, False
+
+        data = self.loads(body)
+        self.parsed += 1
+        self._body = body
+        self._data = data
+        return data, True
+
+    def counters(self):
+        return {"requests": self.requests, "not_modified": self.not_modified,
+                "unchanged": self.unchanged, "parsed": self.parsed}
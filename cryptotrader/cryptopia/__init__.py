@@ -1,3 +1,4 @@
 from cryptotrader.cryptopia.cryptopia_pipeline import CryptopiaPipeline
 from cryptotrader.cryptopia.cryptopia_trader import CryptopiaTrader
+from cryptotrader.cryptopia.order_book_cache import OrderBookCache
 from cryptotrader.cryptopia.cryptopia_options import minimum_trade_for, cryptopia_fee
\ No newline at end of file
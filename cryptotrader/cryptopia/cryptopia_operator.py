@@ -1,18 +1,17 @@
 '''
 This is the file a human should run to trade on Cryptopia.
+Run python -m cryptotrader cryptopia --help to see the options.
 '''
 
-from cryptotrader.twitter_api_ignore import TWITTER_CONSUMER_KEY, TWITTER_CONSUMER_SECRET, TWITTER_ACCESS_TOKEN, TWITTER_ACCESS_SECRET
 from cryptotrader.tradesignals.strategies import SpreadSizeStrategy, McAfeeStrategy, FastMarketBuyTool
 from cryptotrader.cryptopia.cryptopia_ignore import CryptopiaSecret
-from cryptotrader.cryptopia import CryptopiaTrader, CryptopiaPipeline, cryptopia_fee
+from cryptotrader.cryptopia import CryptopiaTrader, CryptopiaPipeline, OrderBookCache, cryptopia_fee
 from cryptotrader.tradesignals.indicators import Twitter
 from cryptotrader import DefaultPosition
+from cryptotrader.adaptive_poller import AdaptivePoller
 from cryptotrader.tradesignals import StrategyObserver, SingleTradeStrategyObserver
-from decimal import Decimal
 
-# Set the options in one place to make it simple to edit later.
-# These are used in trade()
+# The defaults used when an option is not given on the command line.
 trading_pair = "GRN_BTC"
 minimum_return = 1.01
 percentage_to_trade = 1
@@ -22,7 +21,9 @@ aggressive = False
 default_position = DefaultPosition.BUY
 undercut = 0.00000001
 
-def trade():
+def trade(trading_pair=trading_pair, minimum_return=minimum_return, percentage_to_trade=percentage_to_trade,
+          is_simulation=is_simulation, start_by_buying=start_by_buying, default_position=default_position,
+          undercut=undercut):
     trader = CryptopiaTrader(trading_pair, percentage_to_trade=percentage_to_trade, start_by_buying=start_by_buying)
     
     # Sensitive authentication information is kept in a secret file off GitHub.
@@ -34,20 +35,29 @@ def trade():
         strategy.process_order_book(bids[0]["Price"], asks[0]["Price"])
     strategy.attach_observer(StrategyObserver(trader))
                      
-    pipeline = CryptopiaPipeline(on_order_book, trading_pair)
+    # Polls faster while the spread is moving or close to profitable, within Cryptopia's rate limit.
+    poller = AdaptivePoller(requests_per_second=1, min_interval=1, max_interval=60, name="Cryptopia poller")
+    # The strategy only uses the best bid and ask.
+    pipeline = CryptopiaPipeline(on_order_book, trading_pair, poller=poller, is_urgent=strategy.is_near_profitable,
+                                 depth=1)
     pipeline.start()
+    poller.start()
+    
+def mcafee_pump(target_profit, trading_pair=trading_pair, percentage_to_trade=percentage_to_trade,
+                is_simulation=is_simulation):
+    # Only the McAfee pump needs Twitter's keys.
+    from cryptotrader.twitter_api_ignore import TWITTER_CONSUMER_KEY, TWITTER_CONSUMER_SECRET,\
+        TWITTER_ACCESS_TOKEN, TWITTER_ACCESS_SECRET
     
-def mcafee_pump(target_profit):
     trader = CryptopiaTrader(trading_pair, percentage_to_trade=percentage_to_trade, start_by_buying=True)
     # Sensitive authentication information is kept in a secret file off GitHub.
     if not is_simulation:
         trader.authenticate(CryptopiaSecret.api_key, CryptopiaSecret.api_secret)
         
-    def get_asks(market_ticker):
-        def on_order_book(bids, asks):
-            print("Did not expect on_order_book to be called while in McAfee pump mode.")
-        pipeline = CryptopiaPipeline(on_order_book, market_ticker)
-        return pipeline.get_order_book()["Sell"]
+    # Every BTC market's asks are kept in memory so the buy does not wait on Cryptopia.
+    order_books = OrderBookCache("BTC")
+    order_books.start()
+    get_asks = order_books.get_asks
 
     twitter = Twitter(TWITTER_CONSUMER_KEY, TWITTER_CONSUMER_SECRET,
                       TWITTER_ACCESS_TOKEN, TWITTER_ACCESS_SECRET)
@@ -56,17 +66,17 @@ def mcafee_pump(target_profit):
     strategy.attach_observer(SingleTradeStrategyObserver(trader))
     strategy.start_listening()
     
-def fast_market_buy(target_profit):
+def fast_market_buy(target_profit, trading_pair=trading_pair, percentage_to_trade=percentage_to_trade,
+                    is_simulation=is_simulation):
     trader = CryptopiaTrader(trading_pair, percentage_to_trade=percentage_to_trade, start_by_buying=True)
     # Sensitive authentication information is kept in a secret file off GitHub.
     if not is_simulation:
         trader.authenticate(CryptopiaSecret.api_key, CryptopiaSecret.api_secret)
         
-    def get_asks(market_ticker):
-        def on_order_book(bids, asks):
-            print("Did not expect on_order_book to be called while in market order mode.")
-        pipeline = CryptopiaPipeline(on_order_book, market_ticker)
-        return pipeline.get_order_book()["Sell"]
+    # Every BTC market's asks are kept in memory so the buy does not wait on Cryptopia.
+    order_books = OrderBookCache("BTC")
+    order_books.start()
+    get_asks = order_books.get_asks
 
     strategy = FastMarketBuyTool(get_asks, trading_fee=cryptopia_fee,
                               target_profit=target_profit, balance_to_spend=trader.balance)
@@ -74,7 +84,7 @@ def fast_market_buy(target_profit):
     strategy.start_listening()
 
 if __name__ == "__main__":
-    #trade()
-    #mcafee_pump(target_profit=Decimal(1.75))
-    fast_market_buy(target_profit=Decimal(1.22))
+    import sys
+    from cryptotrader.cli import main
+    main(["cryptopia"] + sys.argv[1:])
     
@@ -6,40 +6,87 @@ Loads data from Cryptopia.
 
 import time
 from threading import Thread
-import requests
+from cryptotrader.latency import tick_trace
+from cryptotrader.conditional_fetch import ConditionalFetcher
+
+def _top(orders, levels):
+    ''' Returns: The price and volume of the first [levels] orders. '''
+    return [(order["Price"], order["Volume"]) for order in orders[:levels]]
 
 class CryptopiaPipeline(object):
-    def __init__(self, on_order_book, market_ticker="BTC_USDT", poll_time=15):
+    def __init__(self, on_order_book, market_ticker="BTC_USDT", poll_time=15, poller=None, is_urgent=None,
+                 top_levels=10, depth=None):
         '''
         on_order_book should have 2 parameters: one for the bids and one for the asks.
         on_order_book will be called every [poll_time] seconds
         
+        poller is an AdaptivePoller to share with other pipelines. The order book is then polled
+        every poll_time seconds at first, more often while the top of the book is changing or
+        is_urgent() returns True, and less often while it is not.
+        
+        top_levels is how many levels of each side are compared with the last poll. on_order_book
+        is only called when one of them changed. The whole book is compared if it is None.
+        
+        depth is how many orders of each side Cryptopia sends. The whole book is downloaded and
+        parsed on every poll if it is None. Strategies that only look at the best bid and ask
+        should use depth=1.
+        
         Pre: market_ticker is a String in Cryptopia's format
              poll_time is a positive integer
         '''
         
         self.on_order_book = on_order_book
         self.order_book_url = "https://www.cryptopia.co.nz/api/GetMarketOrders/" + market_ticker
+        if depth is not None:
+            self.order_book_url += "/" + str(depth)
         self.poll_time = poll_time
         self._time_started = 0
+        self.poller = poller
+        self.is_urgent = is_urgent
+        self.job = None
         
-        self.stop = False
+        self.top_levels = top_levels
+        self.fetcher = ConditionalFetcher(self.order_book_url)
+        self._last_top = None
+        # Polls that did not call on_order_book because the top of the book had not changed.
+        self.suppressed_updates = 0
+        
+        self._stop = False
         self.thread = None
 
+    def _poll(self):
+        # An unchanged body is not parsed again, but get_order_book() reads through the same
+        # fetcher so it may have seen the change first. Only the top of the book decides.
+        response = self.fetcher.fetch()[0]
+        order_book = response["Data"]
+        top = (_top(order_book["Buy"], self.top_levels), _top(order_book["Sell"], self.top_levels))
+        if top == self._last_top:
+            self.suppressed_updates += 1
+            return top
+        self._last_top = top
+        tick_trace.tracer.received("cryptopia")
+        self.on_order_book(order_book["Buy"], order_book["Sell"])
+        return top
+
     def start(self):
+        if self.poller is not None:
+            self.job = self.poller.add(self._poll, self.poll_time, is_urgent=self.is_urgent,
+                                       name="Cryptopia order book")
+            print("Started Cryptopia pipeline.")
+            return
+        
         def _go():
             last_time = 0
             while True:
-                if self.stop:
+                if self._stop:
                     print "Stopping Cryptopia pipeline."
                     break
                 elif time.time() - last_time >= self.poll_time:
                     last_time = time.time()
-                    order_book = self.get_order_book()
-                    self.on_order_book(order_book["Buy"], order_book["Sell"])
+                    self._poll()
 
         self.thread = Thread(target=_go)
-        self.stop = False
+        self._stop = False
         self.thread.start()
         print("Started Cryptopia pipeline.")
 
@@ -51,12 +98,14 @@ class CryptopiaPipeline(object):
                  the entries: "TradePairId", "Label", "Price", "Volume", and "Total"
         '''
 
-        data = requests.get(self.order_book_url).json()["Data"]
+        data = self.fetcher.fetch()[0]["Data"]
         return data
 
     def stop(self):
-        if not self.stop:
-            self.stop = True
+        if self.job is not None:
+            self.poller.remove(self.job)
+            self.job = None
+        self._stop = True
 
 if __name__ == "__main__":
     def on_order_book(bids, asks):
@@ -9,20 +9,22 @@ Note: Cryptopia's API does not have a way to check if an order was filled. Other
 @author: Tobias Carryer
 '''
 
-import hmac
 import hashlib
 import base64
-import time
 import requests
 import sys
 import urllib
 import json
 from decimal import Decimal, localcontext
 from cryptotrader import Trader, DefaultPosition
+from cryptotrader.request_signer import RequestSigner, NonceGenerator
+from cryptotrader.latency import timed_order_call
 from cryptopia_options import minimum_trade_for
 from cryptotrader.cryptopia.cryptopia_options import cryptopia_fee
 
 class CryptopiaTrader(Trader):
+    
+    exchange = "cryptopia"
         
     simulation_buy_order_id = "1234"
     simulation_sell_order_id = "4321"
@@ -46,6 +48,11 @@ class CryptopiaTrader(Trader):
         # Will be set to a number (order ID) when an order is placed.
         self._waiting_for_order_to_fill = None
         
+        # What the live order is spending (balance for a buy, assets for a sell) and its rate.
+        # Used to tell a filled order from a cancelled one once it is no longer open.
+        self._order_spending = Decimal(0)
+        self._order_rate = Decimal(0)
+        
         # In test mode: Is used to prevent the same transaction from being counted twice.
         self._last_simulation_transaction_check = 0
         
@@ -81,8 +88,14 @@ class CryptopiaTrader(Trader):
             
     def authenticate(self, api_key, api_secret):
         self.is_test = False
+        # Nonces and order timestamps are on the exchange's clock from now on.
+        self.clock.start()
         self.api_key = api_key
         self.api_secret = api_secret
+        self._signer = RequestSigner(api_secret, base64_secret=True,
+                                     nonce_generator=NonceGenerator(clock=self.clock.time))
+        # URLs are signed in lower case and URL encoded. There are only a few so remember them.
+        self._signed_urls = {}
         self.set_up_emergency_shutdown()
         self.fetch_balance_and_assets()
         if self.start_by_buying:
@@ -170,6 +183,7 @@ class CryptopiaTrader(Trader):
             else:
                 sys.stdout.write('wb ')
               
+    @timed_order_call("limit_buy_order", places_order=True)
     def limit_buy_order(self, market_value):
         url = "https://www.cryptopia.co.nz/api/SubmitTrade"
         post_data = json.dumps({"Market": self.market_ticker,
@@ -178,6 +192,8 @@ class CryptopiaTrader(Trader):
                      "Type": "Buy"})
         header = self.create_authenticated_header(url, post_data)
         r = requests.post(url, data=post_data, headers=header)
+        self._order_spending = self.balance
+        self._order_rate = market_value
         order_id = r.json()["Data"]["OrderId"]
         if order_id == None:
             # Order was already filled.
@@ -196,7 +212,7 @@ class CryptopiaTrader(Trader):
         
         # Only orders that matter are the ones that might fill us which can only
         # happen in the future.
-        self._last_simulation_transaction_check = time.time()
+        self._last_simulation_transaction_check = self.clock.time()
         
         self._active_buy_order = True
         
@@ -229,6 +245,7 @@ class CryptopiaTrader(Trader):
             else:
                 sys.stdout.write('ws ')
                 
+    @timed_order_call("limit_sell_order", places_order=True)
     def limit_sell_order(self, market_value):
         url = "https://www.cryptopia.co.nz/api/SubmitTrade"
         post_data = json.dumps({"Market": self.market_ticker,
@@ -238,6 +255,8 @@ class CryptopiaTrader(Trader):
         header = self.create_authenticated_header(url, post_data)
         
         r = requests.post(url, data=post_data, headers=header)
+        self._order_spending = self.assets
+        self._order_rate = market_value
         self._waiting_for_order_to_fill = r.json()["Data"]["OrderId"]
         self._active_sell_order = True
                 
@@ -254,7 +273,7 @@ class CryptopiaTrader(Trader):
         
         # Only orders that matter are the ones that might fill us which can only
         # happen in the future.
-        self._last_simulation_transaction_check = time.time()
+        self._last_simulation_transaction_check = self.clock.time()
         
         self._active_sell_order = True
             
@@ -301,7 +320,7 @@ class CryptopiaTrader(Trader):
                                 self._waiting_for_order_to_fill = None
                                 
             # Orders up to this moment have been processed, don't process them again.
-            self._last_simulation_transaction_check = time.time()
+            self._last_simulation_transaction_check = self.clock.time()
             
         else:
             
@@ -315,6 +334,14 @@ class CryptopiaTrader(Trader):
             if open_order == None:
                 # Order was filled or cancelled.
                 self.fetch_balance_and_assets()
+                if self._order_was_cancelled():
+                    print("The order was cancelled, likely because a human intervened.")
+                    self._active_buy_order = False
+                    self._active_sell_order = False
+                    self._waiting_for_order_to_fill = None
+                    self.abort()
+                    return
+                self.record_fill()
                 if self._active_buy_order == True:
                     self._active_buy_order = False
                     self.balance = Decimal(0)
@@ -325,6 +352,20 @@ class CryptopiaTrader(Trader):
             elif open_order["Remaining"] < open_order["Amount"]:
                 print("The order has been partially filled. Waiting until it is fully filled.")
     
+    def _order_was_cancelled(self):
+        '''
+        Pre: The live order is no longer open and the balance and assets were just fetched.
+        Returns: True if what the order was spending came back, i.e. it was cancelled instead of filled.
+        '''
+        
+        # The part of the exchange's balance the trader was not given stays where it was.
+        kept = self._order_spending * (Decimal(1) - self.percentage_to_trade)
+        if self._active_buy_order:
+            return self.balance - kept >= self.minimum_trade
+        elif self._active_sell_order:
+            return (self.assets - kept) * self._order_rate >= self.minimum_trade
+        return False
+    
     def hold(self, market_value):
         ''' Cancel any open orders and revert back to the default position depending on aggressiveness. '''
         
@@ -385,6 +426,7 @@ class CryptopiaTrader(Trader):
                 self._waiting_for_order_to_fill = None
                 self._active_buy_order = False
     
+    @timed_order_call("cancel_order")
     def cancel_order(self, order_id, market_ticker="NEO_BTC"):
         order_info = self.lookup_open_order(order_id, market_ticker)
         if order_info == None:
@@ -407,6 +449,7 @@ class CryptopiaTrader(Trader):
         self._waiting_for_order_to_fill = None
         print("CryptopiaTrader is shutting down.")
         
+    @timed_order_call("lookup_order")
     def lookup_open_order(self, order_id, market):
         url = "https://www.cryptopia.co.nz/api/GetOpenOrders"
         post_data = json.dumps({"Market": market})
@@ -443,10 +486,13 @@ class CryptopiaTrader(Trader):
     
     def create_authenticated_header(self, url, post_data):
         ''' Pre: API Key, client, and API secret have been set. '''
-        nonce = str(time.time()*100)
+        nonce = str(self._signer.next_nonce())
         rcb64 = base64.b64encode(hashlib.md5(post_data).digest())
-        signature = self.api_key + "POST" + urllib.quote_plus(url).lower() + nonce + rcb64
-        hmacsignature = base64.b64encode(hmac.new(base64.b64decode(self.api_secret), signature, hashlib.sha256).digest())
+        signed_url = self._signed_urls.get(url)
+        if signed_url is None:
+            signed_url = self.api_key + "POST" + urllib.quote_plus(url).lower()
+            self._signed_urls[url] = signed_url
+        hmacsignature = self._signer.base64digest(signed_url + nonce + rcb64)
         header_value = "amx " + self.api_key + ":" + hmacsignature + ":" + nonce
         return {'Authorization': header_value, 'Content-Type': 'application/json; charset=utf-8'}
     
\ No newline at end of file
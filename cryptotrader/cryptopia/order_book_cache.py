@@ -0,0 +1,174 @@
+'''
+Keeps the order books of every market on Cryptopia in memory.
+
+The McAfee pump and the fast market buy do not know which coin they will buy
+until the signal arrives. Fetching the book then means a new HTTPS connection
+and a full round trip on the critical path. An OrderBookCache instead refreshes
+the books of every market against one currency in batches
+(GetMarketOrderGroups) on a rolling schedule over one kept-alive connection,
+so the book a strategy needs is usually in memory and at most a few seconds
+old when the signal arrives.
+
+@author: Tobias Carryer
+'''
+
+import time
+from threading import Lock, Thread, local
+import requests
+
+API_URL = "https://www.cryptopia.co.nz/api/"
+
+class OrderBookCache(object):
+
+    def __init__(self, base_currency="BTC", order_count=100, markets_per_request=25,
+                 refresh_interval=2, markets_refresh_interval=600, max_age=30, order_max_age=3):
+        '''
+        base_currency is the currency every cached market is traded against.
+        order_count is how many bids and asks are kept for each market.
+        markets_per_request is how many markets are fetched in one request.
+        refresh_interval is how many seconds it takes to refresh every market once. It is kept
+        below order_max_age so get_asks() answers from memory.
+        markets_refresh_interval is how many seconds to wait before looking for new markets.
+        max_age is how many seconds old a book can be before get_order_book() fetches it again
+        instead of answering from memory.
+        order_max_age is the same for get_asks(), which strategies price their orders from. It is
+        tight since the asks move fast while a coin is being pumped, and leaves refresh_interval
+        plus the time of a request so a book refreshed on schedule is still fresh enough.
+        '''
+
+        self.base_currency = base_currency
+        self.order_count = order_count
+        self.markets_per_request = markets_per_request
+        self.refresh_interval = refresh_interval
+        self.markets_refresh_interval = markets_refresh_interval
+        self.max_age = max_age
+        self.order_max_age = order_max_age
+
+        # A session keeps the connection to Cryptopia open between requests. requests.Session
+        # is not thread safe, so the refresh thread and the strategies each get their own.
+        self._sessions = local()
+
+        self.markets = []
+        self._books = {}   # market -> {"Buy": [...], "Sell": [...]}
+        self._fetched = {} # market -> time.time() when its book was fetched
+
+        self._lock = Lock()
+        self._thread = None
+        self._stop = False
+
+    def _session(self):
+        session = getattr(self._sessions, "session", None)
+        if session is None:
+            session = requests.Session()
+            self._sessions.session = session
+        return session
+
+    def _get(self, path):
+        response = self._session().get(API_URL + path).json()
+        if not response["Success"]:
+            raise Warning("Cryptopia could not return " + path + ": " + str(response["Message"]))
+        return response["Data"]
+
+    def load_markets(self):
+        '''
+        Post: self.markets is every market traded against base_currency, e.g. "ETH_BTC"
+        '''
+
+        markets = self._get("GetMarkets/" + self.base_currency)
+        self.markets = sorted(market["Label"].replace("/", "_") for market in markets)
+
+    def _store(self, market, book, fetched):
+        with self._lock:
+            self._books[market] = {"Buy": book["Buy"] or [], "Sell": book["Sell"] or []}
+            self._fetched[market] = fetched
+
+    def refresh(self, markets):
+        '''
+        Post: The books of markets are fetched in one request and stored.
+        '''
+
+        fetched = time.time()
+        groups = self._get("GetMarketOrderGroups/" + "-".join(markets) + "/" + str(self.order_count))
+        for group in groups:
+            self._store(group["Market"], group, fetched)
+
+    def fetch(self, market):
+        '''
+        Returns: The book of market fetched now, over the kept-alive connection.
+        '''
+
+        market = market.upper()
+        fetched = time.time()
+        book = self._get("GetMarketOrders/" + market + "/" + str(self.order_count))
+        self._store(market, book, fetched)
+        return self._books[market]
+
+    def age(self, market):
+        ''' Returns: How many seconds old market's book is, None if it has not been fetched. '''
+        fetched = self._fetched.get(market.upper())
+        return None if fetched is None else time.time() - fetched
+
+    def get_order_book(self, market, max_age=None):
+        '''
+        market is in Cryptopia's format, e.g. "ETH_BTC", in any case.
+        Returns: A dictionary with the entries "Buy" and "Sell", the same as
+                 CryptopiaPipeline.get_order_book(). From memory unless the book is
+                 missing or older than max_age, self.max_age if it is None.
+        '''
+
+        if max_age is None:
+            max_age = self.max_age
+        market = market.upper()
+        age = self.age(market)
+        if age is None or age > max_age:
+            return self.fetch(market)
+        return self._books[market]
+
+    def get_asks(self, market):
+        '''
+        Returns: The asks to price an order from, no more than order_max_age seconds old.
+        '''
+        return self.get_order_book(market, self.order_max_age)["Sell"]
+
+    def _batches(self):
+        return [self.markets[i:i + self.markets_per_request]
+                for i in range(0, len(self.markets), self.markets_per_request)]
+
+    def start(self):
+        '''
+        Post: Every market's book is refreshed once every refresh_interval seconds in a
+              background thread, one batch at a time spread over the interval.
+        '''
+
+        def _go():
+            markets_loaded = None
+            while not self._stop:
+                try:
+                    if markets_loaded is None or time.time() - markets_loaded >= self.markets_refresh_interval:
+                        self.load_markets()
+                        markets_loaded = time.time()
+                    batches = self._batches()
+                    if not batches:
+                        time.sleep(self.refresh_interval)
+                    for batch in batches:
+                        if self._stop:
+                            break
+                        started = time.time()
+                        self.refresh(batch)
+                        time.sleep(max(0, self.refresh_interval / float(len(batches)) - (time.time() - started)))
+                except Exception as e:
+                    # Keep the books already in memory and try again.
+                    print("Could not refresh Cryptopia's order books: " + str(e))
+                    time.sleep(1)
+
+        if self._thread is not None:
+            return
+        self._stop = False
+        self._thread = Thread(target=_go)
+        self._thread.daemon = True
+        self._thread.start()
+        print("Started caching Cryptopia's order books.")
+
+    def stop(self):
+        self._stop = True
+        self._thread = None
@@ -5,12 +5,12 @@ Loads data from GDAX.
 '''
 
 import json
-import time
-from threading import Thread
 import urllib2
+from Queue import Queue, Empty
+from threading import Thread
 
-#Requires websocket-client from https://github.com/websocket-client/websocket-client
-from cryptotrader.librariesrequired.websocket import create_connection, WebSocketConnectionClosedException
+from cryptotrader.streaming import ManagedWebSocket
+from cryptotrader.latency import tick_trace
 
 def load_historical_data():
         '''
@@ -49,14 +49,15 @@ def load_historical_data():
         return [values, timestamps]
     
 class GDAXPipeline(object):
-    def __init__(self, on_market_value, product, minutes_to_reset=15):
+    def __init__(self, on_market_value, product, minutes_to_reset=15, multiplexer=None):
         '''
-        on_data_point is called every time a new data point is received from the websocket.
-        on_data_point should have 2 parameters, websocket, and message.
-        message["price"] can be used to get the currency price of product.
+        on_market_value is called with the price of product every time GDAX sends a heartbeat.
         
-        minutes_to_reset is used to force a disconnect and reconnect to the websocket
-        every so many minutes
+        minutes_to_reset is how often the websocket is replaced. The replacement is connected
+        before the old one is closed so no messages are missed.
+        
+        multiplexer is a started WebSocketMultiplexer to share with other pipelines.
+        The pipeline reads its websocket on its own thread if it is None.
         
         Pre: product is not a list
              minutes_to_reset is positive
@@ -64,78 +65,87 @@ class GDAXPipeline(object):
         
         self.on_market_value = on_market_value
         self.url = "wss://ws-feed.gdax.com"
-        self.product = product.lower()
+        self.product = [product.lower()]
         self.seconds_to_reset = minutes_to_reset * 60 #Time in seconds
-        self._time_started = 0
         
-        self.stop = False
-        self.ws = None
-        self.thread = None
+        self.ws = ManagedWebSocket(self.url, self._on_message, self._subscribe,
+                                   sequence_of=self._sequence_of, name="GDAXPipeline",
+                                   rotate_after=self.seconds_to_reset,
+                                   # The feed is trusted so its text is not checked for valid UTF-8,
+                                   # and asking for compression shrinks the larger updates.
+                                   connection_options={"enable_compression": True,
+                                                       "skip_utf8_validation": True},
+                                   multiplexer=multiplexer)
+        
+        # Heartbeats are queued for this thread. Fetching the price on the websocket's thread
+        # would hold up every other feed on a shared multiplexer for a whole HTTP round trip.
+        self._heartbeats = Queue()
+        self._stopped = False
+        self._ticker_thread = Thread(target=self._fetch_tickers, name="GDAXPipeline ticker")
+        self._ticker_thread.daemon = True
 
     def start(self):
-        def _go():
-            self._connect()
-            self._listen()
-
-        self.thread = Thread(target=_go)
-        self.thread.start()
+        self._ticker_thread.start()
+        self.ws.start()
         print("Started GDAX pipeline. Uses GDAX's websocket API.")
 
-    def _connect(self):
-        '''
-        Post: self.ws is not None
-              self.stop == False
-        '''
+    def _subscribe(self, ws):
+        ws.send(json.dumps({'type': 'subscribe', 'product_ids': self.product}))
+        ws.send(json.dumps({"type": "heartbeat", "on": True}))
+
+    @staticmethod
+    def _sequence_of(msg):
+        # GDAX numbers every message of a product, heartbeats included.
+        if "sequence" in msg and "product_id" in msg:
+            return (msg["product_id"], msg["sequence"])
+        return None
         
-        if not isinstance(self.product, list):
-            self.product = [self.product]
-        sub_params = {'type': 'subscribe', 'product_ids': self.product}
+    def _on_message(self, msg):
+        if msg["type"] == "heartbeat":
+            self._heartbeats.put(None)
+        elif msg["type"] == "error":
+            print(msg["message"])
+            print("CLOSING WEBSOCKET")
+            self.close()
 
-        self.ws = create_connection(self.url)
-        self.ws.send(json.dumps(sub_params))
-        self.ws.send(json.dumps({"type": "heartbeat", "on": True}))
-        self._time_started = int(time.time())
-        self.stop = False
+    def _fetch_tickers(self):
+        '''
+        Post: on_market_value is called once for every heartbeat until close(). Heartbeats that
+              arrive while a fetch is in flight are answered with the price it fetched, so a
+              slow fetch does not lose data points.
+        '''
         
-    def _listen(self):
-        while not self.stop:
-            #Force websocket reset every given amount of time
-            if int(time.time()) - self._time_started >= self.seconds_to_reset:
-                print("GDAXPipeline: Forcing websocket reconnect.")
-                self.close()
-                self._connect()
-            else:
+        while not self._stopped:
+            try:
+                self._heartbeats.get(timeout=1)
+            except Empty:
+                continue
+            if self._stopped:
+                break
+            try:
+                #Get the ticker price
+                ticker = urllib2.urlopen("https://api.gdax.com/products/"+self.product[0]+"/ticker").read()
+                market_value = json.loads(ticker)["price"]
+            except Exception as e:
+                print("GDAXPipeline: Could not fetch the ticker: " + str(e))
+                continue
+            tick_trace.tracer.received("gdax")
+            
+            #The same value is likely to be sent multiple times so there are
+            #60 data points per minute
+            answered = 1
+            while True:
                 try:
-                    if int(time.time() % 30) == 0:
-                        # Set a 30 second ping to keep connection alive
-                        self.ws.ping("keepalive")
-                    msg = json.loads(self.ws.recv())
-                except Exception as e:
-                    print(e)
-                else:
-                    
-                    if msg["type"] == "heartbeat":
-                        #Get the ticker price
-                        ticker = urllib2.urlopen("https://api.gdax.com/products/"+self.product[0]+"/ticker").read()
-                        market_value = json.loads(ticker)["price"]
-                        
-                        #The same value is likely to be sent multiple times so there are
-                        #60 data points per minute
-                        self.on_market_value(float(market_value))
-                    elif msg["type"] == "error":
-                        print(msg["message"])
-                        print("CLOSING WEBSOCKET")
-                        self.close()
+                    self._heartbeats.get_nowait()
+                    answered += 1
+                except Empty:
+                    break
+            for _ in range(answered):
+                self.on_market_value(float(market_value))
 
     def close(self):
-        if not self.stop:
-            self.stop = True
-            try:
-                if self.ws:
-                    self.ws.send(json.dumps({"type": "heartbeat", "on": False}))
-                    self.ws.close()
-            except WebSocketConnectionClosedException as e:
-                print("WebSocketConnectionClosedException: " + e)
+        self._stopped = True
+        self.ws.stop()
 
 if __name__ == "__main__":
     def on_market_value(value):
@@ -1,4 +1,66 @@
 from decimal import Decimal
 from math import floor
 def quantity_adjusted_for_decimals(quantity):
-    return Decimal(floor(quantity * Decimal(100000000))) / Decimal(100000000)
\ No newline at end of file
+    return Decimal(floor(quantity * Decimal(100000000))) / Decimal(100000000)
+
+def _clock_gettime_monotonic():
+    '''
+    Returns: A monotonic clock read with clock_gettime(CLOCK_MONOTONIC) through ctypes,
+             None if the platform does not have one.
+    '''
+    import ctypes
+    import ctypes.util
+    import sys
+
+    if not sys.platform.startswith("linux"):
+        return None
+
+    class timespec(ctypes.Structure):
+        _fields_ = [("tv_sec", ctypes.c_long), ("tv_nsec", ctypes.c_long)]
+
+    CLOCK_MONOTONIC = 1
+    try:
+        library = ctypes.CDLL(ctypes.util.find_library("rt") or ctypes.util.find_library("c"), use_errno=True)
+        clock_gettime = library.clock_gettime
+    except (OSError, AttributeError):
+        return None
+    clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(timespec)]
+
+    def monotonic():
+        t = timespec()
+        if clock_gettime(CLOCK_MONOTONIC, ctypes.byref(t)) != 0:
+            raise OSError(ctypes.get_errno(), "clock_gettime failed")
+        return t.tv_sec + t.tv_nsec * 1e-9
+    return monotonic
+
+def _never_backwards(clock):
+    '''
+    Returns: clock, held at the last value it returned when it goes backwards. Deltas are then
+             0 instead of negative when the wall clock is stepped back, but a step forward
+             still shows up in them.
+    '''
+    from threading import Lock
+    lock = Lock()
+    last = [clock()]
+
+    def monotonic():
+        with lock:
+            now = clock()
+            if now < last[0]:
+                now = last[0]
+            last[0] = now
+            return now
+    return monotonic
+
+# Python 2 has no monotonic clock in the standard library. The monotonic package is used
+# if it is installed, then clock_gettime on Linux, and the wall clock as a last resort.
+try:
+    from time import monotonic
+except ImportError:
+    try:
+        from monotonic import monotonic
+    except ImportError:
+        monotonic = _clock_gettime_monotonic()
+        if monotonic is None:
+            from time import time as _wall_clock
+            monotonic = _never_backwards(_wall_clock)
@@ -1,11 +1,17 @@
 import requests
 from decimal import Decimal, localcontext
 from cryptotrader.tradesignals.indicators.coinmarketcap_price import get_coinmarketcap_price
-from cryptotrader.bittrex.bittrex_operator import minor_currency
-import matplotlib.pyplot as plt
+from cryptotrader.lazy_import import LazyModule
+from cryptotrader.tradesignals.indicators.depth import DepthBook, BIDS, ASKS
 import csv
 from time import time
 
+# matplotlib is only imported when something is plotted.
+plt = LazyModule("matplotlib.pyplot")
+
+# The currency the sums are measured in.
+minor_currency = "BTC"
+
 class Exchange:
     GDAX = 10
     BINANCE = 20
@@ -140,184 +146,52 @@ def get_hitbtc_orderbook(major_currency, minor_currency):
     orderbook = requests.get("https://api.hitbtc.com/api/2/public/orderbook/"+ticker, params=params).json()
     return Orderbook(orderbook["bid"], orderbook["ask"])
 
+# Where to get each exchange's order book, what to catch when the coin is not listed,
+# and the keys of the price and quantity in its entries.
+ORDERBOOK_SOURCES = [
+    ("GDAX", get_gdax_orderbook, KeyError, 0, 1),
+    ("Bittrex", get_bittrex_orderbook, (KeyError, TypeError), "Rate", "Quantity"),
+    ("Binance", get_binance_orderbook, KeyError, 0, 1),
+    ("Kucoin", get_kucoin_orderbook, KeyError, 0, 1),
+    ("Cryptopia", get_cryptopia_orderbook, (KeyError, TypeError), "Price", "Volume"),
+    ("Bitfinex", get_bitfinex_orderbook, KeyError, "price", "amount"),
+    ("Bit-Z", get_bitz_orderbook, (KeyError, TypeError), 0, 1),
+    ("YoBit", get_yobit_orderbook, KeyError, 0, 1),
+    ("HitBTC", get_hitbtc_orderbook, KeyError, "price", "size"),
+]
+
+def get_depth_books(major_currency="ETH", minor_currency="BTC"):
+    '''
+    :returns: A dictionary of exchange name -> DepthBook for every exchange that lists the coin.
+    '''
+    # Collect the order books at the start for an accurate snapshot.
+    # Requesting them, processing, then going to the next exchange
+    # would mean different exchanges are queried at increasingly
+    # different times.
+    orderbooks = []
+    for name, get_orderbook, not_listed, price_key, quantity_key in ORDERBOOK_SOURCES:
+        try:
+            orderbooks.append((name, get_orderbook(major_currency, minor_currency), price_key, quantity_key))
+        except not_listed:
+            print(major_currency+"/"+minor_currency+" is not listed on "+name+".")
+
+    return dict((name, DepthBook.from_entries(orderbook.bids, orderbook.asks, price_key, quantity_key))
+                for name, orderbook, price_key, quantity_key in orderbooks)
+
 def get_sum_of_bids_and_asks(lowest_price=Decimal(0), highest_price=Decimal(10000000), major_currency="ETH", minor_currency="BTC"):
+    '''
+    :returns: (bids_sum, asks_sum) - the minor currency placed in bids at or above lowest_price
+              and in asks at or below highest_price, over every exchange.
+    '''
+    bids_sum = 0.0 # Measured in the minor currency
+    asks_sum = 0.0
+    for book in get_depth_books(major_currency, minor_currency).values():
+        bids_sum += book.value_within(BIDS, float(lowest_price))
+        asks_sum += book.value_within(ASKS, float(highest_price))
+
     with localcontext() as context:
         context.prec = 10
-    
-        # Collect the bids at the start for an accurate snapshot.
-        # Requesting them, processing, then going to the next exchange
-        # would mean different exchanges are queried at increasingly
-        # different times.
-        try:
-            gdax_orderbook = get_gdax_orderbook(major_currency, minor_currency)
-        except KeyError:
-            print(major_currency+"/"+minor_currency+" is not listed on GDAX.")
-        try:   
-            bittrex_orderbook = get_bittrex_orderbook(major_currency, minor_currency)
-        except (KeyError, TypeError):
-            print(major_currency+"/"+minor_currency+" is not listed on Bittrex.")
-        try:
-            binance_orderbook = get_binance_orderbook(major_currency, minor_currency)
-        except KeyError:
-            print(major_currency+"/"+minor_currency+" is not listed on Binance.")
-        try:
-            kucoin_orderbook = get_kucoin_orderbook(major_currency, minor_currency)
-        except KeyError:
-            print(major_currency+"/"+minor_currency+" is not listed on Kucoin.")
-        try:
-            cryptopia_orderbook = get_cryptopia_orderbook(major_currency, minor_currency)
-        except (KeyError, TypeError):
-            print(major_currency+"/"+minor_currency+" is not listed on Cryptopia.")
-        try:
-            bitfinex_orderbook = get_bitfinex_orderbook(major_currency, minor_currency)
-        except KeyError:
-            print(major_currency+"/"+minor_currency+" is not listed on Bitfinex.")
-        try:
-            bitz_orderbook = get_bitz_orderbook(major_currency, minor_currency)
-        except (KeyError, TypeError):
-            print(major_currency+"/"+minor_currency+" is not listed on Bit-Z.")
-        try:
-            yobit_orderbook = get_yobit_orderbook(major_currency, minor_currency)
-        except KeyError:
-            print(major_currency+"/"+minor_currency+" is not listed on YoBit.")
-        try:
-            hitbtc_orderbook = get_hitbtc_orderbook(major_currency, minor_currency)
-        except KeyError:
-            print(major_currency+"/"+minor_currency+" is not listed on HitBTC.")
-        
-        # Get the total minor currency placed in the bids portion of the orderbook.
-        bids_sum = Decimal(0) # Measured in the minor currency
-        try:
-            for bid in gdax_orderbook.bids:
-                price = Decimal(bid[0])
-                if price >= lowest_price:
-                    bids_sum += price * Decimal(bid[1])
-        except UnboundLocalError:
-            pass # Coin is not listed on an exchange so orderbook doesn't exist.
-        try:
-            for bid in bittrex_orderbook.bids:
-                price = Decimal(bid["Rate"])
-                if price >= lowest_price:
-                    bids_sum += Decimal(bid["Quantity"]) * price
-        except UnboundLocalError:
-            pass # Coin is not listed on an exchange so orderbook doesn't exist.
-        try:
-            for bid in binance_orderbook.bids:
-                price = Decimal(bid[0])
-                if price >= lowest_price:
-                    bids_sum += Decimal(bid[1]) * price
-        except UnboundLocalError:
-            pass # Coin is not listed on an exchange so orderbook doesn't exist.
-        try:
-            for bid in kucoin_orderbook.bids:
-                price = Decimal(bid[0])
-                if price >= lowest_price:
-                    bids_sum += Decimal(bid[2])
-        except UnboundLocalError:
-            pass # Coin is not listed on an exchange so orderbook doesn't exist.
-        try:
-            for bid in cryptopia_orderbook.bids:
-                price = Decimal(bid["Price"])
-                if price >= lowest_price:
-                    bids_sum += Decimal(bid["Total"]) # == to Volume * Price
-        except UnboundLocalError:
-            pass # Coin is not listed on an exchange so orderbook doesn't exist.
-        try:
-            for bid in bitfinex_orderbook.bids:
-                price = Decimal(bid["price"])
-                if price >= lowest_price:
-                    bids_sum += Decimal(bid["amount"]) * price
-        except UnboundLocalError:
-            pass # Coin is not listed on an exchange so orderbook doesn't exist.
-        try:
-            for bid in bitz_orderbook.bids:
-                price = Decimal(bid[0])
-                if price >= lowest_price:
-                    bids_sum += Decimal(bid[1]) * price
-        except UnboundLocalError:
-            pass # Coin is not listed on an exchange so orderbook doesn't exist.
-        try:
-            for bid in yobit_orderbook.bids:
-                price = Decimal(bid[0])
-                if price >= lowest_price:
-                    bids_sum += Decimal(bid[1]) * price
-        except UnboundLocalError:
-            pass # Coin is not listed on an exchange so orderbook doesn't exist.
-        try:
-            for bid in hitbtc_orderbook.bids:
-                price = Decimal(bid["price"])
-                if price >= lowest_price:
-                    bids_sum += Decimal(bid["size"]) * price
-        except UnboundLocalError:
-            pass # Coin is not listed on an exchange so orderbook doesn't exist.
-        
-        # Get the total minor currency placed in the asks portion of the orderbook.
-        asks_sum = Decimal(0) # Measured in the minor currency
-        try:
-            for bid in gdax_orderbook.asks:
-                price = Decimal(bid[0])
-                if price <= highest_price:
-                    asks_sum += price * Decimal(bid[1])
-        except UnboundLocalError:
-            pass # Coin is not listed on an exchange so orderbook doesn't exist.
-        try:
-            for bid in bittrex_orderbook.asks:
-                price = Decimal(bid["Rate"])
-                if price <= highest_price:
-                    asks_sum += Decimal(bid["Quantity"]) * price
-        except UnboundLocalError:
-            pass # Coin is not listed on an exchange so orderbook doesn't exist.
-        try:
-            for bid in binance_orderbook.asks:
-                price = Decimal(bid[0])
-                if price <= highest_price:
-                    asks_sum += Decimal(bid[1]) * price
-        except UnboundLocalError:
-            pass # Coin is not listed on an exchange so orderbook doesn't exist.
-        try:
-            for bid in kucoin_orderbook.asks:
-                price = Decimal(bid[0])
-                if price <= highest_price:
-                    asks_sum += Decimal(bid[2])
-        except UnboundLocalError:
-            pass # Coin is not listed on an exchange so orderbook doesn't exist.
-        try:
-            for bid in cryptopia_orderbook.asks:
-                price = Decimal(bid["Price"])
-                if price <= highest_price:
-                    asks_sum += Decimal(bid["Total"]) # == to Volume * Price
-        except UnboundLocalError:
-            pass # Coin is not listed on an exchange so orderbook doesn't exist.
-        try:
-            for bid in bitfinex_orderbook.asks:
-                price = Decimal(bid["price"])
-                if price <= highest_price:
-                    asks_sum += Decimal(bid["amount"]) * price
-        except UnboundLocalError:
-            pass # Coin is not listed on an exchange so orderbook doesn't exist.
-        try:
-            for bid in bitz_orderbook.asks:
-                price = Decimal(bid[0])
-                if price <= highest_price:
-                    asks_sum += Decimal(bid[1]) * price
-        except UnboundLocalError:
-            pass # Coin is not listed on an exchange so orderbook doesn't exist.
-        try:
-            for bid in yobit_orderbook.asks:
-                price = Decimal(bid[0])
-                if price <= highest_price:
-                    asks_sum += Decimal(bid[1]) * price
-        except UnboundLocalError:
-            pass # Coin is not listed on an exchange so orderbook doesn't exist.
-        try:
-            for bid in hitbtc_orderbook.asks:
-                price = Decimal(bid["price"])
-                if price <= highest_price:
-                    asks_sum += Decimal(bid["size"]) * price
-        except UnboundLocalError:
-            pass # Coin is not listed on an exchange so orderbook doesn't exist.
-    
-    return (bids_sum, asks_sum)
+        return (+Decimal(repr(bids_sum)), +Decimal(repr(asks_sum)))
 
 def append_to_historical_orderbook_data(coin_name, bids_sum, asks_sum,price):
     with open(coin_name+'_orderbook_sum_history.csv', 'a') as history_file:
@@ -0,0 +1,4 @@
+from cryptotrader.latency.histogram import LatencyHistogram
+from cryptotrader.latency.order_latency import LatencyRecorder, recorder, timed_order_call
+from cryptotrader.latency.order_latency import SIGNAL_TO_SEND, SEND_TO_ACK, ACK_TO_FILL
+from cryptotrader.latency.tick_trace import TickTracer, tracer
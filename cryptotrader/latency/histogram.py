@@ -0,0 +1,113 @@
+'''
+A latency histogram in the style of HdrHistogram.
+
+Values are counted in log-linear buckets: every power of two is split into the
+same number of linear sub-buckets, so the relative error of a reported value is
+bounded no matter how large it is. Recording is a few integer operations and
+memory does not grow with the number of values recorded.
+
+@author: Tobias Carryer
+'''
+
+# 2^8 sub-buckets makes a bucket at most 1/128 as wide as the values in it, which keeps
+# the reported values within 1% of the recorded ones.
+SUB_BUCKET_BITS = 8
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+SUB_BUCKET_HALF_COUNT = SUB_BUCKET_COUNT >> 1
+
+# Latencies are recorded in whole microseconds.
+MICROSECONDS_PER_SECOND = 1000000
+
+def _bucket_index(value):
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    if shift <= 0:
+        return value
+    return shift * SUB_BUCKET_HALF_COUNT + (value >> shift)
+
+def _lowest_value_in_bucket(index):
+    shift = index // SUB_BUCKET_HALF_COUNT - 1
+    if shift <= 0:
+        return index
+    return (index - shift * SUB_BUCKET_HALF_COUNT) << shift
+
+def _highest_value_in_bucket(index):
+    return _lowest_value_in_bucket(index + 1) - 1
+
+class LatencyHistogram(object):
+
+    def __init__(self, highest_trackable_seconds=60):
+        '''
+        Values above highest_trackable_seconds are counted as highest_trackable_seconds.
+        '''
+
+        self.highest_trackable_value = int(highest_trackable_seconds * MICROSECONDS_PER_SECOND)
+        self._counts = [0] * (_bucket_index(self.highest_trackable_value) + 1)
+        self.reset()
+
+    def reset(self):
+        for i in range(len(self._counts)):
+            self._counts[i] = 0
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def record(self, seconds):
+        '''
+        Pre: seconds is not negative.
+        '''
+
+        value = int(seconds * MICROSECONDS_PER_SECOND)
+        if value < 0:
+            value = 0
+        elif value > self.highest_trackable_value:
+            value = self.highest_trackable_value
+
+        self._counts[_bucket_index(value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        '''
+        Post: Every value recorded in other is counted in this histogram.
+        Pre: other has the same highest_trackable_value.
+        '''
+
+        for i, bucket_count in enumerate(other._counts):
+            self._counts[i] += bucket_count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+
+    def percentile(self, percentile):
+        '''
+        percentile is between 0 and 100.
+        Returns: The latency in seconds that percentile of the recorded values are at or below.
+                 None if nothing was recorded.
+        '''
+
+        if self.count == 0:
+            return None
+
+        count_at_percentile = max(1, int(percentile / 100.0 * self.count + 0.5))
+        running_count = 0
+        for i, bucket_count in enumerate(self._counts):
+            running_count += bucket_count
+            if running_count >= count_at_percentile:
+                value = min(_highest_value_in_bucket(i), self.max)
+                return float(max(value, self.min)) / MICROSECONDS_PER_SECOND
+
+    def mean(self):
+        if self.count == 0:
+            return None
+        return float(self.total) / self.count / MICROSECONDS_PER_SECOND
+
+    def sum(self):
+        return float(self.total) / MICROSECONDS_PER_SECOND
@@ -0,0 +1,186 @@
+'''
+Measures how long it takes traders to place, look up and cancel orders.
+
+Three stages are measured for every exchange and endpoint:
+    signal_to_send: from a strategy's signal reaching the trader to the request being sent.
+    send_to_ack: from the request being sent to the exchange's response.
+    ack_to_fill: from the exchange accepting an order to the trader seeing it filled.
+
+@author: Tobias Carryer
+'''
+
+import os
+import time
+from functools import wraps
+from threading import Lock, Thread
+from contextlib import contextmanager
+from cryptotrader import clock_sync
+from cryptotrader.helper_methods import monotonic
+from cryptotrader.latency.histogram import LatencyHistogram
+from cryptotrader.latency import tick_trace
+
+SIGNAL_TO_SEND = "signal_to_send"
+SEND_TO_ACK = "send_to_ack"
+ACK_TO_FILL = "ack_to_fill"
+
+REPORTED_PERCENTILES = [50, 90, 99, 99.9]
+
+PROMETHEUS_METRIC = "cryptotrader_order_latency_seconds"
+
+class LatencyRecorder(object):
+
+    def __init__(self):
+        # (exchange, endpoint, stage) -> LatencyHistogram
+        self._histograms = {}
+        self._lock = Lock()
+        self._export_thread = None
+        self._stop_exporting = False
+
+    def record(self, exchange, endpoint, stage, seconds):
+        key = (exchange, endpoint, stage)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = LatencyHistogram()
+                self._histograms[key] = histogram
+            histogram.record(seconds)
+
+    @contextmanager
+    def measure(self, exchange, endpoint, stage=SEND_TO_ACK):
+        '''
+        Records how long the body of the with statement takes.
+        Nothing is recorded if the body raises an exception.
+        '''
+
+        started = monotonic()
+        yield
+        self.record(exchange, endpoint, stage, monotonic() - started)
+
+    def histogram(self, exchange, endpoint, stage):
+        '''
+        Returns: A copy of the histogram so it can be read while traders keep recording.
+                 None if nothing was recorded for the exchange, endpoint and stage.
+        '''
+
+        with self._lock:
+            histogram = self._histograms.get((exchange, endpoint, stage))
+            if histogram is None:
+                return None
+            snapshot = LatencyHistogram()
+            snapshot.merge(histogram)
+            return snapshot
+
+    def _snapshots(self):
+        with self._lock:
+            keys = sorted(self._histograms.keys())
+        return [(key, self.histogram(*key)) for key in keys]
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+
+    def summary(self):
+        '''
+        Returns: A human readable table of the latency percentiles in milliseconds.
+        '''
+
+        lines = ["%-12s %-18s %-15s %7s %9s %9s %9s %9s %9s" % (("exchange", "endpoint", "stage", "count", "mean")
+                                                                 + tuple("p%s" % p for p in REPORTED_PERCENTILES))]
+        for (exchange, endpoint, stage), histogram in self._snapshots():
+            milliseconds = [histogram.mean()] + [histogram.percentile(p) for p in REPORTED_PERCENTILES]
+            lines.append("%-12s %-18s %-15s %7d" % (exchange, endpoint, stage, histogram.count)
+                         + "".join(" %9.1f" % (seconds * 1000) for seconds in milliseconds))
+        return "\n".join(lines)
+
+    def prometheus_text(self):
+        '''
+        Returns: The latencies in Prometheus' text exposition format, as a summary per
+                 exchange, endpoint and stage.
+        '''
+
+        lines = ["# HELP %s Order request latency by exchange, endpoint and stage." % PROMETHEUS_METRIC,
+                 "# TYPE %s summary" % PROMETHEUS_METRIC]
+        for (exchange, endpoint, stage), histogram in self._snapshots():
+            labels = 'exchange="%s",endpoint="%s",stage="%s"' % (exchange, endpoint, stage)
+            for p in REPORTED_PERCENTILES:
+                lines.append('%s{%s,quantile="%s"} %.6f' % (PROMETHEUS_METRIC, labels, p / 100.0, histogram.percentile(p)))
+            lines.append("%s_sum{%s} %.6f" % (PROMETHEUS_METRIC, labels, histogram.sum()))
+            lines.append("%s_count{%s} %d" % (PROMETHEUS_METRIC, labels, histogram.count))
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        '''
+        Writes prometheus_text() and the exchange clock offsets to path. The file is replaced
+        in one step so a scraper (e.g. node_exporter's textfile collector) never reads half a file.
+        '''
+
+        temporary_path = path + ".tmp"
+        with open(temporary_path, "w") as f:
+            f.write(self.prometheus_text())
+            f.write(clock_sync.prometheus_text())
+        try:
+            os.rename(temporary_path, path)
+        except OSError:
+            # Windows will not rename over an existing file.
+            os.remove(path)
+            os.rename(temporary_path, path)
+
+    def start_periodic_export(self, interval=60, prometheus_path=None, print_summary=True):
+        '''
+        Post: Every interval seconds the summary is printed and/or the Prometheus file is written.
+        '''
+
+        def _export():
+            last_export = time.time()
+            while not self._stop_exporting:
+                time.sleep(1)
+                if time.time() - last_export >= interval:
+                    last_export = time.time()
+                    if print_summary:
+                        print(self.summary())
+                    if prometheus_path is not None:
+                        self.write_prometheus(prometheus_path)
+
+        self._stop_exporting = False
+        self._export_thread = Thread(target=_export)
+        self._export_thread.daemon = True
+        self._export_thread.start()
+
+    def stop_periodic_export(self):
+        self._stop_exporting = True
+
+# Traders record into this recorder unless they are given their own.
+recorder = LatencyRecorder()
+
+def timed_order_call(endpoint, places_order=False):
+    '''
+    Decorates a Trader method that sends a request to the exchange.
+
+    The time the request took is recorded as send_to_ack. If places_order is True,
+    the time since the trader was signalled is recorded as signal_to_send and the
+    acknowledgement time is kept so the fill can be measured by Trader.record_fill().
+
+    Pre: The method belongs to a Trader.
+    '''
+
+    def decorator(method):
+        @wraps(method)
+        def timed(trader, *args, **kwargs):
+            latency_recorder = trader.latency_recorder
+            sent_at = monotonic()
+            if places_order and trader.signal_time is not None:
+                latency_recorder.record(trader.exchange, endpoint, SIGNAL_TO_SEND, sent_at - trader.signal_time)
+                trader.signal_time = None
+            tick_trace.tracer.mark(tick_trace.SENT)
+
+            result = method(trader, *args, **kwargs)
+
+            acknowledged_at = monotonic()
+            tick_trace.tracer.mark(tick_trace.ACKNOWLEDGED)
+            latency_recorder.record(trader.exchange, endpoint, SEND_TO_ACK, acknowledged_at - sent_at)
+            if places_order:
+                trader.order_acknowledged_at = acknowledged_at
+                trader.order_endpoint = endpoint
+            return result
+        return timed
+    return decorator
@@ -0,0 +1,145 @@
+'''
+Traces how long a market event takes to travel from a pipeline to a trader's request.
+
+A pipeline calls tracer.received() when data arrives. The strategy, observer and
+trader run on the pipeline's thread, so each of them marks its stage on the trace
+belonging to the current thread without the trace being passed around.
+
+Traces are kept in a preallocated ring buffer so tracing does not allocate on the
+hot path. Call tracer.dump() (or send SIGUSR1 after install_dump_signal()) to see
+where the time went.
+
+@author: Tobias Carryer
+'''
+
+import itertools
+import signal
+from threading import local
+from cryptotrader.helper_methods import monotonic
+from cryptotrader.latency.histogram import LatencyHistogram
+
+RECEIVED = "received"           # A pipeline received market data.
+STRATEGY = "strategy"           # A strategy started processing the data.
+NOTIFIED = "notified"           # The strategy notified its observers.
+SENT = "sent"                   # A trader is sending its request to the exchange.
+ACKNOWLEDGED = "acknowledged"   # The exchange responded to the trader's request.
+
+STAGES = [RECEIVED, STRATEGY, NOTIFIED, SENT, ACKNOWLEDGED]
+_STAGE_INDEX = dict((stage, i) for i, stage in enumerate(STAGES))
+
+class TickTracer(object):
+
+    def __init__(self, capacity=4096):
+        '''
+        capacity is how many of the most recent market events are remembered.
+        '''
+
+        self.capacity = capacity
+        self._traces = [[None] * len(STAGES) for _ in range(capacity)]
+        self._sources = [None] * capacity
+        # Handing out slots with a counter keeps threads from sharing a slot without a lock.
+        self._counter = itertools.count()
+        self._traced = 0
+        self._local = local()
+
+    def received(self, source):
+        '''
+        source names the pipeline the data came from, e.g. "quadrigacx".
+        Post: Stages marked on this thread are recorded on a new trace.
+        '''
+
+        now = monotonic()
+        index = next(self._counter) % self.capacity
+        trace = self._traces[index]
+        for i in range(1, len(trace)):
+            trace[i] = None
+        trace[0] = now
+        self._sources[index] = source
+        self._traced += 1
+        self._local.trace = trace
+
+    def mark(self, stage):
+        '''
+        Post: The first time stage is reached for the current market event is recorded.
+              Nothing happens if no market event is being traced on this thread.
+        '''
+
+        trace = getattr(self._local, "trace", None)
+        if trace is not None:
+            i = _STAGE_INDEX[stage]
+            if trace[i] is None:
+                trace[i] = monotonic()
+
+    def _recent_traces(self):
+        traced = min(self._traced, self.capacity)
+        traces = []
+        for i in range(traced):
+            trace = list(self._traces[i])
+            if trace[0] is not None:
+                traces.append((self._sources[i], trace))
+        traces.sort(key=lambda source_and_trace: source_and_trace[1][0])
+        return traces
+
+    def breakdown(self):
+        '''
+        Returns: A dictionary of (source, from_stage, to_stage) -> LatencyHistogram for every
+                 pair of consecutive stages reached by the remembered market events, as well as
+                 (source, RECEIVED, last_stage) for the whole trip.
+        '''
+
+        histograms = {}
+        for source, trace in self._recent_traces():
+            previous = 0
+            stages_reached = 0
+            for i in range(1, len(STAGES)):
+                if trace[i] is not None:
+                    key = (source, STAGES[previous], STAGES[i])
+                    histograms.setdefault(key, LatencyHistogram()).record(trace[i] - trace[previous])
+                    previous = i
+                    stages_reached += 1
+            if stages_reached > 1:
+                key = (source, RECEIVED, STAGES[previous])
+                histograms.setdefault(key, LatencyHistogram()).record(trace[previous] - trace[0])
+        return histograms
+
+    def dump(self, recent=10):
+        '''
+        Returns: The per-stage latency percentiles in milliseconds followed by the
+                 stage timings of the [recent] most recent market events.
+        '''
+
+        lines = ["%-12s %-27s %7s %9s %9s %9s" % ("source", "stage", "count", "p50", "p99", "max")]
+        histograms = self.breakdown()
+        for (source, from_stage, to_stage) in sorted(histograms.keys(), key=lambda k: (k[0], _STAGE_INDEX[k[1]], _STAGE_INDEX[k[2]])):
+            histogram = histograms[(source, from_stage, to_stage)]
+            lines.append("%-12s %-27s %7d %9.3f %9.3f %9.3f" % (source, from_stage + " -> " + to_stage, histogram.count,
+                                                                histogram.percentile(50) * 1000,
+                                                                histogram.percentile(99) * 1000,
+                                                                histogram.percentile(100) * 1000))
+
+        lines.append("")
+        lines.append("Most recent market events (milliseconds after being received):")
+        lines.append("%-12s " % "source" + " ".join("%12s" % stage for stage in STAGES[1:]))
+        for source, trace in self._recent_traces()[-recent:]:
+            cells = []
+            for stage_time in trace[1:]:
+                if stage_time is None:
+                    cells.append("%12s" % "-")
+                else:
+                    cells.append("%12.3f" % ((stage_time - trace[0]) * 1000))
+            lines.append("%-12s " % source + " ".join(cells))
+        return "\n".join(lines)
+
+    def install_dump_signal(self, signum=getattr(signal, "SIGUSR1", None)):
+        '''
+        Post: The dump is printed whenever the process receives signum.
+        Pre: Called from the main thread on a platform with signum (not Windows).
+        '''
+
+        def _on_signal(received_signum, frame):
+            print(self.dump())
+
+        signal.signal(signum, _on_signal)
+
+# Pipelines, strategies and traders all mark stages on this tracer.
+tracer = TickTracer()
@@ -0,0 +1,36 @@
+'''
+Defers importing heavy optional dependencies until they are used.
+
+tweepy, matplotlib and BeautifulSoup each take a noticeable amount of time to
+import and most runs of the bot never touch them. A LazyModule stands in for the
+module and imports it the first time one of its attributes is read, so a missing
+dependency only matters to the code that needs it.
+
+@author: Tobias Carryer
+'''
+
+import importlib
+
+class LazyModule(object):
+
+    def __init__(self, name):
+        '''
+        name is the module's full name, e.g. "matplotlib.pyplot"
+        '''
+
+        self._name = name
+        self._module = None
+
+    def load(self):
+        '''
+        Returns: The imported module.
+        Raises: ImportError if the module is not installed.
+        '''
+
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attribute):
+        # Only called for attributes that are not set on the LazyModule itself.
+        return getattr(self.load(), attribute)
@@ -5,6 +5,7 @@ See https://bittrex.com/Home/Api
 import time
 import hmac
 import hashlib
+from threading import Lock
 
 try:
     from urllib import urlencode
@@ -83,13 +84,18 @@ class Bittrex(object):
     Used for requesting Bittrex with API key and API secret
     """
 
-    def __init__(self, api_key, api_secret, calls_per_second=1, dispatch=using_requests, api_version=API_V1_1):
+    def __init__(self, api_key, api_secret, calls_per_second=1, dispatch=using_requests, api_version=API_V1_1, clock=time.time):
         self.api_key = str(api_key) if api_key is not None else ''
         self.api_secret = str(api_secret) if api_secret is not None else ''
         self.dispatch = dispatch
         self.call_rate = 1.0 / calls_per_second
         self.last_call = None
         self.api_version = api_version
+        self._keyed_hmac = None
+        self._last_nonce = 0
+        self._nonce_lock = Lock()
+        # Nonces are taken from this clock so they can follow Bittrex's time.
+        self.clock = clock
 
     def decrypt(self):
         if encrypted:
@@ -104,6 +110,7 @@ class Bittrex(object):
                 pass
             self.api_key = cipher.decrypt(self.api_key).decode()
             self.api_secret = cipher.decrypt(self.api_secret).decode()
+            self._keyed_hmac = None
         else:
             raise ImportError('"pycrypto" module has to be installed')
 
@@ -119,6 +126,29 @@ class Bittrex(object):
 
             self.last_call = time.time()
 
+    def _next_nonce(self):
+        """
+        Millisecond nonce that is strictly greater than the previous one,
+        even when requests are signed from several threads in the same millisecond.
+        """
+        nonce = int(self.clock() * 1000)
+        with self._nonce_lock:
+            if nonce <= self._last_nonce:
+                nonce = self._last_nonce + 1
+            self._last_nonce = nonce
+        return nonce
+
+    def _sign(self, request_url):
+        """
+        HMAC-SHA512 of the request URL. The secret is keyed in once and the
+        keyed state is copied for every request.
+        """
+        if self._keyed_hmac is None:
+            self._keyed_hmac = hmac.new(self.api_secret.encode(), digestmod=hashlib.sha512)
+        apisign = self._keyed_hmac.copy()
+        apisign.update(request_url.encode())
+        return apisign.hexdigest()
+
     def _api_query(self, protection=None, path_dict=None, options=None):
         """
         Queries Bittrex
@@ -138,7 +168,7 @@ class Bittrex(object):
         request_url = BASE_URL_V2_0 if self.api_version == API_V2_0 else BASE_URL_V1_1
         request_url = request_url.format(path=path_dict[self.api_version])
 
-        nonce = str(int(time.time() * 1000))
+        nonce = str(self._next_nonce())
 
         if protection != PROTECTION_PUB:
             request_url = "{0}apikey={1}&nonce={2}&".format(request_url, self.api_key, nonce)
@@ -146,9 +176,7 @@ class Bittrex(object):
         request_url += urlencode(options)
 
         try:
-           apisign = hmac.new(self.api_secret.encode(),
-                              request_url.encode(),
-                              hashlib.sha512).hexdigest()
+           apisign = self._sign(request_url)
 
            self.wait()
 
@@ -19,7 +19,7 @@ Copyright (C) 2010 Hiroki Ohtani(liris)
     Boston, MA  02110-1335  USA
 
 """
-import array
+import binascii
 import os
 import struct
 
@@ -28,6 +28,53 @@ import six
 from ._exceptions import *
 from ._utils import validate_utf8
 
+# Frames shorter than this are masked with one big integer XOR,
+# longer ones with numpy when it is installed.
+_NUMPY_MASK_THRESHOLD = 256
+
+
+def _mask_int(_m, _d):
+    # XOR the whole payload as one integer instead of byte by byte.
+    length = len(_d)
+    if not length:
+        return six.b("")
+    repeated = (_m * (length // 4 + 1))[:length]
+    if six.PY3:
+        masked = int.from_bytes(_d, "big") ^ int.from_bytes(repeated, "big")
+        return masked.to_bytes(length, "big")
+    masked = int(binascii.hexlify(_d), 16) ^ int(binascii.hexlify(repeated), 16)
+    return binascii.unhexlify("%0*x" % (length * 2, masked))
+
+
+_numpy = None
+
+
+def _mask_numpy(_m, _d):
+    # XOR 8 bytes at a time. The mask repeats every 4 bytes so the
+    # 8 byte words and the leftover bytes both start on the mask's first byte.
+    global _numpy
+    if _numpy is None:
+        import numpy
+        _numpy = numpy
+    length = len(_d)
+    words = length // 8
+    masked = bytearray(length)
+    _numpy.frombuffer(masked, dtype=_numpy.uint64, count=words)[:] = \
+        _numpy.frombuffer(_d, dtype=_numpy.uint64, count=words) ^ \
+        _numpy.frombuffer(_m * 2, dtype=_numpy.uint64)[0]
+    masked[words * 8:] = _mask_int(_m, _d[words * 8:])
+    return bytes(masked)
+
+
+def _has_numpy():
+    try:
+        import imp
+        imp.find_module("numpy")
+        return True
+    except ImportError:
+        return False
+
+
 try:
     # If wsaccel is available we use compiled routines to mask data.
     from wsaccel.xormask import XorMaskerSimple
@@ -36,15 +83,14 @@ try:
         return XorMaskerSimple(_m).process(_d)
 
 except ImportError:
-    # wsaccel is not available, we rely on python implementations.
-    def _mask(_m, _d):
-        for i in range(len(_d)):
-            _d[i] ^= _m[i % 4]
-
-        if six.PY3:
-            return _d.tobytes()
-        else:
-            return _d.tostring()
+    # wsaccel is not available. numpy is only imported once a large frame is masked.
+    if _has_numpy():
+        def _mask(_m, _d):
+            if len(_d) < _NUMPY_MASK_THRESHOLD:
+                return _mask_int(_m, _d)
+            return _mask_numpy(_m, _d)
+    else:
+        _mask = _mask_int
 
 __all__ = [
     'ABNF', 'continuous_frame', 'frame_buffer',
@@ -143,12 +189,15 @@ class ABNF(object):
         self.data = data
         self.get_mask_key = os.urandom
 
-    def validate(self, skip_utf8_validation=False):
+    def validate(self, skip_utf8_validation=False, allow_rsv1=False):
         """
         validate the ABNF frame.
         skip_utf8_validation: skip utf8 validation.
+        allow_rsv1: permessage-deflate was negotiated, so rsv1 marks
+            the first frame of a compressed message.
         """
-        if self.rsv1 or self.rsv2 or self.rsv3:
+        rsv1_allowed = allow_rsv1 and self.opcode in (ABNF.OPCODE_TEXT, ABNF.OPCODE_BINARY)
+        if (self.rsv1 and not rsv1_allowed) or self.rsv2 or self.rsv3:
             raise WebSocketProtocolException("rsv is not implemented, yet")
 
         if self.opcode not in ABNF.OPCODES:
@@ -257,21 +306,34 @@ class ABNF(object):
         if isinstance(data, six.text_type):
             data = six.b(data)
 
-        _m = array.array("B", mask_key)
-        _d = array.array("B", data)
-        return _mask(_m, _d)
+        return _mask(mask_key, data)
 
 
 class frame_buffer(object):
     _HEADER_MASK_INDEX = 5
     _HEADER_LENGTH_INDEX = 6
 
-    def __init__(self, recv_fn, skip_utf8_validation):
+    # Starting size of the receive buffer. It grows to fit the largest frame.
+    _INITIAL_BUFFER_SIZE = 64 * 1024
+
+    def __init__(self, recv_fn, skip_utf8_validation, recv_into_fn=None):
+        """
+        recv_into_fn(buffer, nbytes) reads into a writable buffer and returns
+        how many bytes were read, like socket.recv_into. recv_fn is used
+        when it is None.
+        """
         self.recv = recv_fn
+        self.recv_into = recv_into_fn
         self.skip_utf8_validation = skip_utf8_validation
-        # Buffers over the packets from the layer beneath until desired amount
-        # bytes of bytes are received.
-        self.recv_buffer = []
+        # Set once permessage-deflate is negotiated.
+        self.allow_rsv1 = False
+        # Bytes from the layer beneath are read into one reusable buffer.
+        # Everything between _start and _end has been received but not used.
+        # What is received stays there if a read times out, so the frame
+        # can be resumed by calling recv_frame() again.
+        self._buffer = bytearray(frame_buffer._INITIAL_BUFFER_SIZE)
+        self._start = 0
+        self._end = 0
         self.clear()
 
     def clear(self):
@@ -283,21 +345,15 @@ class frame_buffer(object):
         return self.header is None
 
     def recv_header(self):
-        header = self.recv_strict(2)
-        b1 = header[0]
-
-        if six.PY2:
-            b1 = ord(b1)
+        self._fill(2)
+        b1, b2 = struct.unpack_from("!BB", self._buffer, self._start)
+        self._start += 2
 
         fin = b1 >> 7 & 1
         rsv1 = b1 >> 6 & 1
         rsv2 = b1 >> 5 & 1
         rsv3 = b1 >> 4 & 1
         opcode = b1 & 0xf
-        b2 = header[1]
-
-        if six.PY2:
-            b2 = ord(b2)
 
         has_mask = b2 >> 7 & 1
         length_bits = b2 & 0x7f
@@ -316,11 +372,13 @@ class frame_buffer(object):
         bits = self.header[frame_buffer._HEADER_LENGTH_INDEX]
         length_bits = bits & 0x7f
         if length_bits == 0x7e:
-            v = self.recv_strict(2)
-            self.length = struct.unpack("!H", v)[0]
+            self._fill(2)
+            self.length = struct.unpack_from("!H", self._buffer, self._start)[0]
+            self._start += 2
         elif length_bits == 0x7f:
-            v = self.recv_strict(8)
-            self.length = struct.unpack("!Q", v)[0]
+            self._fill(8)
+            self.length = struct.unpack_from("!Q", self._buffer, self._start)[0]
+            self._start += 8
         else:
             self.length = length_bits
 
@@ -355,31 +413,62 @@ class frame_buffer(object):
         self.clear()
 
         frame = ABNF(fin, rsv1, rsv2, rsv3, opcode, has_mask, payload)
-        frame.validate(self.skip_utf8_validation)
+        frame.validate(self.skip_utf8_validation, self.allow_rsv1)
 
         return frame
 
-    def recv_strict(self, bufsize):
-        shortage = bufsize - sum(len(x) for x in self.recv_buffer)
+    def _fill(self, bufsize):
+        """
+        Reads until at least bufsize bytes past _start are in the buffer.
+        """
+        shortage = bufsize - (self._end - self._start)
+        if shortage <= 0:
+            return
+
+        if self._start + bufsize > len(self._buffer):
+            # Move what has not been used to the front, and grow the
+            # buffer if the frame still does not fit.
+            unused = self._end - self._start
+            if bufsize > len(self._buffer):
+                buffer_ = bytearray(max(bufsize, 2 * len(self._buffer)))
+                buffer_[:unused] = self._buffer[self._start:self._end]
+                self._buffer = buffer_
+            else:
+                self._buffer[:unused] = self._buffer[self._start:self._end]
+            self._start = 0
+            self._end = unused
+
+        view = memoryview(self._buffer)
         while shortage > 0:
-            # Limit buffer size that we pass to socket.recv() to avoid
-            # fragmenting the heap -- the number of bytes recv() actually
-            # reads is limited by socket buffer and is relatively small,
-            # yet passing large numbers repeatedly causes lots of large
-            # buffers allocated and then shrunk, which results in
-            # fragmentation.
-            bytes_ = self.recv(min(16384, shortage))
-            self.recv_buffer.append(bytes_)
-            shortage -= len(bytes_)
-
-        unified = six.b("").join(self.recv_buffer)
-
-        if shortage == 0:
-            self.recv_buffer = []
-            return unified
-        else:
-            self.recv_buffer = [unified[bufsize:]]
-            return unified[:bufsize]
+            # Ask for everything that fits so a large frame is read with
+            # as few calls as the socket allows.
+            space = len(self._buffer) - self._end
+            if self.recv_into is not None:
+                received = self.recv_into(view[self._end:], space)
+            else:
+                # Limit buffer size that we pass to socket.recv() to avoid
+                # fragmenting the heap.
+                bytes_ = self.recv(min(16384, space))
+                received = len(bytes_)
+                self._buffer[self._end:self._end + received] = bytes_
+            self._end += received
+            shortage -= received
+
+    def has_buffered_data(self):
+        """
+        True if bytes that have been received are waiting to be used, so
+        a frame can be (partly) read without the socket being readable.
+        """
+        return self._end > self._start
+
+    def recv_strict(self, bufsize):
+        self._fill(bufsize)
+        # The only copy of the data: out of the reusable buffer.
+        data = memoryview(self._buffer)[self._start:self._start + bufsize].tobytes()
+        self._start += bufsize
+        if self._start == self._end:
+            self._start = self._end = 0
+        return data
 
 
 class continuous_frame(object):
@@ -389,6 +478,10 @@ class continuous_frame(object):
         self.skip_utf8_validation = skip_utf8_validation
         self.cont_data = None
         self.recving_frames = None
+        # PerMessageDeflate once permessage-deflate is negotiated.
+        self.deflate = None
+        # Whether the message being received is compressed.
+        self.compressed = False
 
     def validate(self, frame):
         if not self.recving_frames and frame.opcode == ABNF.OPCODE_CONT:
@@ -398,12 +491,14 @@ class continuous_frame(object):
             raise WebSocketProtocolException("Illegal frame")
 
     def add(self, frame):
+        # The fragments are joined once the message is complete.
         if self.cont_data:
-            self.cont_data[1] += frame.data
+            self.cont_data[1].append(frame.data)
         else:
             if frame.opcode in (ABNF.OPCODE_TEXT, ABNF.OPCODE_BINARY):
                 self.recving_frames = frame.opcode
-            self.cont_data = [frame.opcode, frame.data]
+                self.compressed = bool(frame.rsv1)
+            self.cont_data = [frame.opcode, [frame.data]]
 
         if frame.fin:
             self.recving_frames = None
@@ -414,9 +509,39 @@ class continuous_frame(object):
     def extract(self, frame):
         data = self.cont_data
         self.cont_data = None
-        frame.data = data[1]
+        frame.data = data[1][0] if len(data[1]) == 1 else six.b("").join(data[1])
+        if self.compressed and self.deflate:
+            frame.data = self.deflate.decompress(frame.data, frame.fin)
         if not self.fire_cont_frame and data[0] == ABNF.OPCODE_TEXT and not self.skip_utf8_validation and not validate_utf8(frame.data):
             raise WebSocketPayloadException(
                 "cannot decode: " + repr(frame.data))
 
         return [data[0], frame]
+
+
+if __name__ == "__main__":
+    # Masking throughput of the available implementations.
+    # Run with python -m cryptotrader.librariesrequired.websocket._abnf
+    import timeit
+
+    def _mask_per_byte(_m, _d):
+        # What the library did before there was a wide XOR.
+        import array
+        _m = array.array("B", _m)
+        _d = array.array("B", _d)
+        for i in range(len(_d)):
+            _d[i] ^= _m[i % 4]
+        return _d.tostring() if six.PY2 else _d.tobytes()
+
+    implementations = [("per byte", _mask_per_byte), ("integer", _mask_int)]
+    if _has_numpy():
+        implementations.append(("numpy", _mask_numpy))
+    mask_key = os.urandom(4)
+    for size in [1024, 16 * 1024, 128 * 1024, 1024 * 1024]:
+        data = os.urandom(size)
+        expected = _mask_per_byte(mask_key, data)
+        for name, implementation in implementations:
+            assert implementation(mask_key, data) == expected, name
+            repeat = max(1, (4 * 1024 * 1024) // size) if name != "per byte" else max(1, (256 * 1024) // size)
+            seconds = min(timeit.repeat(lambda: implementation(mask_key, data), number=repeat, repeat=3)) / repeat
+            print("%8d bytes %-9s %10.1f MB/s" % (size, name, size / seconds / 1e6))
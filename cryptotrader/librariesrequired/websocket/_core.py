@@ -21,6 +21,7 @@ Copyright (C) 2010 Hiroki Ohtani(liris)
 """
 from __future__ import print_function
 
+import json
 import socket
 import struct
 import threading
@@ -88,7 +89,8 @@ class WebSocket(object):
         self.connected = False
         self.get_mask_key = get_mask_key
         # These buffer over the build-up of a single frame.
-        self.frame_buffer = frame_buffer(self._recv, skip_utf8_validation)
+        self.frame_buffer = frame_buffer(
+            self._recv, skip_utf8_validation, self._recv_into)
         self.cont_frame = continuous_frame(
             fire_cont_frame, skip_utf8_validation)
 
@@ -113,6 +115,17 @@ class WebSocket(object):
     def fileno(self):
         return self.sock.fileno()
 
+    def has_pending_data(self):
+        """
+        True if data has already been read off the socket, by this object
+        or by SSL, so recv() may not block even though select() would not
+        report the socket as readable.
+        """
+        if self.frame_buffer.has_buffered_data():
+            return True
+        pending = getattr(self.sock, "pending", None)
+        return bool(pending and pending())
+
     def set_mask_key(self, func):
         """
         set function to create musk key. You can customize mask key generator.
@@ -205,6 +218,8 @@ class WebSocket(object):
                  "subprotocols" - array of available sub protocols.
                                   default is None.
                  "socket" - pre-initialized stream socket.
+                 "enable_compression" - ask the server for permessage-deflate.
+                                        default is False.
 
         """
         self.sock, addrs = connect(url, self.sock_opt, proxy_info(**options),
@@ -212,6 +227,9 @@ class WebSocket(object):
 
         try:
             self.handshake_response = handshake(self.sock, *addrs, **options)
+            deflate = self.handshake_response.deflate
+            self.frame_buffer.allow_rsv1 = deflate is not None
+            self.cont_frame.deflate = deflate
             self.connected = True
         except:
             if self.sock:
@@ -298,6 +316,34 @@ class WebSocket(object):
         else:
             return ''
 
+    def recv_raw(self):
+        """
+        Receive the payload of a text or binary message without decoding it.
+        Text stays UTF-8 bytes, which saves a copy when the bytes go
+        straight to a parser.
+
+        return value: bytes, empty for other messages.
+        """
+        opcode, data = self.recv_data()
+        if opcode == ABNF.OPCODE_TEXT or opcode == ABNF.OPCODE_BINARY:
+            return data
+        else:
+            return six.b('')
+
+    def recv_json(self, loads=json.loads):
+        """
+        Receive a message and hand its raw bytes to a JSON decoder.
+
+        loads: the decoder. It must accept bytes, which json.loads does
+            on Python 2 and from Python 3.6.
+
+        return value: the decoded message, None for messages without a payload.
+        """
+        data = self.recv_raw()
+        if not data:
+            return None
+        return loads(data)
+
     def recv_data(self, control_frame=False):
         """
         Receive data with operation code.
@@ -432,6 +478,16 @@ class WebSocket(object):
             self.connected = False
             raise
 
+    def _recv_into(self, buffer_, nbytes):
+        try:
+            return recv_into(self.sock, buffer_, nbytes)
+        except WebSocketConnectionClosedException:
+            if self.sock:
+                self.sock.close()
+            self.sock = None
+            self.connected = False
+            raise
+
 
 def create_connection(url, timeout=None, class_=WebSocket, **options):
     """
@@ -473,6 +529,7 @@ def create_connection(url, timeout=None, class_=WebSocket, **options):
                               default is None.
              "skip_utf8_validation" - skip utf8 validation.
              "socket" - pre-initialized stream socket.
+             "enable_compression" - ask the server for permessage-deflate.
     """
     sockopt = options.pop("sockopt", [])
     sslopt = options.pop("sslopt", {})
@@ -0,0 +1,123 @@
+"""
+websocket - WebSocket client library for Python
+
+Copyright (C) 2010 Hiroki Ohtani(liris)
+
+    This library is free software; you can redistribute it and/or
+    modify it under the terms of the GNU Lesser General Public
+    License as published by the Free Software Foundation; either
+    version 2.1 of the License, or (at your option) any later version.
+
+    This library is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+    Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public
+    License along with this library; if not, write to the Free Software
+    Foundation, Inc., 51 Franklin Street, Fifth Floor,
+    Boston, MA 02110-1335  USA
+
+"""
+import zlib
+
+import six
+
+from ._exceptions import *
+
+__all__ = ["PERMESSAGE_DEFLATE", "permessage_deflate_offer",
+           "parse_permessage_deflate", "PerMessageDeflate"]
+
+# see https://tools.ietf.org/html/rfc7692
+PERMESSAGE_DEFLATE = "permessage-deflate"
+
+# Every compressed message ends with an empty deflate block whose last
+# 4 bytes the sender drops.
+_TAIL = six.b("\x00\x00\xff\xff")
+
+_MAX_WINDOW_BITS = 15
+
+
+def permessage_deflate_offer():
+    """
+    The Sec-WebSocket-Extensions value a client sends to ask for
+    compressed messages.
+    """
+    return PERMESSAGE_DEFLATE + "; client_max_window_bits"
+
+
+def parse_permessage_deflate(value):
+    """
+    Parse the server's Sec-WebSocket-Extensions header.
+
+    return value: a dictionary of the permessage-deflate parameters.
+    The value of a parameter without one is True.
+    """
+    extensions = [extension.strip() for extension in value.split(",")]
+    if len(extensions) != 1:
+        raise WebSocketException(
+            "Unexpected extensions accepted: %s" % value)
+
+    parts = [part.strip() for part in extensions[0].split(";")]
+    if parts[0].lower() != PERMESSAGE_DEFLATE:
+        raise WebSocketException(
+            "Unexpected extension accepted: %s" % parts[0])
+
+    params = {}
+    for part in parts[1:]:
+        if not part:
+            continue
+        if "=" in part:
+            name, param_value = part.split("=", 1)
+            params[name.strip().lower()] = param_value.strip().strip('"')
+        else:
+            params[part.lower()] = True
+    return params
+
+
+class PerMessageDeflate(object):
+    """
+    Decompresses the messages of a connection that negotiated
+    permessage-deflate. Messages are sent uncompressed, which the
+    extension allows, since the client only sends small requests.
+    """
+
+    def __init__(self, params):
+        self.no_context_takeover = "server_no_context_takeover" in params
+        window_bits = params.get("server_max_window_bits", _MAX_WINDOW_BITS)
+        if window_bits is True:
+            window_bits = _MAX_WINDOW_BITS
+        self.window_bits = int(window_bits)
+        if not 8 <= self.window_bits <= _MAX_WINDOW_BITS:
+            raise WebSocketException(
+                "Invalid server_max_window_bits: %s" % window_bits)
+
+        # How many bytes came over the wire and how many they inflated to.
+        self.compressed_bytes = 0
+        self.decompressed_bytes = 0
+        self._decompressor = None
+
+    def decompress(self, data, fin=True):
+        """
+        Inflate one compressed frame. A message split over several frames
+        is inflated frame by frame and fin marks its last frame.
+        """
+        if self._decompressor is None:
+            # Raw deflate, the server's window is kept between messages
+            # unless it said it would not use it.
+            self._decompressor = zlib.decompressobj(-self.window_bits)
+
+        self.compressed_bytes += len(data)
+        try:
+            if fin:
+                data += _TAIL
+            inflated = self._decompressor.decompress(data)
+        except zlib.error as e:
+            raise WebSocketProtocolException(
+                "Invalid compressed data: %s" % e)
+
+        if fin and self.no_context_takeover:
+            self._decompressor = None
+
+        self.decompressed_bytes += len(inflated)
+        return inflated
@@ -25,6 +25,7 @@ import os
 
 import six
 
+from ._deflate import *
 from ._exceptions import *
 from ._http import *
 from ._logging import *
@@ -49,10 +50,12 @@ VERSION = 13
 
 class handshake_response(object):
 
-    def __init__(self, status, headers, subprotocol):
+    def __init__(self, status, headers, subprotocol, deflate=None):
         self.status = status
         self.headers = headers
         self.subprotocol = subprotocol
+        # PerMessageDeflate if the server agreed to compress messages.
+        self.deflate = deflate
 
 
 def handshake(sock, hostname, port, resource, **options):
@@ -67,7 +70,8 @@ def handshake(sock, hostname, port, resource, **options):
     if not success:
         raise WebSocketException("Invalid WebSocket Header")
 
-    return handshake_response(status, resp, subproto)
+    return handshake_response(status, resp, subproto,
+                              _get_deflate(resp, options.get("enable_compression")))
 
 
 def _get_handshake_headers(resource, host, port, options):
@@ -99,6 +103,9 @@ def _get_handshake_headers(resource, host, port, options):
     if subprotocols:
         headers.append("Sec-WebSocket-Protocol: %s" % ",".join(subprotocols))
 
+    if options.get("enable_compression"):
+        headers.append("Sec-WebSocket-Extensions: %s" % permessage_deflate_offer())
+
     if "header" in options:
         header = options["header"]
         if isinstance(header, dict):
@@ -162,6 +169,16 @@ def _validate(headers, key, subprotocols):
         return False, None
 
 
+def _get_deflate(headers, enable_compression):
+    extensions = headers.get("sec-websocket-extensions", None)
+    if not extensions:
+        return None
+    if not enable_compression:
+        raise WebSocketException(
+            "Server accepted extensions that were not offered: %s" % extensions)
+    return PerMessageDeflate(parse_permessage_deflate(extensions))
+
+
 def _create_sec_websocket_key():
     randomness = os.urandom(16)
     return base64encode(randomness).decode('utf-8').strip()
@@ -40,7 +40,7 @@ if hasattr(socket, "TCP_KEEPCNT"):
 _default_timeout = None
 
 __all__ = ["DEFAULT_SOCKET_OPTION", "sock_opt", "setdefaulttimeout", "getdefaulttimeout",
-           "recv", "recv_line", "send"]
+           "recv", "recv_into", "recv_line", "send"]
 
 
 class sock_opt(object):
@@ -95,6 +95,34 @@ def recv(sock, bufsize):
     return bytes_
 
 
+def recv_into(sock, buffer_, nbytes):
+    """
+    Reads up to nbytes into buffer_ without allocating a new string.
+
+    return value: the number of bytes read.
+    """
+    if not sock:
+        raise WebSocketConnectionClosedException("socket is already closed.")
+
+    try:
+        received = sock.recv_into(buffer_, nbytes)
+    except socket.timeout as e:
+        message = extract_err_message(e)
+        raise WebSocketTimeoutException(message)
+    except SSLError as e:
+        message = extract_err_message(e)
+        if message == "The read operation timed out":
+            raise WebSocketTimeoutException(message)
+        else:
+            raise
+
+    if not received:
+        raise WebSocketConnectionClosedException(
+            "Connection is already closed.")
+
+    return received
+
+
 def recv_line(sock):
     line = []
     while True:
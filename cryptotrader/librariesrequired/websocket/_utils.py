@@ -76,7 +76,7 @@ except ImportError:
 
         return state, codep
 
-    def _validate_utf8(utfbytes):
+    def _validate_utf8_dfa(utfbytes):
         state = _UTF8_ACCEPT
         codep = 0
         for i in utfbytes:
@@ -88,6 +88,25 @@ except ImportError:
 
         return True
 
+    _SURROGATE_LEAD = six.b("\xed")
+
+    def _validate_utf8(utfbytes):
+        # Let the C codecs do the work. Python 2's UTF-8 codec accepts
+        # encoded surrogates, which are not valid, so bytes that could hold
+        # one still go through the DFA.
+        try:
+            utfbytes.decode("ascii")
+            return True
+        except UnicodeDecodeError:
+            pass
+        try:
+            utfbytes.decode("utf-8")
+        except UnicodeDecodeError:
+            return False
+        if six.PY2 and _SURROGATE_LEAD in utfbytes:
+            return _validate_utf8_dfa(utfbytes)
+        return True
+
 
 def validate_utf8(utfbytes):
     """
@@ -1,5 +1,6 @@
 '''
 This is the file a human should run to trade on QuadrigaCX.
+Run python -m cryptotrader quadrigacx --help to see the options.
 '''
 
 from quadriga_split_trader import attach_traders, authenticate_traders
@@ -7,10 +8,10 @@ from cryptotrader.tradesignals.indicators import SpreadSize
 from cryptotrader.tradesignals.strategies.spread_size_strategy import SpreadSizeStrategy
 from cryptotrader.quadrigacx import QuadrigaTickers, QuadrigaOptions, QuadrigaPipeline
 from cryptotrader import DefaultPosition
+from cryptotrader.adaptive_poller import AdaptivePoller
 from decimal import Decimal
 
-# Set the options in one place to make it simple to edit later.
-# These are used in trade()
+# The defaults used when an option is not given on the command line.
 options = QuadrigaOptions(QuadrigaTickers.BTC_USD)
 minimum_return = 1.01
 percentage_to_trade = 0.5
@@ -20,7 +21,9 @@ start_by_buying = True
 aggressive = False
 default_position = DefaultPosition.BUY
 
-def trade():
+def trade(options=options, minimum_return=minimum_return, percentage_to_trade=percentage_to_trade,
+          number_of_traders=number_of_traders, is_simulation=is_simulation, start_by_buying=start_by_buying,
+          aggressive=aggressive, default_position=default_position):
     strategy = SpreadSizeStrategy(default_position, minimum_return=minimum_return, market_fee=options.fee, undercut_market_by=options.undercut)
     attach_traders(strategy, options,
                    percent_of_balance_to_trade=percentage_to_trade,
@@ -36,8 +39,13 @@ def trade():
     def on_order_book(bids, asks):
         strategy.process_order_book(bids[0][0], asks[0][0])
                      
-    pipeline = QuadrigaPipeline(on_order_book, options.ticker)
+    # Polls faster while the spread is moving or close to profitable, within QuadrigaCX's rate limit.
+    poller = AdaptivePoller(requests_per_second=0.5, min_interval=2, max_interval=60, name="QuadrigaCX poller")
+    # The strategy only uses the best bid and ask, which QuadrigaCX's ticker has.
+    pipeline = QuadrigaPipeline(on_order_book, options.ticker, poller=poller, is_urgent=strategy.is_near_profitable,
+                                top_of_book=True)
     pipeline.start()
+    poller.start()
     
 def what_is_profitable():
     tickers = [QuadrigaTickers.BTC_CAD, QuadrigaTickers.BTC_USD, QuadrigaTickers.ETH_BTC,
@@ -52,7 +60,7 @@ def what_is_profitable():
         spread_size_indicator = SpreadSize(minimum_return=1, market_fee=_options.fee)
                         
         # Get the order book once rather than turning on the pipeline.
-        order_book = QuadrigaPipeline(None, ticker).get_order_book()
+        order_book = QuadrigaPipeline(None, ticker, top_of_book=True).get_order_book()
         bids = order_book["bids"]
         asks = order_book["asks"]
         
@@ -72,6 +80,7 @@ def what_is_profitable():
 
 
 if __name__ == "__main__":
-    #what_is_profitable()
-    trade()
+    import sys
+    from cryptotrader.cli import main
+    main(["quadrigacx"] + sys.argv[1:])
     
@@ -6,59 +6,111 @@ Loads data from QuadrigaCX.
 
 import time
 from threading import Thread
-import requests
 from quadriga_options import QuadrigaTickers
+from cryptotrader.latency import tick_trace
+from cryptotrader.conditional_fetch import ConditionalFetcher
 
 class QuadrigaPipeline(object):
-    def __init__(self, on_order_book, market_ticker=QuadrigaTickers.BTC_CAD, poll_time=15):
+    def __init__(self, on_order_book, market_ticker=QuadrigaTickers.BTC_CAD, poll_time=15, poller=None, is_urgent=None,
+                 top_levels=10, top_of_book=False):
         '''
         on_order_book should have 2 parameters: one for the bids and one for the asks.
         on_order_book will be called every [poll_time] seconds
         
+        poller is an AdaptivePoller to share with other pipelines. The order book is then polled
+        every poll_time seconds at first, more often while the top of the book is changing or
+        is_urgent() returns True, and less often while it is not.
+        
+        top_levels is how many levels of each side are compared with the last poll. on_order_book
+        is only called when one of them changed. The whole book is compared if it is None.
+        
+        top_of_book polls QuadrigaCX's ticker instead of the order book, which has no way to
+        ask for fewer orders. The bids and asks then only have the best bid and ask, and their
+        amounts are None since the ticker does not have them.
+        
         Pre: market_ticker is a String in Quadriga's ticker format.
              poll_time is a positive integer
         '''
         
         self.on_order_book = on_order_book
         self.order_book_url = "https://api.quadrigacx.com/v2/order_book?book=" + market_ticker
+        self.ticker_url = "https://api.quadrigacx.com/v2/ticker?book=" + market_ticker
+        self.top_of_book = top_of_book
         self.poll_time = poll_time
         self._time_started = 0
+        self.poller = poller
+        self.is_urgent = is_urgent
+        self.job = None
+        
+        self.top_levels = top_levels
+        self.fetcher = ConditionalFetcher(self.ticker_url if top_of_book else self.order_book_url)
+        self._last_top = None
+        # Polls that did not call on_order_book because the top of the book had not changed.
+        self.suppressed_updates = 0
         
-        self.stop = False
+        self._stop = False
         self.thread = None
 
+    def _poll(self):
+        # An unchanged body is not parsed again, but get_order_book() reads through the same
+        # fetcher so it may have seen the change first. Only the top of the book decides.
+        # The order book's timestamp changes with every request, even when its orders do not.
+        order_book = self._fetch()[0]
+        top = (order_book["bids"][:self.top_levels], order_book["asks"][:self.top_levels])
+        if top == self._last_top:
+            self.suppressed_updates += 1
+            return top
+        self._last_top = top
+        tick_trace.tracer.received("quadrigacx")
+        self.on_order_book(order_book["bids"], order_book["asks"])
+        return top
+
     def start(self):
+        if self.poller is not None:
+            self.job = self.poller.add(self._poll, self.poll_time, is_urgent=self.is_urgent,
+                                       name="QuadrigaCX order book")
+            print("Started QuadrigaCX pipeline.")
+            return
+        
         def _go():
             last_time = 0
             while True:
-                if self.stop:
+                if self._stop:
                     print "Stopping QuadrigaCX pipeline."
                     break
                 elif time.time() - last_time >= self.poll_time:
                     last_time = time.time()
-                    order_book = self.get_order_book()
-                    self.on_order_book(order_book["bids"], order_book["asks"])
+                    self._poll()
 
         self.thread = Thread(target=_go)
-        self.stop = False
+        self._stop = False
         self.thread.start()
         print("Started QuadrigaCX pipeline.")
 
+    def _fetch(self):
+        data, changed = self.fetcher.fetch()
+        if self.top_of_book:
+            data = {"timestamp": data["timestamp"], "bids": [[data["bid"], None]], "asks": [[data["ask"], None]]}
+        return data, changed
+
     def get_order_book(self):
         '''
         Pre: self.order_book_url is valid
         Returns: JSON Dictionary with the entries "timestamp", "bids", and "asks"
                  The bids and asks are two 2D lists. Each entry has exactly two entries
                  in its second level, index 0 is the  order's price, and
-                 index 1 is the order's amount.
+                 index 1 is the order's amount. Only the best bid and ask, without their
+                 amounts, are returned if the pipeline was made with top_of_book.
         '''
 
-        data = requests.get(self.order_book_url).json()
+        data = self._fetch()[0]
         return data
 
     def stop(self):
-        if not self.stop:
-            self.stop = True
+        if self.job is not None:
+            self.poller.remove(self.job)
+            self.job = None
+        self._stop = True
 
 if __name__ == "__main__":
 
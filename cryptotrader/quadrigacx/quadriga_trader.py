@@ -3,15 +3,16 @@ Implements the QuadrigaCX API for live and simulation trading.
 @author: Tobias Carryer
 '''
 
-import hmac
-import hashlib
-import time
 import requests
 import sys
 from decimal import Decimal, localcontext
 from cryptotrader import Trader, DefaultPosition
+from cryptotrader.request_signer import RequestSigner, NonceGenerator
+from cryptotrader.latency import timed_order_call
 
 class QuadrigaTrader(Trader):
+    
+    exchange = "quadrigacx"
         
     simulation_buy_order_id = "1234"
     simulation_sell_order_id = "4321"
@@ -62,9 +63,14 @@ class QuadrigaTrader(Trader):
             
     def authenticate(self, api_key, api_secret, client):
         self.is_test = False
+        # Nonces and order timestamps are on the exchange's clock from now on.
+        self.clock.start()
         self.api_key = api_key
         self.api_secret = api_secret
         self.client = client
+        # QuadrigaCX nonces are in hundredths of a second.
+        self._signer = RequestSigner(api_secret, nonce_generator=NonceGenerator(ticks_per_second=100, clock=self.clock.time))
+        self._signed_suffix = client + api_key
         self.fetch_balance_and_assets()
         
     def should_default_to(self, default_position, aggressive=False):
@@ -127,6 +133,7 @@ class QuadrigaTrader(Trader):
             else:
                 sys.stdout.write('wb ')
               
+    @timed_order_call("limit_buy_order", places_order=True)
     def limit_buy_order(self, market_value):  
         payload = self.create_authenticated_payload()
         payload["book"] = self.market_ticker
@@ -146,7 +153,7 @@ class QuadrigaTrader(Trader):
         
         # Only orders that matter are the ones that might fill us which can only
         # happen in the future.
-        self._last_simulation_transaction_check = time.time()
+        self._last_simulation_transaction_check = self.clock.time()
         
         self._active_buy_order = True
         
@@ -177,6 +184,7 @@ class QuadrigaTrader(Trader):
             else:
                 sys.stdout.write('ws ')
                 
+    @timed_order_call("limit_sell_order", places_order=True)
     def limit_sell_order(self, market_value):
         payload = self.create_authenticated_payload()
         payload["book"] = self.market_ticker
@@ -199,7 +207,7 @@ class QuadrigaTrader(Trader):
         
         # Only orders that matter are the ones that might fill us which can only
         # happen in the future.
-        self._last_simulation_transaction_check = time.time()
+        self._last_simulation_transaction_check = self.clock.time()
         
         self._active_sell_order = True
             
@@ -247,7 +255,7 @@ class QuadrigaTrader(Trader):
                                 self._waiting_for_order_to_fill = None
                                 
             # Orders up to this moment have been processed, don't process them again.
-            self._last_simulation_transaction_check = time.time()
+            self._last_simulation_transaction_check = self.clock.time()
             
         else:
             
@@ -261,6 +269,7 @@ class QuadrigaTrader(Trader):
             # Status codes: -1 cancelled, 0 active, 1 = partially filled, 2 = filled
             status_code = json_result["status"]
             if status_code == "2":
+                self.record_fill()
                 # Type 0 == Buy, Type 1 == Sell
                 if json_result["type"] == "0":
                     self.assets = Decimal(json_result["amount"]) * self.post_fee
@@ -279,9 +288,8 @@ class QuadrigaTrader(Trader):
         
     def create_authenticated_payload(self):
         ''' Pre: API Key, client, and API secret have been set. '''
-        nonce = str(int(time.time()*100))
-        msg = nonce + self.client + self.api_key
-        signature = hmac.new(self.api_secret, msg, hashlib.sha256).hexdigest()
+        nonce = str(self._signer.next_nonce())
+        signature = self._signer.hexdigest(nonce + self._signed_suffix)
         return {'key': self.api_key, 'nonce': nonce, 'signature': signature}
     
     def hold(self, market_value):
@@ -344,6 +352,7 @@ class QuadrigaTrader(Trader):
                 self._waiting_for_order_to_fill = None
                 self._active_buy_order = False
     
+    @timed_order_call("cancel_order")
     def cancel_order(self, order_id):
         order_info = self.lookup_order(order_id)
         # Type 0 == Buy, Type 1 == Sell
@@ -360,6 +369,7 @@ class QuadrigaTrader(Trader):
         self._waiting_for_order_to_fill = None
         print("QuadrigaTrader is shutting down.")
         
+    @timed_order_call("lookup_order")
     def lookup_order(self, order_id):
         payload = self.create_authenticated_payload()
         payload["id"] = order_id
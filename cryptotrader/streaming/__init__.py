@@ -0,0 +1,2 @@
+from cryptotrader.streaming.managed_websocket import ManagedWebSocket
+from cryptotrader.streaming.multiplexer import WebSocketMultiplexer
@@ -0,0 +1,327 @@
+'''
+A websocket feed that stays up.
+
+Exchanges drop websockets that have been open for a while, so the pipelines
+used to close and reopen theirs every few minutes, missing whatever was sent
+while they were reconnecting. A ManagedWebSocket instead opens and subscribes
+the replacement first and only closes the old connection once the new one is
+receiving (make before break). While both are open, messages the exchange
+numbers keep coming from the old connection and the new one's are held back.
+Once the old connection is closed the held messages are delivered, minus any
+sequence already seen, so nothing the old connection read in time is dropped
+for a higher sequence the new one happened to receive first. When a
+connection fails it is replaced after a jittered, exponentially growing delay
+so many bots do not reconnect at the same instant.
+
+@author: Tobias Carryer
+'''
+
+import json
+import random
+import time
+from threading import Event, RLock, Thread
+from cryptotrader.librariesrequired.websocket import create_connection
+
+class _Connection(object):
+    ''' One websocket and the thread reading from it. '''
+
+    def __init__(self, ws, multiplexer=None):
+        self.ws = ws
+        self.multiplexer = multiplexer
+        self.opened = time.time()
+        self.first_message = Event()
+        self.closed = Event()
+        self.error = None
+        self.thread = None
+        self.last_ping = self.opened
+
+    def close(self):
+        # Shutting the socket down wakes the reader up. A close handshake would
+        # have to read the server's reply while the reader is also reading.
+        self.closed.set()
+        if self.multiplexer is not None:
+            self.multiplexer.unregister(self.ws)
+        for close in (self.ws.abort, self.ws.shutdown):
+            try:
+                close()
+            except Exception:
+                pass # The connection is being thrown away either way.
+
+class ManagedWebSocket(object):
+
+    def __init__(self, url, on_message, subscribe, sequence_of=None, name="websocket",
+                 rotate_after=15 * 60, overlap=2, first_message_timeout=15, ping_interval=30,
+                 backoff_base=1, backoff_max=60, connection_options=None, loads=json.loads,
+                 multiplexer=None, on_control=None):
+        '''
+        on_message(message) is called with every decoded message, one at a time.
+        subscribe(ws) sends whatever subscriptions the feed needs on a new connection.
+        sequence_of(message) returns (stream, sequence) for messages the exchange numbers
+            in increasing order, or None. Numbered messages are delivered once per sequence
+            from whichever connection has them first. Other messages are only delivered
+            from the current connection.
+        rotate_after is how many seconds a connection is used before it is replaced.
+            Connections are only replaced when they fail if it is None.
+        overlap is how many seconds the old connection is kept open after the new one
+            starts receiving.
+        first_message_timeout is how many seconds a new connection has to receive
+            something before it is given up on.
+        ping_interval is how many seconds to wait between pings on a quiet connection.
+        Failed connections are retried after backoff_base * 2^attempt seconds, at most
+            backoff_max, with jitter.
+        connection_options are passed on to create_connection.
+        multiplexer is a started WebSocketMultiplexer to read the connections and send their
+            pings from. Each connection gets its own reader thread if it is None.
+        on_control(ws, message) is called with every message that is not numbered, from every
+            connection, before it is delivered. It returns True if the message only concerned
+            ws (e.g. a subscription reply) and should not be delivered to on_message.
+        on_message and on_control can call stop().
+        '''
+
+        self.url = url
+        self.on_message = on_message
+        self.subscribe = subscribe
+        self.sequence_of = sequence_of
+        self.name = name
+        self.rotate_after = rotate_after
+        self.overlap = overlap
+        self.first_message_timeout = first_message_timeout
+        self.ping_interval = ping_interval
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.connection_options = dict(connection_options or {})
+        # Pings are sent while another thread is receiving.
+        self.connection_options["enable_multithread"] = True
+        self.loads = loads
+        self.multiplexer = multiplexer
+        self.on_control = on_control
+
+        self._current = None
+        self._last_sequences = {}
+        # The connection numbered messages are delivered from while it is replaced,
+        # and the numbered messages the new connection received meanwhile.
+        self._draining = None
+        self._held = []
+        # Reentrant so a callback can call stop() while its message is being delivered.
+        self._deliver_lock = RLock()
+        self._stopped = Event()
+        self._supervisor = None
+
+        self.reconnects = 0
+        self.rotations = 0
+        self.duplicates_dropped = 0
+
+    def start(self):
+        '''
+        Post: The feed is connected and kept connected in background threads until stop().
+        '''
+
+        self._stopped.clear()
+        # Not a daemon so the feed keeps the program running like the pipelines' threads did.
+        self._supervisor = Thread(target=self._supervise, name=self.name + " supervisor")
+        self._supervisor.start()
+
+    def stop(self):
+        '''
+        Post: Nothing is delivered after stop() returns and every connection is closed.
+        '''
+
+        self._stopped.set()
+        with self._deliver_lock:
+            current = self._current
+            self._current = None
+        if current is not None:
+            current.close()
+
+    def is_stopped(self):
+        return self._stopped.is_set()
+
+    def _backoff(self, attempt):
+        delay = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+        return random.uniform(delay / 2.0, delay)
+
+    def _open(self, takes_over=False):
+        '''
+        takes_over is True when there is no working connection to overlap with. The new
+            connection becomes the current one before it subscribes so nothing it receives,
+            such as subscription replies, is dropped.
+        Returns: A subscribed _Connection that has received its first message, or None if
+                 it failed or stop() was called.
+        '''
+
+        attempt = 0
+        while not self._stopped.is_set():
+            connection = None
+            try:
+                connection = _Connection(create_connection(self.url, **self.connection_options), self.multiplexer)
+                if takes_over:
+                    self._swap(connection)
+                self.subscribe(connection.ws)
+                if self.multiplexer is not None:
+                    self._register(connection)
+                else:
+                    connection.thread = Thread(target=self._read, args=(connection,), name=self.name + " reader")
+                    connection.thread.daemon = True
+                    connection.thread.start()
+                if connection.first_message.wait(self.first_message_timeout) and connection.error is None:
+                    return connection
+                raise Warning(str(connection.error or "Nothing was received."))
+            except Exception as e:
+                if connection is not None:
+                    connection.close()
+                delay = self._backoff(attempt)
+                attempt += 1
+                print(self.name + ": Could not connect (" + str(e) + "). Retrying in " + str(round(delay, 1)) + " seconds.")
+                self._stopped.wait(delay)
+        return None
+
+    def _read(self, connection):
+        while not connection.closed.is_set() and not self._stopped.is_set():
+            try:
+                data = connection.ws.recv_raw()
+            except Exception as e:
+                if not connection.closed.is_set():
+                    connection.error = e
+                connection.closed.set()
+                connection.first_message.set()
+                return
+            if not data:
+                continue
+            connection.first_message.set()
+            try:
+                message = self.loads(data)
+            except ValueError:
+                print(self.name + ": Could not decode " + repr(data[:200]))
+                continue
+            self._deliver(connection, message)
+
+    def _register(self, connection):
+        def on_message(message):
+            connection.first_message.set()
+            self._deliver(connection, message)
+
+        def on_error(error):
+            if not connection.closed.is_set():
+                connection.error = error
+            connection.closed.set()
+            connection.first_message.set()
+
+        self.multiplexer.register(connection.ws, on_message, on_error, self.ping_interval)
+
+    def _deliver(self, connection, message):
+        with self._deliver_lock:
+            if self._stopped.is_set():
+                return
+            sequence = self.sequence_of(message) if self.sequence_of is not None else None
+            if sequence is None:
+                if self.on_control is not None and self._call(self.on_control, connection.ws, message):
+                    return
+                if connection is not self._current:
+                    return
+            elif self._draining is not None and connection is not self._draining:
+                self._held.append((sequence, message))
+                return
+            elif not self._is_new(sequence):
+                return
+            self._call(self.on_message, message)
+
+    def _is_new(self, sequence):
+        '''
+        Pre: self._deliver_lock is held
+        Returns: True if sequence is higher than any seen on its stream, and records it.
+        '''
+
+        stream, number = sequence
+        last = self._last_sequences.get(stream)
+        if last is not None and number <= last:
+            self.duplicates_dropped += 1
+            return False
+        self._last_sequences[stream] = number
+        return True
+
+    def _call(self, callback, *args):
+        try:
+            return callback(*args)
+        except Exception as e:
+            # One bad message should not take the feed down.
+            print(self.name + ": Exception handling a message: " + str(e))
+
+    def _finish_draining(self):
+        '''
+        Post: The messages held back from the new connection are delivered and it is the only
+              one numbered messages are delivered from.
+        '''
+
+        with self._deliver_lock:
+            self._draining = None
+            held = self._held
+            self._held = []
+            for sequence, message in held:
+                if self._stopped.is_set():
+                    return
+                if self._is_new(sequence):
+                    self._call(self.on_message, message)
+
+    def _swap(self, connection):
+        with self._deliver_lock:
+            if self._stopped.is_set():
+                connection.close()
+                return None
+            previous = self._current
+            self._current = connection
+            return previous
+
+    def current_ws(self):
+        ''' Returns: The WebSocket messages are delivered from, None if there is none. '''
+        current = self._current
+        return None if current is None else current.ws
+
+    def send(self, payload):
+        '''
+        Sends payload on the current connection.
+        Raises: Warning if there is no connection.
+        '''
+
+        current = self._current
+        if current is None or current.closed.is_set():
+            raise Warning(self.name + " is not connected.")
+        current.ws.send(payload)
+
+    def _supervise(self):
+        connection = self._open(takes_over=True)
+        if connection is None:
+            return
+
+        while not self._stopped.wait(1):
+            current = self._current
+            if current is None:
+                return
+
+            if current.closed.is_set():
+                # The connection failed. Nothing is open to overlap with.
+                print(self.name + ": Connection lost (" + str(current.error) + "). Reconnecting.")
+                current.close()
+                if self._open(takes_over=True) is None:
+                    return
+                self.reconnects += 1
+            elif self.rotate_after is not None and time.time() - current.opened >= self.rotate_after:
+                with self._deliver_lock:
+                    # Numbered messages keep coming from the old connection until it is closed.
+                    self._draining = current
+                replacement = self._open()
+                if replacement is None:
+                    return
+                previous = self._swap(replacement)
+                self.rotations += 1
+                # Let the old connection deliver what it has already been sent.
+                self._stopped.wait(self.overlap)
+                if previous is not None:
+                    previous.close()
+                self._finish_draining()
+            elif self.multiplexer is None and time.time() - current.last_ping >= self.ping_interval:
+                current.last_ping = time.time()
+                try:
+                    current.ws.ping("keepalive")
+                except Exception as e:
+                    current.error = e
+                    current.closed.set()
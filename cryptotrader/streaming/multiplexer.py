@@ -0,0 +1,308 @@
+'''
+Reads many websockets from one thread.
+
+Instead of a thread blocked in recv() for every connection, a
+WebSocketMultiplexer waits on all of their sockets at once with epoll or
+kqueue (through selectors on Python 3), or select.select where neither is
+available, and reads from the ones that have data. Pings are sent on a timer
+per connection instead of whenever the clock happens to be on a multiple of
+30 seconds.
+
+Every message is handled on the multiplexer's thread, so a callback that
+blocks, e.g. on a REST request, holds up every other connection. Callbacks
+must hand slow work to another thread.
+
+@author: Tobias Carryer
+'''
+
+import heapq
+import json
+import select
+import time
+from threading import Lock, Thread
+from cryptotrader.librariesrequired.websocket import WebSocketTimeoutException
+
+try:
+    import selectors
+except ImportError:
+    # Python 2
+    selectors = None
+
+# How long a read waits for the rest of a frame before going back to the other sockets.
+READ_TIMEOUT = 0.05
+
+# The longest the loop sleeps, so connections registered from other threads are picked up.
+MAX_WAIT = 0.5
+
+class _Registration(object):
+
+    def __init__(self, ws, on_message, on_error, ping_interval):
+        self.ws = ws
+        self.fileno = ws.fileno()
+        self.on_message = on_message
+        self.on_error = on_error
+        self.ping_interval = ping_interval
+        self.next_ping = time.time() + ping_interval
+
+class _SelectSelector(object):
+    ''' The part of selectors.DefaultSelector used here, on top of select.select. '''
+
+    def __init__(self):
+        self._filenos = set()
+
+    def register(self, fileno):
+        self._filenos.add(fileno)
+
+    def unregister(self, fileno):
+        self._filenos.discard(fileno)
+
+    def select(self, timeout):
+        if not self._filenos:
+            time.sleep(timeout)
+            return []
+        readable, _, _ = select.select(list(self._filenos), [], [], timeout)
+        return readable
+
+class _EpollSelector(object):
+    ''' Linux. Waiting costs the same however many sockets are registered. '''
+
+    def __init__(self):
+        self._epoll = select.epoll()
+        self._filenos = set()
+
+    def register(self, fileno):
+        self.unregister(fileno) # A closed socket's number can be reused by a new one.
+        self._epoll.register(fileno, select.EPOLLIN)
+        self._filenos.add(fileno)
+
+    def unregister(self, fileno):
+        if fileno in self._filenos:
+            self._filenos.discard(fileno)
+            try:
+                self._epoll.unregister(fileno)
+            except (IOError, OSError, ValueError):
+                pass # Already closed, which removes it from the epoll set.
+
+    def select(self, timeout):
+        if not self._filenos:
+            time.sleep(timeout)
+            return []
+        return [fileno for fileno, _ in self._epoll.poll(timeout)]
+
+class _KqueueSelector(object):
+    ''' BSD and macOS. '''
+
+    def __init__(self):
+        self._kqueue = select.kqueue()
+        self._filenos = set()
+
+    def _control(self, fileno, flags):
+        self._kqueue.control([select.kevent(fileno, select.KQ_FILTER_READ, flags)], 0, 0)
+
+    def register(self, fileno):
+        self.unregister(fileno) # A closed socket's number can be reused by a new one.
+        self._control(fileno, select.KQ_EV_ADD)
+        self._filenos.add(fileno)
+
+    def unregister(self, fileno):
+        if fileno in self._filenos:
+            self._filenos.discard(fileno)
+            try:
+                self._control(fileno, select.KQ_EV_DELETE)
+            except (IOError, OSError, ValueError):
+                pass # Already closed, which removes it from the kqueue.
+
+    def select(self, timeout):
+        if not self._filenos:
+            time.sleep(timeout)
+            return []
+        return [event.ident for event in self._kqueue.control(None, len(self._filenos), timeout)]
+
+class _DefaultSelector(object):
+
+    def __init__(self):
+        self._selector = selectors.DefaultSelector()
+
+    def register(self, fileno):
+        self._selector.register(fileno, selectors.EVENT_READ)
+
+    def unregister(self, fileno):
+        try:
+            self._selector.unregister(fileno)
+        except (KeyError, ValueError):
+            pass
+
+    def select(self, timeout):
+        if not self._selector.get_map():
+            time.sleep(timeout)
+            return []
+        return [key.fd for key, _ in self._selector.select(timeout)]
+
+def _best_selector():
+    if selectors is not None:
+        return _DefaultSelector()
+    if hasattr(select, "epoll"):
+        return _EpollSelector()
+    if hasattr(select, "kqueue"):
+        return _KqueueSelector()
+    # Limited to file descriptors below 1024 on most systems.
+    return _SelectSelector()
+
+class WebSocketMultiplexer(object):
+
+    def __init__(self, ping_interval=30, loads=json.loads, name="WebSocketMultiplexer"):
+        '''
+        ping_interval is how many seconds apart each connection is pinged.
+        loads decodes every message before it is handed to on_message.
+        '''
+
+        self.ping_interval = ping_interval
+        self.loads = loads
+        self.name = name
+        self._selector = _best_selector()
+        self._registrations = {} # fileno -> _Registration
+        self._pings = [] # heap of (next ping time, fileno)
+        self._lock = Lock()
+        self._thread = None
+        self._stop = False
+
+    def register(self, ws, on_message, on_error=None, ping_interval=None):
+        '''
+        ws is a connected WebSocket from cryptotrader.librariesrequired.websocket.
+        on_message(message) is called with every decoded message ws receives, on the
+            multiplexer's thread. It must not block.
+        on_error(exception) is called once if ws fails. ws is unregistered first.
+        '''
+
+        registration = _Registration(ws, on_message, on_error,
+                                     self.ping_interval if ping_interval is None else ping_interval)
+        # Reads only wait briefly for the rest of a frame so one slow socket does not
+        # hold the others up. A frame that is cut off is resumed on the next read.
+        ws.settimeout(READ_TIMEOUT)
+        with self._lock:
+            self._registrations[registration.fileno] = registration
+            self._selector.register(registration.fileno)
+            heapq.heappush(self._pings, (registration.next_ping, registration.fileno))
+
+    def unregister(self, ws):
+        with self._lock:
+            for fileno, registration in list(self._registrations.items()):
+                if registration.ws is ws:
+                    self._remove(fileno)
+
+    def _remove(self, fileno):
+        ''' Pre: self._lock is held '''
+        if self._registrations.pop(fileno, None) is not None:
+            self._selector.unregister(fileno)
+
+    def __len__(self):
+        return len(self._registrations)
+
+    def _fail(self, registration, error):
+        with self._lock:
+            if self._registrations.get(registration.fileno) is not registration:
+                return # Already unregistered.
+            self._remove(registration.fileno)
+        if registration.on_error is not None:
+            registration.on_error(error)
+
+    def _read(self, registration):
+        '''
+        Post: Every complete frame already received on the connection has been dispatched.
+        '''
+
+        ws = registration.ws
+        while True:
+            try:
+                data = ws.recv_raw()
+            except WebSocketTimeoutException:
+                return # The rest of the frame has not arrived yet.
+            except Exception as e:
+                self._fail(registration, e)
+                return
+
+            if not ws.connected:
+                self._fail(registration, Warning("The server closed the connection."))
+                return
+            if data:
+                try:
+                    message = self.loads(data)
+                except ValueError:
+                    print(self.name + ": Could not decode " + repr(data[:200]))
+                else:
+                    try:
+                        registration.on_message(message)
+                    except Exception as e:
+                        # One bad message should not stop the other connections.
+                        print(self.name + ": Exception handling a message: " + str(e))
+
+            # Frames that arrived with this one, or that SSL has already decrypted,
+            # will not make the socket readable again.
+            if not ws.has_pending_data():
+                return
+
+    def _send_pings(self, now):
+        while True:
+            with self._lock:
+                if not self._pings or self._pings[0][0] > now:
+                    return
+                _, fileno = heapq.heappop(self._pings)
+                registration = self._registrations.get(fileno)
+                if registration is None:
+                    continue
+                registration.next_ping = now + registration.ping_interval
+                heapq.heappush(self._pings, (registration.next_ping, fileno))
+            try:
+                registration.ws.ping("keepalive")
+            except Exception as e:
+                self._fail(registration, e)
+
+    def _wait_time(self, now):
+        with self._lock:
+            if not self._pings:
+                return MAX_WAIT
+            return max(0, min(MAX_WAIT, self._pings[0][0] - now))
+
+    def run_once(self):
+        '''
+        Post: Every connection with data was read and every ping that is due was sent.
+        '''
+
+        readable = self._selector.select(self._wait_time(time.time()))
+        for fileno in readable:
+            registration = self._registrations.get(fileno)
+            if registration is not None:
+                self._read(registration)
+        self._send_pings(time.time())
+
+    def start(self):
+        '''
+        Post: Every registered connection is read from one background thread until stop().
+        '''
+
+        def _go():
+            while not self._stop:
+                try:
+                    self.run_once()
+                except Exception as e:
+                    # e.g. a socket closed by another thread while it was being selected on.
+                    print(self.name + ": " + str(e))
+                    self._drop_closed()
+
+        if self._thread is not None:
+            return
+        self._stop = False
+        self._thread = Thread(target=_go, name=self.name)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _drop_closed(self):
+        with self._lock:
+            closed = [registration for registration in self._registrations.values()
+                      if registration.ws.sock is None]
+        for registration in closed:
+            self._fail(registration, Warning("The connection was closed."))
+
+    def stop(self):
+        self._stop = True
+        self._thread = None
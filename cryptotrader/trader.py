@@ -5,11 +5,17 @@ Makes buying and selling decisions.
 '''
 
 from abc import ABCMeta, abstractmethod
+from cryptotrader import clock_sync
+from cryptotrader.helper_methods import monotonic
+from cryptotrader.latency import order_latency
 
 class Trader(object):
     
     __metaclass__ = ABCMeta
     
+    # Labels this trader's latency measurements and picks the exchange clock to use.
+    exchange = "unknown"
+    
     def __init__(self, is_test, minimum_trade, market_ticker=""):
         print("Created a trader.")
         self.balance = None
@@ -20,6 +26,16 @@ class Trader(object):
         self.minimum_trade = minimum_trade
         if market_ticker != "": # It is possible it was set manually before __init__ was called
             self.market_ticker = market_ticker
+        
+        # Used to measure how long orders take. See cryptotrader.latency
+        self.latency_recorder = order_latency.recorder
+        self.signal_time = None
+        self.order_acknowledged_at = None
+        self.order_endpoint = None
+        
+        # The exchange's time, used for nonces and to compare against exchange timestamps.
+        # A simulation uses the local clock until the trader is authenticated.
+        self.clock = clock_sync.clock_for(self.exchange, start=not is_test)
     
     @abstractmethod
     def buy(self, market_value):
@@ -32,6 +48,17 @@ class Trader(object):
     def hold(self, market_value):
         print("Need to override function 'hold' before using it")
         
+    def mark_signal(self):
+        ''' Post: The next order placed is measured from this moment. '''
+        self.signal_time = monotonic()
+        
+    def record_fill(self):
+        ''' Post: The time between the last order being acknowledged and now is recorded. '''
+        if self.order_acknowledged_at is not None:
+            self.latency_recorder.record(self.exchange, self.order_endpoint, order_latency.ACK_TO_FILL,
+                                         monotonic() - self.order_acknowledged_at)
+            self.order_acknowledged_at = None
+        
     def abort(self):
         ''' Post: Trader will not buy or sell. '''
         self.can_buy = False
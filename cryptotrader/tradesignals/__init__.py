@@ -1,2 +1,4 @@
 from strategy_observer import StrategyObserver
-from single_trade_strategy_observer import SingleTradeStrategyObserver
\ No newline at end of file
+from single_trade_strategy_observer import SingleTradeStrategyObserver
+from bars import Bar, TimeBarBuilder, TickBarBuilder, VolumeBarBuilder, MultiBarBuilder
+from market_buy_planner import plan_market_buy, MarketBuyPlan, ChildOrder
@@ -0,0 +1,223 @@
+'''
+Groups the prices coming out of a pipeline into bars (candles).
+
+Indicators like the SAR, ATR and stochastic oscillator are defined on the high,
+low and close of a period. Bars give them those periods no matter how often a
+pipeline polls:
+    TimeBarBuilder closes a bar every [seconds], filling gaps with flat bars.
+    TickBarBuilder closes a bar every [ticks] prices.
+    VolumeBarBuilder closes a bar once [volume] has traded.
+MultiBarBuilder passes one stream of prices to several builders, e.g. to build
+1 minute and 1 hour bars at the same time.
+
+Adding a price is O(1). Subscribers are called with each Bar as it closes.
+
+@author: Tobias Carryer
+'''
+
+import time
+from abc import ABCMeta, abstractmethod
+
+class Bar(object):
+
+    __slots__ = ["start", "end", "open", "high", "low", "close", "volume", "ticks"]
+
+    def __init__(self, start, price, volume=0):
+        self.start = start
+        self.end = start
+        self.open = price
+        self.high = price
+        self.low = price
+        self.close = price
+        self.volume = volume
+        self.ticks = 1
+
+    def add(self, price, volume=0, timestamp=None):
+        if price > self.high:
+            self.high = price
+        if price < self.low:
+            self.low = price
+        self.close = price
+        self.volume += volume
+        self.ticks += 1
+        if timestamp is not None:
+            self.end = timestamp
+
+    def __repr__(self):
+        return "Bar(start=%s, open=%s, high=%s, low=%s, close=%s, volume=%s, ticks=%s)" % (
+            self.start, self.open, self.high, self.low, self.close, self.volume, self.ticks)
+
+class BarBuilder(object):
+    '''
+    Parent of the bar builders. Children decide when a bar is complete.
+    '''
+
+    __metaclass__ = ABCMeta
+
+    def __init__(self, on_bar=None):
+        '''
+        on_bar is called with every completed Bar.
+        '''
+
+        self.subscribers = []
+        if on_bar is not None:
+            self.subscribers.append(on_bar)
+        self.bar = None
+
+    def subscribe(self, on_bar):
+        ''' Post: on_bar is also called with every completed Bar. '''
+        self.subscribers.append(on_bar)
+
+    def _emit(self, bar):
+        for on_bar in self.subscribers:
+            on_bar(bar)
+
+    @abstractmethod
+    def add(self, price, volume=0, timestamp=None):
+        ''' Post: price is in the bar in progress, which is emitted if it is complete. '''
+
+class TimeBarBuilder(BarBuilder):
+
+    def __init__(self, seconds, on_bar=None, fill_gaps=True, clock=time.time):
+        '''
+        seconds is the length of every bar. Bars start on multiples of seconds since the epoch.
+        fill_gaps: when no price arrives during a bar, a bar with no volume at the last close is
+                   emitted in its place so indicators keep counting time.
+        clock gives the timestamp of prices added without one, e.g. an exchange's ClockSync.time
+        '''
+
+        BarBuilder.__init__(self, on_bar)
+        self.seconds = seconds
+        self.fill_gaps = fill_gaps
+        self.clock = clock
+        self._last_close = None
+        # Start of the first period with no bar yet once flush() found the market quiet.
+        self._empty_start = None
+
+    def _bar_start(self, timestamp):
+        return timestamp - timestamp % self.seconds
+
+    def add(self, price, volume=0, timestamp=None):
+        if timestamp is None:
+            timestamp = self.clock()
+        start = self._bar_start(timestamp)
+
+        if self.bar is not None and start > self.bar.start:
+            self._close_until(start)
+        elif self.bar is None and self._empty_start is not None:
+            self._fill_gaps(self._empty_start, start, self._last_close)
+        self._empty_start = None
+        if self.bar is None:
+            self.bar = Bar(start, price, volume)
+            self.bar.end = timestamp
+        else:
+            self.bar.add(price, volume, timestamp)
+
+    def flush(self, timestamp=None):
+        '''
+        Post: Bars that ended before timestamp are emitted even if no price arrived after them.
+              Pipelines that poll slowly call this so a quiet market still produces bars.
+        '''
+
+        if timestamp is None:
+            timestamp = self.clock()
+        start = self._bar_start(timestamp)
+        if self.bar is not None and start > self.bar.start:
+            self._close_until(start)
+            self._empty_start = start
+        elif self.bar is None and self._empty_start is not None and start > self._empty_start:
+            # No price arrived in the periods since the last flush.
+            self._fill_gaps(self._empty_start, start, self._last_close)
+            self._empty_start = start
+
+    def _close_until(self, start):
+        '''
+        Post: The current bar and, if fill_gaps, a flat bar for every period up to start are emitted.
+        '''
+
+        bar = self.bar
+        self.bar = None
+        self._emit(bar)
+
+        self._fill_gaps(bar.start + self.seconds, start, bar.close)
+        self._last_close = bar.close
+
+    def _fill_gaps(self, gap_start, start, close):
+        '''
+        Post: If fill_gaps, a flat bar at close is emitted for every period from gap_start up to start.
+              The bar of a period with no prices is only emitted once the period is over, so the
+              first price of a later period starts a bar of its own.
+        '''
+
+        if not self.fill_gaps:
+            return
+        while gap_start < start:
+            self._emit(self._flat_bar(gap_start, close))
+            gap_start += self.seconds
+
+    def _flat_bar(self, start, close):
+        bar = Bar(start, close)
+        bar.ticks = 0
+        return bar
+
+class TickBarBuilder(BarBuilder):
+
+    def __init__(self, ticks, on_bar=None):
+        ''' ticks is how many prices make up a bar. '''
+        BarBuilder.__init__(self, on_bar)
+        self.ticks = ticks
+
+    def add(self, price, volume=0, timestamp=None):
+        if self.bar is None:
+            self.bar = Bar(timestamp, price, volume)
+        else:
+            self.bar.add(price, volume, timestamp)
+
+        if self.bar.ticks >= self.ticks:
+            bar = self.bar
+            self.bar = None
+            self._emit(bar)
+
+class VolumeBarBuilder(BarBuilder):
+
+    def __init__(self, volume, on_bar=None):
+        ''' volume is how much has to trade before a bar is complete. '''
+        BarBuilder.__init__(self, on_bar)
+        self.volume = volume
+
+    def add(self, price, volume=0, timestamp=None):
+        if self.bar is None:
+            self.bar = Bar(timestamp, price, volume)
+        else:
+            self.bar.add(price, volume, timestamp)
+
+        if self.bar.volume >= self.volume:
+            bar = self.bar
+            self.bar = None
+            self._emit(bar)
+
+class MultiBarBuilder(object):
+    '''
+    Passes every price to several bar builders.
+    '''
+
+    def __init__(self, builders, clock=time.time):
+        '''
+        clock timestamps prices added without a timestamp once so every builder sees the same time.
+        '''
+
+        self.builders = list(builders)
+        self.clock = clock
+
+    def add(self, price, volume=0, timestamp=None):
+        if timestamp is None:
+            timestamp = self.clock()
+        for builder in self.builders:
+            builder.add(price, volume, timestamp)
+
+    def flush(self, timestamp=None):
+        if timestamp is None:
+            timestamp = self.clock()
+        for builder in self.builders:
+            if isinstance(builder, TimeBarBuilder):
+                builder.flush(timestamp)
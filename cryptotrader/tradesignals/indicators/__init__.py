@@ -4,4 +4,7 @@ from exponential_moving_average import EMA
 from stop_and_reverse import SAR
 from stochastic_oscillator import StochasticOscillator
 from spread_size import SpreadSize
+from indicator import Indicator
+from ema_bank import EMABank, Crossover
+from depth import DepthBook
 from twitter import Twitter
\ No newline at end of file
@@ -3,6 +3,8 @@ An indicator that measures volatility.
 @author: Tobias Carryer
 '''
 
+from cryptotrader.tradesignals.indicators.indicator import Indicator, linear_recurrence, np
+
 def true_range(high, low, close):
     '''
     Welles Wilder invented TR and defined it as the greatest of the following:
@@ -10,30 +12,34 @@ def true_range(high, low, close):
     Method 2: Current High less the previous Close (absolute value)
     Method 3: Current Low less the previous Close (absolute value)
     '''
-    
+
     m1 = high - low
     m2 = abs(high - close)
     m3 = abs(low - close)
-    
+
     return max(m1, m2, m3)
-    
-class ATR(object):
-    
+
+def true_ranges(highs, lows, previous_closes):
+    ''' true_range() of numpy arrays, element by element. '''
+    return np.maximum(highs - lows, np.maximum(np.abs(highs - previous_closes), np.abs(lows - previous_closes)))
+
+class ATR(Indicator):
+
     def __init__(self, periods_per_atr=14):
         self.periods_per_atr = periods_per_atr
         self.initial_true_ranges = []
         self._atr = None
         self._previous_close = None
-        
+
     def is_set_up(self):
         return self._atr != None
-        
+
     def adjust(self, high, low, close):
         if self._previous_close != None:
             if not self.is_set_up():
                 #Initial ATR is the average of the past true ranges
                 self.initial_true_ranges.append(true_range(high, low, self._previous_close))
-                
+
                 if len(self.initial_true_ranges) >= self.periods_per_atr:
                     my_sum = 0
                     for tr in self.initial_true_ranges:
@@ -42,13 +48,57 @@ class ATR(object):
             else:
                 #Incorporate the current true range into the ATR
                 tr = true_range(high, low, self._previous_close)
-                
+
                 #Include the previous ATR to smooth the data
                 self._atr = (self._atr * (self.periods_per_atr-1) + tr) / self.periods_per_atr
-            
+
         self._previous_close = close
-        
+
+    def update(self, high, low, close):
+        self.adjust(high, low, close)
+
+    def compute(self, highs, lows, closes):
+        '''
+        Same as calling adjust() for every high, low and close, in one vectorized pass.
+        Agrees with adjust() up to floating point rounding.
+
+        Returns: A numpy array of the ATR after each data point, nan until it is set up.
+        '''
+
+        highs = np.asarray(highs, dtype=float)
+        lows = np.asarray(lows, dtype=float)
+        closes = np.asarray(closes, dtype=float)
+        atrs = np.full(len(closes), np.nan)
+        if len(closes) == 0:
+            return atrs
+
+        # The first data point has no previous close unless one was seen before.
+        first = 0
+        if self._previous_close == None:
+            first = 1
+        previous_closes = np.concatenate(([self._previous_close if first == 0 else np.nan], closes[:-1]))
+        trs = true_ranges(highs[first:], lows[first:], previous_closes[first:])
+
+        n = self.periods_per_atr
+        used = 0
+        if not self.is_set_up():
+            # Average the first true ranges to set the ATR up.
+            used = min(n - len(self.initial_true_ranges), len(trs))
+            self.initial_true_ranges.extend(float(tr) for tr in trs[:used])
+            if len(self.initial_true_ranges) >= n:
+                self._atr = sum(self.initial_true_ranges) / n
+                atrs[first + used - 1] = self._atr
+
+        if self.is_set_up() and used < len(trs):
+            # Wilder's smoothing: atr = atr * (n-1)/n + tr/n
+            smoothed = linear_recurrence(trs[used:] / n, (n - 1.0) / n, self._atr)
+            atrs[first + used:] = smoothed
+            self._atr = float(smoothed[-1])
+
+        self._previous_close = float(closes[-1])
+        return atrs
+
     def get(self):
         if not self.is_set_up():
             print("ATR is not set up but get() was called.")
-        return self._atr
\ No newline at end of file
+        return self._atr
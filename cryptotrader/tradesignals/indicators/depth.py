@@ -0,0 +1,217 @@
+'''
+Answers questions about the depth of an order book.
+
+A DepthBook sorts each side of the book once and keeps running totals of the
+quantity and of the value (price * quantity) from the best price outwards. After
+that, how much can be bought within X% of the best price, the average price of
+filling a size, the slippage of a list of sizes and the bid/ask imbalance are
+each a binary search.
+
+Values are floats. Convert to Decimal before placing an order with them.
+
+@author: Tobias Carryer
+'''
+
+from cryptotrader.lazy_import import LazyModule
+
+np = LazyModule("numpy")
+
+BIDS = "bids"
+ASKS = "asks"
+
+def _level(entry, price_key, quantity_key):
+    return float(entry[price_key]), float(entry[quantity_key])
+
+class _Side(object):
+    '''
+    One side of the book, best price first, with running totals.
+    '''
+
+    def __init__(self, levels, descending):
+        levels = np.asarray(levels, dtype=float).reshape(-1, 2)
+        order = np.argsort(-levels[:, 0] if descending else levels[:, 0], kind="mergesort")
+        self.prices = levels[order, 0]
+        self.quantities = levels[order, 1]
+        self.cumulative_quantities = np.cumsum(self.quantities)
+        self.cumulative_values = np.cumsum(self.prices * self.quantities)
+        self.descending = descending
+
+    def levels_within(self, price):
+        '''
+        Returns: How many levels are at or better than price.
+        '''
+
+        if self.descending:
+            # Bids are highest first. Search the negated prices which are ascending.
+            return int(np.searchsorted(-self.prices, -price, side="right"))
+        return int(np.searchsorted(self.prices, price, side="right"))
+
+    def _total(self, cumulative, levels):
+        if levels == 0:
+            return 0.0
+        return float(cumulative[levels - 1])
+
+    def quantity_within(self, price):
+        return self._total(self.cumulative_quantities, self.levels_within(price))
+
+    def value_within(self, price):
+        return self._total(self.cumulative_values, self.levels_within(price))
+
+    def values_to_fill(self, sizes):
+        '''
+        sizes is a numpy array of quantities.
+        Returns: The value of filling each size from the best price outwards,
+                 nan where the side is not deep enough.
+        '''
+
+        if len(self.prices) == 0:
+            return np.full(len(sizes), np.nan)
+        levels = np.searchsorted(self.cumulative_quantities, sizes, side="left")
+        deep_enough = levels < len(self.prices)
+        levels = np.minimum(levels, len(self.prices) - 1)
+
+        previous_quantity = np.where(levels > 0, self.cumulative_quantities[levels - 1], 0.0)
+        previous_value = np.where(levels > 0, self.cumulative_values[levels - 1], 0.0)
+        values = previous_value + (sizes - previous_quantity) * self.prices[levels]
+        return np.where(deep_enough, values, np.nan)
+
+    def quantity_for_value(self, value):
+        '''
+        Returns: The quantity that value buys (or sells for) from the best price outwards,
+                 None if the side is not deep enough.
+        '''
+
+        level = int(np.searchsorted(self.cumulative_values, value, side="left"))
+        if level >= len(self.prices):
+            return None
+        previous_quantity = self._total(self.cumulative_quantities, level)
+        previous_value = self._total(self.cumulative_values, level)
+        return previous_quantity + (value - previous_value) / self.prices[level]
+
+class DepthBook(object):
+
+    def __init__(self, bids, asks):
+        '''
+        bids and asks are lists of (price, quantity) in any order.
+        '''
+
+        self._sides = {BIDS: _Side(bids, descending=True), ASKS: _Side(asks, descending=False)}
+
+    @classmethod
+    def from_entries(cls, bids, asks, price_key="Price", quantity_key="Quantity"):
+        '''
+        bids and asks are order book entries as an exchange returns them, e.g. dictionaries
+        with a "Price" and "Quantity" or lists of [price, quantity, ...]. price_key and
+        quantity_key are the keys or indices of the price and quantity in an entry.
+        '''
+
+        return cls([_level(entry, price_key, quantity_key) for entry in bids],
+                   [_level(entry, price_key, quantity_key) for entry in asks])
+
+    def side(self, side):
+        return self._sides[side]
+
+    @property
+    def best_bid(self):
+        bids = self._sides[BIDS]
+        return float(bids.prices[0]) if len(bids.prices) else None
+
+    @property
+    def best_ask(self):
+        asks = self._sides[ASKS]
+        return float(asks.prices[0]) if len(asks.prices) else None
+
+    def mid_price(self):
+        if self.best_bid is None or self.best_ask is None:
+            return None
+        return (self.best_bid + self.best_ask) / 2
+
+    def _best(self, side):
+        return self.best_bid if side == BIDS else self.best_ask
+
+    def _price_within(self, side, percent):
+        '''
+        percent is a fraction, e.g. 0.02 for 2%
+        Returns: The worst price within percent of the side's best price.
+        '''
+
+        if side == BIDS:
+            return self.best_bid * (1 - percent)
+        return self.best_ask * (1 + percent)
+
+    def quantity_within(self, side, price):
+        ''' Returns: The quantity offered at price or better. '''
+        return self._sides[side].quantity_within(price)
+
+    def value_within(self, side, price):
+        ''' Returns: The value (price * quantity) offered at price or better. '''
+        return self._sides[side].value_within(price)
+
+    def liquidity_within_percent(self, side, percent):
+        '''
+        percent is a fraction of the best price on the side, e.g. 0.02 for 2%
+        Returns: (quantity, value) offered within percent of the best price.
+        '''
+
+        if self._best(side) is None:
+            return 0.0, 0.0
+        price = self._price_within(side, percent)
+        return self.quantity_within(side, price), self.value_within(side, price)
+
+    def vwap(self, side, size):
+        '''
+        Returns: The average price of filling size from the side (ASKS to buy, BIDS to sell),
+                 None if the side is not deep enough.
+        '''
+
+        value = self._sides[side].values_to_fill(np.array([size], dtype=float))[0]
+        if np.isnan(value) or size == 0:
+            return None
+        return float(value / size)
+
+    def slippage_curve(self, side, sizes):
+        '''
+        sizes is a list of quantities.
+        Returns: A numpy array of how much worse than the best price the average price of
+                 filling each size is, as a fraction. nan where the side is not deep enough.
+        '''
+
+        sizes = np.asarray(sizes, dtype=float)
+        best = self._best(side)
+        if best is None:
+            return np.full(len(sizes), np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            vwaps = self._sides[side].values_to_fill(sizes) / sizes
+        if side == BIDS:
+            return 1 - vwaps / best
+        return vwaps / best - 1
+
+    def slippage(self, side, size):
+        return float(self.slippage_curve(side, [size])[0])
+
+    def quantity_for_value(self, side, value):
+        '''
+        Returns: How much value buys from the asks (or how much has to be sold into the bids to
+                 get value), None if the side is not deep enough.
+        '''
+
+        return self._sides[side].quantity_for_value(value)
+
+    def imbalance(self, percent=None):
+        '''
+        percent limits both sides to within percent of their best price. The whole book is used if None.
+        Returns: (bid quantity - ask quantity) / (bid quantity + ask quantity), between -1 and 1.
+                 Positive when there are more buyers. None if the book is empty.
+        '''
+
+        bids = self._sides[BIDS]
+        asks = self._sides[ASKS]
+        if percent is None:
+            bid_quantity = bids._total(bids.cumulative_quantities, len(bids.prices))
+            ask_quantity = asks._total(asks.cumulative_quantities, len(asks.prices))
+        else:
+            bid_quantity = self.liquidity_within_percent(BIDS, percent)[0]
+            ask_quantity = self.liquidity_within_percent(ASKS, percent)[0]
+        if bid_quantity + ask_quantity == 0:
+            return None
+        return (bid_quantity - ask_quantity) / (bid_quantity + ask_quantity)
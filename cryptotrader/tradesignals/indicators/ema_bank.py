@@ -0,0 +1,104 @@
+'''
+Many exponential moving averages over many markets, updated together.
+
+An EMABank keeps an EMA for every combination of market and length in one
+(markets x lengths) numpy array. A tick for every market is one array operation
+no matter how many EMAs there are, and the crossovers of every watched pair of
+lengths come out of the same update.
+
+@author: Tobias Carryer
+'''
+
+from collections import namedtuple
+from cryptotrader.tradesignals.indicators.indicator import Indicator, np
+
+# is_bullish is True when the short EMA crossed above the long EMA.
+Crossover = namedtuple("Crossover", ["market", "short_length", "long_length", "is_bullish"])
+
+class EMABank(Indicator):
+
+    def __init__(self, markets, lengths, pairs=None):
+        '''
+        markets names the markets in the order their values are passed to update().
+        lengths are the EMA lengths, in data points, kept for every market.
+        pairs is a list of (short_length, long_length) to watch for crossovers.
+        Every pair of lengths is watched if pairs is None.
+        '''
+
+        self.markets = list(markets)
+        self.lengths = list(lengths)
+        self._multipliers = 2.0 / (np.array(self.lengths, dtype=float) + 1)
+
+        # Every EMA is nan until its market's first value.
+        self._emas = np.full((len(self.markets), len(self.lengths)), np.nan)
+
+        if pairs is None:
+            pairs = [(self.lengths[i], self.lengths[j])
+                     for i in range(len(self.lengths)) for j in range(i + 1, len(self.lengths))]
+        self.pairs = [(min(pair), max(pair)) for pair in pairs]
+        self._short_columns = np.array([self.lengths.index(short) for short, _ in self.pairs], dtype=int)
+        self._long_columns = np.array([self.lengths.index(long_) for _, long_ in self.pairs], dtype=int)
+
+        # Whether each watched short EMA is above its long EMA, per market.
+        self._short_is_above = np.zeros((len(self.markets), len(self.pairs)), dtype=bool)
+        self._compared = np.zeros((len(self.markets), len(self.pairs)), dtype=bool)
+
+    def update(self, values):
+        '''
+        values has the latest value of every market, in the order of self.markets.
+        A market whose value is nan or None keeps its EMAs.
+
+        Returns: A list of Crossover for every watched pair that crossed on this update.
+        '''
+
+        values = np.array(values, dtype=float)
+        has_value = ~np.isnan(values)
+        values = values[:, None]
+
+        # Markets seeing their first value start their EMAs at it.
+        self._emas = np.where(np.isnan(self._emas), values, self._emas)
+        updated = self._emas + (values - self._emas) * self._multipliers
+        self._emas = np.where(has_value[:, None], updated, self._emas)
+
+        return self._crossovers(has_value)
+
+    def _crossovers(self, has_value):
+        short_emas = self._emas[:, self._short_columns]
+        long_emas = self._emas[:, self._long_columns]
+        short_is_above = short_emas > long_emas
+        differs = short_emas != long_emas
+
+        # Equal EMAs have not crossed yet, keep the previous side.
+        short_is_above = np.where(differs, short_is_above, self._short_is_above)
+        crossed = self._compared & (short_is_above != self._short_is_above) & has_value[:, None]
+
+        self._compared |= differs & has_value[:, None]
+        self._short_is_above = short_is_above
+
+        crossovers = []
+        for market_index, pair_index in zip(*np.nonzero(crossed)):
+            short_length, long_length = self.pairs[pair_index]
+            crossovers.append(Crossover(self.markets[market_index], short_length, long_length,
+                                        bool(short_is_above[market_index, pair_index])))
+        return crossovers
+
+    def compute(self, values):
+        '''
+        values is a (time x markets) array of history, oldest first.
+        Returns: Every Crossover in the history, in order.
+        '''
+
+        crossovers = []
+        for row in np.asarray(values, dtype=float):
+            crossovers.extend(self.update(row))
+        return crossovers
+
+    def get(self):
+        ''' Returns: The (markets x lengths) array of EMAs. '''
+        return self._emas
+
+    def ema(self, market, length):
+        return float(self._emas[self.markets.index(market), self.lengths.index(length)])
+
+    def is_set_up(self):
+        return not np.isnan(self._emas).any()
@@ -2,25 +2,52 @@
 @author: Tobias Carryer
 '''
 
-class EMA(object):
+from cryptotrader.tradesignals.indicators.indicator import Indicator, linear_recurrence, np
+
+class EMA(Indicator):
 
     def __init__(self, initial_ema, moving_average_length):
         '''
         initial_ema is the exponential moving average the instant the Moving Average was created.
-        
+
         moving_average_length is how many data points should be taken into consideration
         when calculating the MA.
         '''
-        
-        print("Created EMA assistant.")
-        
+
         self._ema = initial_ema
-        
-        self._ema_multiplier = 2 / (moving_average_length + 1)
-        
+
+        # 2.0 so an integer length does not round the multiplier down to 0.
+        self._ema_multiplier = 2.0 / (moving_average_length + 1)
+
     def get(self):
         return self._ema
-    
+
     def add_data_point(self, value):
         #Weigh how much value changes the EMA so more recent values affect the EMA more.
-        self._ema = (value - self._ema) * self._ema_multiplier + self._ema
\ No newline at end of file
+        self._ema = (value - self._ema) * self._ema_multiplier + self._ema
+
+    def reset(self, initial_ema):
+        ''' Post: The EMA starts over from initial_ema. '''
+        self._ema = initial_ema
+
+    def update(self, value):
+        self.add_data_point(value)
+
+    def on_bar(self, bar):
+        self.add_data_point(bar.close)
+
+    def compute(self, values):
+        '''
+        Same as calling add_data_point() for every value, in one vectorized pass.
+        Agrees with add_data_point() up to floating point rounding.
+
+        Returns: A numpy array of the EMA after each value.
+        '''
+
+        values = np.asarray(values, dtype=float)
+        if len(values) == 0:
+            return values.copy()
+
+        emas = linear_recurrence(self._ema_multiplier * values, 1 - self._ema_multiplier, float(self._ema))
+        self._ema = float(emas[-1])
+        return emas
@@ -0,0 +1,110 @@
+'''
+What every indicator can do.
+
+An indicator is updated one data point at a time with live data and computed
+over whole arrays of historical data. Both modes share the indicator's state:
+compute() leaves the indicator exactly where update() would have, so a strategy
+can warm up on history in one call and then keep going with live ticks.
+
+@author: Tobias Carryer
+'''
+
+import copy
+from abc import ABCMeta, abstractmethod
+from math import log
+from cryptotrader.lazy_import import LazyModule
+
+# numpy is only needed by compute()
+np = LazyModule("numpy")
+
+# Powers of the decay are kept above this inside a block so dividing by them
+# in linear_recurrence() does not lose precision.
+_SMALLEST_POWER = 1e-4
+
+def linear_recurrence(inputs, decay, initial):
+    '''
+    Solves y[t] = decay * y[t-1] + inputs[t] for every t in one vectorized pass.
+    Exponential moving averages and Wilder's smoothing are both this recurrence.
+
+    Pre: 0 <= decay <= 1
+    Returns: A numpy array of y, starting from y[-1] = initial
+    '''
+
+    inputs = np.asarray(inputs, dtype=float)
+    if len(inputs) == 0:
+        return inputs.copy()
+    if decay == 0:
+        return inputs.copy()
+    if decay == 1:
+        return initial + np.cumsum(inputs)
+
+    # Split the series into blocks. Inside a block every y is the block's starting
+    # value times a power of the decay plus a cumulative sum, the starting values
+    # themselves are the same recurrence over the blocks.
+    block = max(2, int(log(_SMALLEST_POWER) / log(decay)))
+    blocks = -(-len(inputs) // block)
+    padded = np.zeros(blocks * block)
+    padded[:len(inputs)] = inputs
+    padded = padded.reshape(blocks, block)
+
+    powers = decay ** np.arange(block + 1)
+    within_block = powers[:block] * np.cumsum(padded / powers[:block], axis=1)
+    block_ends = linear_recurrence(within_block[:, -1], powers[block], initial)
+    block_starts = np.concatenate(([initial], block_ends[:-1]))
+
+    y = within_block + block_starts[:, None] * powers[1:]
+    return y.ravel()[:len(inputs)]
+
+class Indicator(object):
+
+    __metaclass__ = ABCMeta
+
+    @abstractmethod
+    def update(self, *data_point):
+        ''' Post: The indicator includes the data point. '''
+
+    @abstractmethod
+    def get(self):
+        ''' Returns: The indicator's current value. '''
+
+    def is_set_up(self):
+        ''' Returns True if get() will not return None '''
+        return True
+
+    def on_bar(self, bar):
+        '''
+        Post: The indicator includes the high, low and close of a cryptotrader.tradesignals.bars.Bar
+              so it can subscribe to a bar builder.
+        '''
+        self.update(bar.high, bar.low, bar.close)
+
+    def compute(self, *series):
+        '''
+        Same as calling update() with every data point in the series in order.
+        Indicators override this with a vectorized version. Requires numpy.
+
+        Returns: A numpy array with the indicator's value after each data point,
+                 nan where the indicator was not set up yet.
+        '''
+
+        values = np.full(len(series[0]), np.nan)
+        for i, data_point in enumerate(zip(*series)):
+            self.update(*data_point)
+            if self.is_set_up():
+                values[i] = self.get()
+        return values
+
+    def snapshot(self):
+        '''
+        Returns: A copy of the indicator's state that restore() can go back to.
+        '''
+
+        return copy.deepcopy(self.__dict__)
+
+    def restore(self, snapshot):
+        '''
+        Post: The indicator is in the state it was in when snapshot was taken.
+        '''
+
+        self.__dict__.clear()
+        self.__dict__.update(copy.deepcopy(snapshot))
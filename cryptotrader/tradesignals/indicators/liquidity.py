@@ -1,22 +1,23 @@
 from decimal import Decimal
+from cryptotrader.tradesignals.indicators.depth import DepthBook, BIDS, ASKS
 
-def sum_liquidity(book, max_price=None, min_price=None):
+def sum_liquidity(book, max_price=None, min_price=None, price_key="Price", quantity_key="Quantity"):
     '''
-    max_price is for summing sells
-    min_price is for summing buys
-    Assumes the format [{"Price": number, "Quantity": number}]
+    max_price is for summing sells: the quantity asked at max_price or lower.
+    min_price is for summing buys: the quantity bid at min_price or higher.
+    book is a DepthBook or one side of an order book in any order, by default in the format
+    [{"Price": number, "Quantity": number}]
+    Sorting a side is O(n log n) and a query of a DepthBook is a binary search, so a caller
+    that asks more than once about the same book builds a DepthBook once per book update
+    and passes that.
+    Returns: The quantity as a Decimal.
     '''
-    sum_of_orders = Decimal(0)
-    for entry in book:
-        if max_price:
-            if Decimal(entry["Price"]) > max_price:
-                sum_of_orders += Decimal(entry["Quantity"])
-            else:
-                break
-        else:
-            if entry["Price"] < min_price:
-                sum_of_orders += Decimal(entry["Quantity"])
-            else:
-                break
-    return sum_of_orders
-                
\ No newline at end of file
+    if max_price is not None:
+        if not isinstance(book, DepthBook):
+            book = DepthBook.from_entries([], book, price_key, quantity_key)
+        total = book.quantity_within(ASKS, float(max_price))
+    else:
+        if not isinstance(book, DepthBook):
+            book = DepthBook.from_entries(book, [], price_key, quantity_key)
+        total = book.quantity_within(BIDS, float(min_price))
+    return Decimal(repr(total))
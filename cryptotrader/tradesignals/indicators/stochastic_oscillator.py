@@ -5,49 +5,168 @@ Invented by George Lane.
 @author Tobias Carryer.
 '''
 
-class StochasticOscillator(object):
-    
+from collections import deque
+from cryptotrader.tradesignals.indicators.indicator import Indicator, np
+
+def _rolling_extreme(values, window, extreme):
+    '''
+    van Herk/Gil-Werman: the maximum (or minimum) of every [window] consecutive values
+    in three passes, no matter how long the window is.
+
+    extreme is np.maximum or np.minimum
+    Returns: An array with len(values) - window + 1 entries. Entry i covers values[i:i+window]
+    '''
+
+    blocks = -(-len(values) // window)
+    padded = np.empty(blocks * window)
+    padded[:len(values)] = values
+    padded[len(values):] = values[-1]
+    padded = padded.reshape(blocks, window)
+
+    # Extreme from the start of each block up to a value, and from a value to the end of its block.
+    prefix = extreme.accumulate(padded, axis=1).ravel()
+    suffix = extreme.accumulate(padded[:, ::-1], axis=1)[:, ::-1].ravel()
+
+    count = len(values) - window + 1
+    return extreme(suffix[:count], prefix[window - 1:window - 1 + count])
+
+class StochasticOscillator(Indicator):
+
     def __init__(self, periods_to_track=14):
         self.periods_to_track = periods_to_track
-        self._lows = []
-        self._highs = []
+
+        # Ring buffers of the last [periods_to_track] highs and lows.
+        # Data point i is kept at index i % periods_to_track.
+        self._lows = [None] * periods_to_track
+        self._highs = [None] * periods_to_track
+        self._count = 0
+
+        # Data point numbers in the window whose high (low) is larger (smaller) than every
+        # high (low) after them. The front of each is the window's highest high (lowest low).
+        self._highest = deque()
+        self._lowest = deque()
+
         self._oscillator_reading = None
-        
+
     def is_set_up(self):
         '''
         Returns True if get() will not return None
         '''
-        
+
         return self._oscillator_reading != None
-    
+
+    def _push(self, high, low):
+        n = self.periods_to_track
+        i = self._count
+
+        # Forget the data point that is leaving the window before its slot is reused.
+        if self._highest and self._highest[0] <= i - n:
+            self._highest.popleft()
+        if self._lowest and self._lowest[0] <= i - n:
+            self._lowest.popleft()
+
+        self._highs[i % n] = high
+        self._lows[i % n] = low
+        self._count += 1
+
+        while self._highest and self._highs[self._highest[-1] % n] <= high:
+            self._highest.pop()
+        self._highest.append(i)
+        while self._lowest and self._lows[self._lowest[-1] % n] >= low:
+            self._lowest.pop()
+        self._lowest.append(i)
+
     def adjust(self, high, low, close):
-        self._highs.append(high)
-        self._lows.append(low)
-        
+        self._push(high, low)
+
         #Check enough data has been passed to the oscillator
-        if len(self._highs) > self.periods_to_track:
-            #Keep number of highs / lows at periods_to_track
-            self._highs.pop(0)
-            self._lows.pop(0)
-            
+        if self._count > self.periods_to_track:
             #Get the all time high and low of the past [periods_to_track] periods
-            high = 0
-            for h in self._highs:
-                if h > high:
-                    high = h
-            low = float("inf")
-            for l in self._lows:
-                if l < low:
-                    low = l
-                    
+            n = self.periods_to_track
+            high = self._highs[self._highest[0] % n]
+            low = self._lows[self._lowest[0] % n]
+
             #Calculate the oscillator reading
             if high - low == 0:
                 #Prevent division by zero error
                 self._oscillator_reading = 0
             else:
                 self._oscillator_reading = 100 * (close - low) / (high - low)
-        
+
+    def adjust_many(self, highs, lows, closes):
+        '''
+        Same as calling adjust() for every high, low and close in order, computed in one
+        vectorized pass for backtests. Requires numpy.
+
+        Returns: A numpy array with the reading after each data point. The readings are floats
+                 and are nan where the oscillator was not set up yet.
+        Post: get() returns the last reading and adjust() continues from the last data point.
+        '''
+
+        highs = np.asarray(highs, dtype=float)
+        lows = np.asarray(lows, dtype=float)
+        closes = np.asarray(closes, dtype=float)
+        readings = np.full(len(closes), np.nan)
+        if len(closes) == 0:
+            return readings
+
+        # The window the oscillator already has is needed by the first new readings.
+        n = self.periods_to_track
+        kept = min(self._count, n)
+        first_kept = self._count - kept
+        previous_highs = [self._highs[i % n] for i in range(first_kept, self._count)]
+        previous_lows = [self._lows[i % n] for i in range(first_kept, self._count)]
+        all_highs = np.concatenate((previous_highs, highs))
+        all_lows = np.concatenate((previous_lows, lows))
+
+        if len(all_highs) >= n:
+            window_highs = _rolling_extreme(all_highs, n, np.maximum)
+            window_lows = _rolling_extreme(all_lows, n, np.minimum)
+
+            # Data point number first_kept + j closes the window that starts at j - n + 1.
+            # Readings start once more than n data points were seen.
+            first_reading = max(self._count, n)
+            new_offset = first_reading - self._count
+            window_offset = first_reading - first_kept - n + 1
+            high = window_highs[window_offset:]
+            low = window_lows[window_offset:]
+            spread = high - low
+            with np.errstate(divide="ignore", invalid="ignore"):
+                reading = np.where(spread == 0, 0.0, 100 * (closes[new_offset:] - low) / spread)
+            readings[new_offset:] = reading
+
+        self._count = first_kept + len(all_highs)
+        for i in range(max(first_kept, self._count - n), self._count):
+            self._highs[i % n] = float(all_highs[i - first_kept])
+            self._lows[i % n] = float(all_lows[i - first_kept])
+        self._rebuild_window()
+        if not np.isnan(readings[-1]):
+            self._oscillator_reading = float(readings[-1])
+        return readings
+
+    def _rebuild_window(self):
+        '''
+        Post: The deques describe the window in the ring buffers ending at data point _count - 1.
+        '''
+
+        n = self.periods_to_track
+        self._highest.clear()
+        self._lowest.clear()
+        for i in range(max(0, self._count - n), self._count):
+            while self._highest and self._highs[self._highest[-1] % n] <= self._highs[i % n]:
+                self._highest.pop()
+            self._highest.append(i)
+            while self._lowest and self._lows[self._lowest[-1] % n] >= self._lows[i % n]:
+                self._lowest.pop()
+            self._lowest.append(i)
+
+    def update(self, high, low, close):
+        self.adjust(high, low, close)
+
+    def compute(self, highs, lows, closes):
+        return self.adjust_many(highs, lows, closes)
+
     def get(self):
         if self._oscillator_reading == None:
             print("StochasticOscillator is not set up but get() was called.")
-        return self._oscillator_reading
\ No newline at end of file
+        return self._oscillator_reading
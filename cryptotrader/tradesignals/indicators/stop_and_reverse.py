@@ -3,7 +3,9 @@ Indicates when the trend changes direction.
 @author Tobias Carryer
 '''
 
-class SAR(object):
+from cryptotrader.tradesignals.indicators.indicator import Indicator, np
+
+class SAR(Indicator):
     
     def __init__(self, acceleration_factor=0.02, max_acceleration_factor=0.2):
         self.af = acceleration_factor
@@ -107,4 +109,299 @@ class SAR(object):
         if reverse:
             return self._bull
         else:
-            return None
\ No newline at end of file
+            return None
+
+    def update(self, high, low):
+        return self.adjust(high, low)
+
+    def on_bar(self, bar):
+        self.adjust(bar.high, bar.low)
+
+    def get(self):
+        return self._sar
+
+    def compute(self, highs, lows):
+        '''
+        Same as calling adjust() for every high and low, bit for bit, in a tight loop
+        (compiled if numba is installed).
+        Returns: A numpy array of the SAR after each period, nan until it is set up.
+        '''
+
+        sars = np.full(len(highs), np.nan)
+        reversals = np.zeros(len(highs), dtype=np.int8)
+
+        # Set up goes through adjust(), it takes at most two periods.
+        start = 0
+        while start < len(highs) and not self.is_set_up():
+            self.adjust(float(highs[start]), float(lows[start]))
+            if self._sar is not None:
+                sars[start] = self._sar
+            start += 1
+        if start == len(highs):
+            return sars
+
+        state = (self.af, self._bull, self._sar, self._hp, self._lp, self._previous_low,
+                 self._previous_previous_low, self._previous_high, self._previous_previous_high)
+        state = _run_loop(np.asarray(highs[start:], dtype=float), np.asarray(lows[start:], dtype=float),
+                          self.initial_af, self.max_af, state, sars[start:], reversals[start:])
+        (self.af, self._bull, self._sar, self._hp, self._lp, self._previous_low,
+         self._previous_previous_low, self._previous_high, self._previous_previous_high) = state
+        return sars
+
+# Reversal codes returned by sar_series()
+REVERSED_TO_BULL = 1
+REVERSED_TO_BEAR = -1
+
+def _sar_loop(highs, lows, initial_af, max_af, af, bull, sar, hp, lp, pl, ppl, ph, pph, sars, reversals):
+    '''
+    SAR.adjust() after set up, for a whole series. Written so numba can compile it as is.
+    pl/ppl are the previous and second previous lows, ph/pph the previous and second previous highs.
+    Returns: The state after the last period.
+    '''
+
+    for t in range(len(highs)):
+        high = highs[t]
+        low = lows[t]
+
+        if bull:
+            sar = sar + af * (hp - sar)
+        else:
+            sar = sar + af * (lp - sar)
+
+        reversal = 0
+        if bull:
+            if low < sar:
+                bull = False
+                reversal = -1
+                sar = hp
+                lp = low
+                af = initial_af
+        else:
+            if high > sar:
+                bull = True
+                reversal = 1
+                sar = lp
+                hp = high
+                af = initial_af
+        if reversal == 0:
+            if bull:
+                if high > hp:
+                    hp = high
+                    af = min(af + initial_af, max_af)
+                if pl < sar:
+                    sar = pl
+                if ppl < sar:
+                    sar = ppl
+            else:
+                if low < lp:
+                    lp = low
+                    af = min(af + initial_af, max_af)
+                if ph > sar:
+                    sar = ph
+                if pph > sar:
+                    sar = pph
+
+        ppl = pl
+        pl = low
+        pph = ph
+        ph = high
+
+        sars[t] = sar
+        reversals[t] = reversal
+    return af, bull, sar, hp, lp, pl, ppl, ph, pph
+
+_compiled_sar_loop = None
+
+def _compiled_loop():
+    '''
+    Returns: _sar_loop compiled by numba, or None if numba is not installed.
+             numba is only imported the first time a series is computed.
+    '''
+
+    global _compiled_sar_loop
+    if _compiled_sar_loop is None:
+        try:
+            import numba
+            _compiled_sar_loop = numba.njit(_sar_loop)
+        except ImportError:
+            _compiled_sar_loop = False
+    return _compiled_sar_loop or None
+
+def _run_loop(highs, lows, initial_af, max_af, state, sars, reversals):
+    '''
+    Runs _sar_loop compiled by numba when it is installed, otherwise on Python lists
+    which are quicker to index than numpy arrays.
+    Post: sars and reversals (numpy arrays) are filled in.
+    Returns: The state after the last period.
+    '''
+
+    if _compiled_loop() is not None:
+        state = tuple(float(x) if not isinstance(x, bool) else x for x in state)
+        return _compiled_sar_loop(highs, lows, float(initial_af), float(max_af), *(state + (sars, reversals)))
+
+    sars_list = [0.0] * len(highs)
+    reversals_list = [0] * len(highs)
+    state = _sar_loop(highs.tolist(), lows.tolist(), initial_af, max_af, *(state + (sars_list, reversals_list)))
+    sars[:] = sars_list
+    reversals[:] = reversals_list
+    return state
+
+# Below this many columns sar_series() runs the loop once per column instead of
+# stepping every column at once with numpy.
+_VECTORIZE_FROM_COLUMNS = 16
+
+def sar_series(highs, lows, acceleration_factor=0.02, max_acceleration_factor=0.2):
+    '''
+    The parabolic SAR of whole series at once, for backtests. Gives the same values as
+    SAR.compute(), bit for bit.
+
+    highs and lows are arrays of periods, either one market (1-D) or one market per
+    column (2-D, periods x markets).
+    acceleration_factor and max_acceleration_factor are numbers or 1-D arrays with a value per
+    column. A 1-D series with arrays of factors is computed once per pair of factors.
+
+    Returns: (sars, reversals), both periods x columns (or 1-D for a 1-D series with number factors).
+             sars is nan until the SAR is set up. reversals is REVERSED_TO_BULL, REVERSED_TO_BEAR or 0.
+    '''
+
+    highs = np.asarray(highs, dtype=float)
+    lows = np.asarray(lows, dtype=float)
+    one_dimensional = highs.ndim == 1
+    if one_dimensional:
+        highs = highs[:, None]
+        lows = lows[:, None]
+
+    periods = highs.shape[0]
+    initial_afs = np.asarray(acceleration_factor, dtype=float)
+    max_afs = np.asarray(max_acceleration_factor, dtype=float)
+    columns = max(highs.shape[1], initial_afs.size, max_afs.size)
+    if one_dimensional and columns == 1 and initial_afs.ndim == 0 and max_afs.ndim == 0:
+        squeeze = True
+    else:
+        squeeze = False
+    highs = np.broadcast_to(highs, (periods, columns))
+    lows = np.broadcast_to(lows, (periods, columns))
+    initial_afs = np.broadcast_to(initial_afs, (columns,)).astype(float)
+    max_afs = np.broadcast_to(max_afs, (columns,)).astype(float)
+
+    sars = np.full((periods, columns), np.nan)
+    reversals = np.zeros((periods, columns), dtype=np.int8)
+
+    # Set up: the first period is remembered, the second decides the trend and the initial SAR.
+    # Like SAR._set_up(), the previous high and low are not moved forward by the second period.
+    if periods >= 2:
+        pl = lows[0].copy()
+        ph = highs[0].copy()
+        lp = np.minimum(pl, lows[1])
+        hp = np.maximum(ph, highs[1])
+        bull = ph < highs[1]
+        sars[1] = np.where(bull, lp, hp)
+        ppl = np.full(columns, np.inf)
+        pph = np.zeros(columns)
+        af = initial_afs.copy()
+
+        if _compiled_loop() is not None or columns < _VECTORIZE_FROM_COLUMNS:
+            for c in range(columns):
+                state = (float(af[c]), bool(bull[c]), float(sars[1, c]), float(hp[c]), float(lp[c]),
+                         float(pl[c]), float(ppl[c]), float(ph[c]), float(pph[c]))
+                column_sars = np.empty(periods - 2)
+                column_reversals = np.empty(periods - 2, dtype=np.int8)
+                _run_loop(np.ascontiguousarray(highs[2:, c]), np.ascontiguousarray(lows[2:, c]),
+                          float(initial_afs[c]), float(max_afs[c]), state, column_sars, column_reversals)
+                sars[2:, c] = column_sars
+                reversals[2:, c] = column_reversals
+        else:
+            _vectorized_loop(highs, lows, initial_afs, max_afs, af, bull, sars[1].copy(), hp, lp,
+                             pl, ppl, ph, pph, sars, reversals)
+
+    if squeeze:
+        return sars[:, 0], reversals[:, 0]
+    return sars, reversals
+
+def _vectorized_loop(highs, lows, initial_afs, max_afs, af, bull, sar, hp, lp, pl, ppl, ph, pph, sars, reversals):
+    '''
+    _sar_loop() for every column at once, one numpy step per period from the third period on.
+    '''
+
+    for t in range(2, highs.shape[0]):
+        high = highs[t]
+        low = lows[t]
+
+        sar = np.where(bull, sar + af * (hp - sar), sar + af * (lp - sar))
+
+        to_bear = bull & (low < sar)
+        to_bull = ~bull & (high > sar)
+        reversed_ = to_bear | to_bull
+        sar = np.where(to_bear, hp, np.where(to_bull, lp, sar))
+        lp = np.where(to_bear, low, lp)
+        hp = np.where(to_bull, high, hp)
+        af = np.where(reversed_, initial_afs, af)
+        bull = bull ^ reversed_
+
+        rising = ~reversed_ & bull
+        new_high = rising & (high > hp)
+        hp = np.where(new_high, high, hp)
+        af = np.where(new_high, np.minimum(af + initial_afs, max_afs), af)
+        sar = np.where(rising & (pl < sar), pl, sar)
+        sar = np.where(rising & (ppl < sar), ppl, sar)
+
+        falling = ~reversed_ & ~bull
+        new_low = falling & (low < lp)
+        lp = np.where(new_low, low, lp)
+        af = np.where(new_low, np.minimum(af + initial_afs, max_afs), af)
+        sar = np.where(falling & (ph > sar), ph, sar)
+        sar = np.where(falling & (pph > sar), pph, sar)
+
+        ppl = pl
+        pl = low
+        pph = ph
+        ph = high
+
+        sars[t] = sar
+        reversals[t] = np.where(to_bull, REVERSED_TO_BULL, np.where(to_bear, REVERSED_TO_BEAR, 0))
+
+if __name__ == "__main__":
+    import time
+
+    # Bit for bit against the streaming class.
+    random = np.random.RandomState(0)
+    highs = 100 + np.cumsum(random.randn(20000, 4), axis=0)
+    lows = highs - random.rand(20000, 4) * 2
+    factors = [(0.01, 0.1), (0.02, 0.2), (0.02, 0.3), (0.03, 0.2)]
+    reversal_codes = {True: REVERSED_TO_BULL, False: REVERSED_TO_BEAR, None: 0}
+    for columns in (4, 4 * _VECTORIZE_FROM_COLUMNS):
+        batch_sars, batch_reversals = sar_series(np.tile(highs, columns // 4), np.tile(lows, columns // 4),
+                                                 acceleration_factor=[af for af, _ in factors] * (columns // 4),
+                                                 max_acceleration_factor=[m for _, m in factors] * (columns // 4))
+        for c, (af, max_af) in enumerate(factors):
+            streaming = SAR(af, max_af)
+            streaming_sars = np.full(len(highs), np.nan)
+            streaming_reversals = np.zeros(len(highs), dtype=np.int8)
+            for t, (h, l) in enumerate(zip(highs[:, c].tolist(), lows[:, c].tolist())):
+                streaming_reversals[t] = reversal_codes[streaming.adjust(h, l)]
+                if streaming._sar is not None:
+                    streaming_sars[t] = streaming._sar
+            assert np.array_equal(np.isnan(batch_sars[:, c]), np.isnan(streaming_sars))
+            set_up = ~np.isnan(streaming_sars)
+            assert np.array_equal(batch_sars[set_up, c], streaming_sars[set_up])
+            assert np.array_equal(batch_reversals[:, c], streaming_reversals)
+            computed = SAR(af, max_af).compute(highs[:, c], lows[:, c])
+            assert np.array_equal(computed[set_up], streaming_sars[set_up])
+    print("sar_series and SAR.compute match SAR.adjust bit for bit.")
+
+    # 10 million bars: one long series and 1000 markets of 10000 bars.
+    highs = 100 + np.cumsum(random.randn(10000000))
+    lows = highs - random.rand(10000000)
+    started = time.time()
+    sar_series(highs, lows)
+    print("1 market x 10M bars: " + str(round(time.time() - started, 2)) + "s")
+
+    started = time.time()
+    sar_series(highs.reshape(10000, 1000), lows.reshape(10000, 1000))
+    print("1000 markets x 10k bars: " + str(round(time.time() - started, 2)) + "s")
+
+    streaming = SAR()
+    started = time.time()
+    for h, l in zip(highs[:1000000].tolist(), lows[:1000000].tolist()):
+        streaming.adjust(h, l)
+    print("SAR.adjust(), 1M bars: " + str(round(time.time() - started, 2)) + "s")
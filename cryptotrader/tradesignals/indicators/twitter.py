@@ -4,13 +4,47 @@ Monitors a Twitter account and returns any tweets made to the callback.
 '''
 
 from json import loads
-from Queue import Empty, Queue
+from Queue import Queue
 from threading import Thread, Event
-import tweepy
-from tweepy import Stream, StreamListener
-
-# The maximum time in seconds that a worker will wait for a new task on the queue.
-QUEUE_TIMEOUT_S = 1
+from cryptotrader.lazy_import import LazyModule
+from cryptotrader.helper_methods import monotonic
+from cryptotrader.latency import recorder
+
+# tweepy is only imported once a stream is started.
+tweepy = LazyModule("tweepy")
+
+# Put on the queue to wake the worker thread up so it stops.
+_STOP = object()
+
+# How long a tweet takes from arriving on the stream to reaching the callback
+# is recorded in cryptotrader.latency.recorder under this exchange, endpoint and stage.
+LATENCY_SOURCE = "twitter"
+LATENCY_ENDPOINT = "stream"
+RECEIVE_TO_CALLBACK = "receive_to_callback"
+
+_USER_OBJECT = '"user":{'
+_ID_STR = '"id_str":"'
+
+def author_id_str(data):
+    """
+    Finds the id_str of the tweet's author without decoding the tweet.
+    The author is the first "user" object in a tweet, the id_str fields before it
+    belong to the tweet itself.
+
+    Returns: The author's id_str, or None if data does not look like a tweet.
+    """
+
+    user = data.find(_USER_OBJECT)
+    if user == -1:
+        return None
+    start = data.find(_ID_STR, user + len(_USER_OBJECT))
+    if start == -1:
+        return None
+    start += len(_ID_STR)
+    end = data.find('"', start)
+    if end == -1:
+        return None
+    return data[start:end]
 
 # The number of retries to attempt when an error occurs.
 API_RETRY_COUNT = 60
@@ -21,8 +55,11 @@ API_RETRY_DELAY_S = 1
 # The HTTP status codes for which to retry.
 API_RETRY_ERRORS = [400, 401, 500, 502, 503, 504]
                 
-class TwitterListener(StreamListener):
-    """A listener class for handling streaming Twitter data."""
+class TwitterListener(object):
+    """
+    A listener class for handling streaming Twitter data.
+    Streams are given a subclass that also inherits tweepy's StreamListener, see stream_listener_class().
+    """
 
     def __init__(self, user_id, callback):
         self.user_id = user_id
@@ -52,23 +89,26 @@ class TwitterListener(StreamListener):
         # Stop the worker thread
         print("Stopping worker thread.")
         self.stop_event.set()
+        self.queue.put(_STOP)
         self.worker.join()
 
     def process_queue(self):
         """Continuously processes tasks on the queue."""
 
-        while not self.stop_event.is_set():
+        while True:
+            # Blocks until a tweet arrives so the worker wakes up as soon as it does.
+            task = self.queue.get()
             try:
-                data = self.queue.get(block=True, timeout=QUEUE_TIMEOUT_S)
-                self.handle_data(data)
-                self.queue.task_done()
-            except Empty:
-                # Timed out on an empty queue.
-                continue
-            except Exception, e:
+                if task is _STOP:
+                    break
+                received, data = task
+                self.handle_data(data, received)
+            except Exception as e:
                 # The main loop doesn't catch and report exceptions from
                 # background threads, so do that here.
                 print(e)
+            finally:
+                self.queue.task_done()
         print("Stopped worker thread.")
 
     def on_error(self, status):
@@ -86,17 +126,26 @@ class TwitterListener(StreamListener):
     def on_data(self, data):
         """Puts a task to process the new data on the queue."""
 
+        received = monotonic()
+
         # Stop streaming if requested.
         if self.stop_event.is_set():
             return False
 
+        # Most of the stream is other users replying to or retweeting the user being
+        # tracked. Drop those before they are decoded or queued.
+        author = author_id_str(data)
+        if author is not None and author != self.user_id:
+            return True
+
         # Put the task on the queue and keep streaming.
-        self.queue.put(data)
+        self.queue.put((received, data))
         return True
 
-    def handle_data(self, data):
+    def handle_data(self, data, received=None):
         """
         Sanity-checks and extracts the data before sending it to the callback.
+        received is the monotonic() time the data arrived on the stream.
         """
 
         try:
@@ -118,11 +167,22 @@ class TwitterListener(StreamListener):
                        (screen_name, user_id_str))
             return
 
-        print("Examining tweet: %s" % tweet)
+        if received is not None:
+            recorder.record(LATENCY_SOURCE, LATENCY_ENDPOINT, RECEIVE_TO_CALLBACK, monotonic() - received)
 
         # Call the callback.
         self.callback(tweet["text"])
         
+_stream_listener_class = None
+
+def stream_listener_class():
+    """Returns: TwitterListener combined with tweepy's StreamListener. Imports tweepy."""
+
+    global _stream_listener_class
+    if _stream_listener_class is None:
+        _stream_listener_class = type("TwitterStreamListener", (TwitterListener, tweepy.StreamListener), {})
+    return _stream_listener_class
+        
 class Twitter:
     def __init__(self, consumer_key, consumer_secret, access_token, access_secret):
         self._auth = tweepy.OAuthHandler(consumer_key, consumer_secret)
@@ -135,8 +195,8 @@ class Twitter:
         Starts streaming tweets and returning data to the callback.
         """
 
-        self.twitter_listener = TwitterListener(user_id, callback=callback)
-        twitter_stream = Stream(self._auth, self.twitter_listener)
+        self.twitter_listener = stream_listener_class()(user_id, callback=callback)
+        twitter_stream = tweepy.Stream(self._auth, self.twitter_listener)
 
         print("Starting Twitter stream for account: %s" % user_id)
         twitter_stream.filter(follow=[user_id])
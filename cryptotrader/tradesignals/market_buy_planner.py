@@ -0,0 +1,95 @@
+'''
+Plans a limit order that acts like a market buy.
+
+The exchange sets aside quantity * limit price when a limit buy is placed, so a
+higher limit reaches further into the asks but buys less with the same budget.
+plan_market_buy() looks at every ask price as a limit in one vectorized pass and
+picks the lowest limit that fills the whole budget immediately, or the limit
+that fills the most when the asks are too thin.
+
+@author: Tobias Carryer
+'''
+
+from collections import namedtuple
+from decimal import Decimal
+from cryptotrader.tradesignals.indicators.depth import DepthBook, ASKS, np
+
+# quantity is what to order at limit_price. filled_quantity is how much of it the asks
+# fill right away at average_price for cost. The rest waits on the book at limit_price.
+MarketBuyPlan = namedtuple("MarketBuyPlan", ["limit_price", "quantity", "filled_quantity",
+                                             "average_price", "cost", "child_orders"])
+
+# One of the limit orders a plan is split into.
+ChildOrder = namedtuple("ChildOrder", ["limit_price", "quantity"])
+
+def _decimal(value):
+    return Decimal(repr(float(value)))
+
+def plan_market_buy(asks, budget, trading_fee=Decimal(0), max_price=None, overbid=Decimal(0),
+                    child_orders=1, price_key="Price", volume_key="Volume", limit_at_max_price=False):
+    '''
+    asks is the ask side of an order book in any order. Each entry has the price at
+        price_key and the amount being sold at volume_key, e.g. [{"Price": .., "Volume": ..}]
+        or [[price, amount], ..] with price_key=0 and volume_key=1.
+    budget is how much of the minor currency can be spent.
+    trading_fee is taken out of the budget before working out the quantity.
+    max_price is the highest limit price allowed. No limit if None.
+    overbid is added to the limit price so the order still fills if the asks move up a little.
+    child_orders splits the plan into that many limit orders so each only sets aside
+        what its own part of the asks costs.
+    limit_at_max_price places the order at max_price instead of the lowest limit that fills,
+        buying less but leaving room for asks that move up before the order arrives.
+
+    Returns: A MarketBuyPlan, or None if no ask is at or below max_price.
+    '''
+
+    side = DepthBook.from_entries([], asks, price_key, volume_key).side(ASKS)
+    limits = side.prices + float(overbid)
+    if max_price is not None:
+        limits = limits[limits <= float(max_price)]
+    if len(limits) == 0:
+        return None
+
+    spendable = float(budget) * (1 - float(trading_fee))
+    affordable = spendable / limits
+    available = side.cumulative_quantities[:len(limits)]
+
+    # The first limit that can fill everything it can afford. Past it, a higher limit
+    # only shrinks the quantity. Before it, the asks run out.
+    fills_everything = np.nonzero(available >= affordable)[0]
+    if limit_at_max_price and max_price is not None:
+        level = len(limits) - 1
+        limit_price = float(max_price)
+    elif len(fills_everything):
+        level = int(fills_everything[0])
+        limit_price = limits[level]
+    else:
+        # The asks within max_price are not deep enough. Place the order at max_price so
+        # what is not filled right away has the most room to fill.
+        level = len(limits) - 1
+        limit_price = float(max_price) if max_price is not None else limits[level]
+
+    quantity = spendable / limit_price
+    filled_quantity = min(quantity, float(available[level]))
+    cost = float(side.values_to_fill(np.array([filled_quantity]))[0])
+    average_price = cost / filled_quantity if filled_quantity > 0 else limit_price
+
+    return MarketBuyPlan(_decimal(limit_price), _decimal(quantity), _decimal(filled_quantity),
+                         _decimal(average_price), _decimal(cost),
+                         _split(side, limits, limit_price, quantity, child_orders))
+
+def _split(side, limits, limit_price, quantity, child_orders):
+    '''
+    Returns: child_orders ChildOrder of equal quantity. Each is priced at the ask that fills
+             the asks up to the end of its part, so the cheaper parts set aside less.
+    '''
+
+    if child_orders <= 1:
+        return [ChildOrder(_decimal(limit_price), _decimal(quantity))]
+
+    part = quantity / child_orders
+    part_ends = part * np.arange(1, child_orders + 1)
+    levels = np.searchsorted(side.cumulative_quantities[:len(limits)], part_ends, side="left")
+    prices = np.where(levels < len(limits), limits[np.minimum(levels, len(limits) - 1)], limit_price)
+    prices = np.minimum(prices, limit_price)
+    return [ChildOrder(_decimal(price), _decimal(part)) for price in prices]
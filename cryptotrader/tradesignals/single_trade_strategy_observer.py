@@ -19,6 +19,8 @@ class SingleTradeStrategyObserver(StrategyObserver):
         '''
         ticker_to_remove is the portion of the ticker to remove to get the major currency
         '''
+        self.trader.mark_signal()
+        
         # Have just enough to buy. Assumes the trader determines how much to buy
         # by calculating self.balance / market_value
 
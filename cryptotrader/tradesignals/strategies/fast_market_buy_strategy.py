@@ -7,6 +7,7 @@ It prioritizes speed over emulating a true market order.
 from cryptotrader.tradesignals.strategies import Strategy
 from decimal import Decimal
 from cryptotrader.helper_methods import quantity_adjusted_for_decimals
+from cryptotrader.tradesignals.market_buy_planner import plan_market_buy
 from time import sleep
 
 class FastMarketBuyTool(Strategy):
@@ -25,7 +26,7 @@ class FastMarketBuyTool(Strategy):
         Strategy.__init__(self)
         self.get_asks = get_asks
         self.balance_to_spend = balance_to_spend
-        self.post_fee = Decimal(1) - trading_fee
+        self.trading_fee = trading_fee
         self.price_key = price_key
         self.volume_key = volume_key
         self.ticker_format = ticker_format
@@ -46,15 +47,30 @@ class FastMarketBuyTool(Strategy):
                 market_ticker = self.ticker_format.replace("REPLACE", coin)
                 asks = self.get_asks(market_ticker)
                 lowest_ask = Decimal(asks[0][self.price_key])
-                target_ask = lowest_ask * self.max_price_dif
-                target_ask = quantity_adjusted_for_decimals(target_ask)
-                amount_to_buy = (self.balance_to_spend / target_ask) * self.post_fee
-                amount_to_buy = quantity_adjusted_for_decimals(amount_to_buy)
+                # The limit is max_price_dif times the lowest ask so the buy still fills
+                # while a pump moves the asks up.
+                plan = plan_market_buy(asks, self.balance_to_spend, trading_fee=self.trading_fee,
+                                       max_price=quantity_adjusted_for_decimals(lowest_ask * self.max_price_dif),
+                                       price_key=self.price_key, volume_key=self.volume_key,
+                                       limit_at_max_price=True)
+                target_ask = quantity_adjusted_for_decimals(plan.limit_price)
+                amount_to_buy = quantity_adjusted_for_decimals(plan.quantity)
                 self.notify_observers(True, target_ask, market=market_ticker, amount_to_buy=amount_to_buy)
+                self.report_plan(plan, lowest_ask)
                 sleep(5)
                 profit_ask = quantity_adjusted_for_decimals((lowest_ask+target_ask)/2 * self.target_profit)
                 self.notify_observers(False, profit_ask, market=market_ticker)
                 retry = False
-            except TypeError:
+            except (TypeError, Warning):
                 print("Invalid coin ticker.")
-        
\ No newline at end of file
+
+    def report_plan(self, plan, lowest_ask):
+        '''
+        Prints what the buy should cost given the asks it was placed against, and its slippage:
+        how much higher the average price is than the lowest ask.
+        Called after the order is sent so it does not slow the buy down.
+        '''
+        if plan.filled_quantity < plan.quantity:
+            print("Only " + str(plan.filled_quantity) + " is asked at or below " + str(plan.limit_price) + ". The buy will not fill completely.")
+        slippage = (plan.average_price / lowest_ask - 1) * 100
+        print("Expected average price: " + str(plan.average_price) + " (" + str(round(slippage, 2)) + "% above the lowest ask)")
@@ -5,11 +5,14 @@ Fetch trading signals from investing.com
 '''
 
 import requests
-from bs4 import BeautifulSoup
+from cryptotrader.lazy_import import LazyModule
 from decimal import Decimal
 from cryptotrader.tradesignals.strategies import Strategy
 from cryptotrader.bittrex.bittrex_options import bittrex_btc_undercut
 
+# BeautifulSoup is only imported once a website is parsed.
+bs4 = LazyModule("bs4")
+
 class InvestingDotComStrategy(Strategy):
     
     def __init__(self, market_url, undercut=bittrex_btc_undercut):
@@ -34,7 +37,7 @@ class InvestingDotComStrategy(Strategy):
             self.notify_observers(signal, -1)
             
     def get_trading_signal_from(self, website_html):
-        soup = BeautifulSoup(website_html, "lxml")
+        soup = bs4.BeautifulSoup(website_html, "lxml")
         
         # Get the table that summarize the trading signals.
         table = soup.find('table', {'class':'technicalSummaryTbl'})
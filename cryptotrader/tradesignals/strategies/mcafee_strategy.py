@@ -7,6 +7,7 @@ import re
 from cryptotrader.tradesignals.strategies import Strategy
 from decimal import Decimal
 from cryptotrader.helper_methods import quantity_adjusted_for_decimals
+from cryptotrader.tradesignals.market_buy_planner import plan_market_buy
 
 # The user ID as fetched from http://gettwitterid.com
 MCAFEE_USER_ID = "961445378"
@@ -29,7 +30,7 @@ class McAfeeStrategy(Strategy):
         self.twitter = twitter
         self.get_asks = get_asks
         self.balance_to_spend = balance_to_spend
-        self.post_fee = Decimal(1) - trading_fee
+        self.trading_fee = trading_fee
         self.price_key = price_key
         self.volume_key = volume_key
         self.ticker_format = ticker_format
@@ -48,34 +49,25 @@ class McAfeeStrategy(Strategy):
             coin = re.search("\((\w{1,4})\)", tweet_text).group(1)
             market_ticker = self.ticker_format.replace("REPLACE", coin)
             asks = self.get_asks(market_ticker)
-            highest_ask = Decimal(0)
-            amount_to_buy = Decimal(0)
-            for ask in asks:
-                # Slightly over bid no matter what since the market will be moving fast
-                price = Decimal(ask[self.price_key]) + Decimal(0.00000001)
-                amount_being_sold = Decimal(ask[self.volume_key])
-                spendable = price * amount_being_sold
-                
-                if price > highest_ask:
-                    highest_ask = price
-                
-                if spendable > self.balance_to_spend:
-                    amount_to_buy += self.balance_to_spend / (price+Decimal(0.00000001))
-                    break
-                else:
-                    self.balance_to_spend -= spendable
-                    amount_to_buy += amount_being_sold
-            amount_to_buy = quantity_adjusted_for_decimals(amount_to_buy)
-            highest_ask = quantity_adjusted_for_decimals(highest_ask)
-                
+            # Slightly over bid no matter what since the market will be moving fast
+            plan = plan_market_buy(asks, self.balance_to_spend, trading_fee=self.trading_fee,
+                                   overbid=Decimal("0.00000001"), price_key=self.price_key,
+                                   volume_key=self.volume_key)
+            if plan is None:
+                print("Nothing is being sold on " + market_ticker)
+                return
+            limit_price = quantity_adjusted_for_decimals(plan.limit_price)
+            amount_to_buy = quantity_adjusted_for_decimals(plan.quantity)
+
             # Buy the coin McAfee tweeted out,
             # wait a minute for the order to fill,
             # then place a sell order.
-            #self.notify_observers(True, highest_ask, market=market_ticker, amount_to_buy=amount_to_buy)
+            #self.notify_observers(True, limit_price, market=market_ticker, amount_to_buy=amount_to_buy)
             print("McAfee tweeted: %s" % tweet_text)
+            print("Expected to fill " + str(plan.filled_quantity) + " at an average of " + str(plan.average_price) + ".")
             #sleep(60)
             self.observers[0].trader.assets = Decimal(99.76764706)
-            target_ask = quantity_adjusted_for_decimals(highest_ask * self.target_profit)
+            target_ask = quantity_adjusted_for_decimals(limit_price * self.target_profit)
             self.notify_observers(False, target_ask, market=market_ticker)
         else:
             print("Skipping tweet by McAfee: %s" % tweet_text)
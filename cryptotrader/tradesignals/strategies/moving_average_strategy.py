@@ -6,6 +6,7 @@ This strategy notifies observers when short and long term MAs cross.
 
 from cryptotrader.tradesignals.strategies import Strategy
 from cryptotrader.tradesignals.indicators import EMA
+from cryptotrader.latency import tick_trace
 
 class MovingAverageStrategy(Strategy):
     
@@ -17,14 +18,16 @@ class MovingAverageStrategy(Strategy):
         short_term_length and long_term_length are measured in days.
         
         data_points_per_minute is how many times adjust() is expected to be called in a minute.
+        When the strategy is fed bars (see on_bar) it is how many bars there are in a minute,
+        e.g. 1 for one minute bars or 1/60.0 for hourly bars.
         '''
         
         Strategy.__init__(self)
         
         print("Created MovingAverageStrategy.")
         
-        self.long_term_trend = EMA(short_term_ema, 24*short_term_length*data_points_per_minute)
-        self.short_term_trend = EMA(long_term_ema, 24*long_term_length*data_points_per_minute)
+        self.long_term_trend = EMA(long_term_ema, 24*long_term_length*data_points_per_minute)
+        self.short_term_trend = EMA(short_term_ema, 24*short_term_length*data_points_per_minute)
         self.long_is_above_short = None
 
     def adjust(self, value):
@@ -35,6 +38,8 @@ class MovingAverageStrategy(Strategy):
         
         This strategy is known as the double crossover method.
         '''
+        
+        tick_trace.tracer.mark(tick_trace.STRATEGY)
  
         self.long_term_trend.add_data_point(value)
         self.short_term_trend.add_data_point(value)
@@ -52,3 +57,26 @@ class MovingAverageStrategy(Strategy):
             elif not self.long_is_above_short and long_ma > short_ma:
                 self.notify_observers(False, value)
                 self.long_is_above_short = True
+                
+    def warm_up(self, candles):
+        '''
+        candles has a numpy array of closes, e.g. cryptotrader.bittrex.candle_loader.Candles
+        Post: Both moving averages start from the first close and include every candle instead of
+              starting from the EMAs passed to the constructor. Observers are not notified of
+              crossovers in the candles.
+        '''
+        
+        if len(candles.closes) == 0:
+            return
+        for trend in (self.long_term_trend, self.short_term_trend):
+            trend.reset(float(candles.closes[0]))
+            trend.compute(candles.closes[1:])
+        self.long_is_above_short = self.long_term_trend.get() > self.short_term_trend.get()
+        
+    def on_bar(self, bar):
+        '''
+        Post: adjust() is called with the bar's close. Subscribing this to a
+              cryptotrader.tradesignals.bars.TimeBarBuilder makes the moving averages
+              cover the same amount of time no matter how often the pipeline polls.
+        '''
+        self.adjust(bar.close)
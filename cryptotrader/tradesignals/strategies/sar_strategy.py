@@ -7,6 +7,8 @@ directions and the ADX says the new trend is strong.
 
 from cryptotrader.tradesignals.strategies import Strategy
 from cryptotrader.tradesignals.indicators import SAR
+from cryptotrader.tradesignals.bars import TickBarBuilder
+from cryptotrader.latency import tick_trace
 
 class SarStrategy(Strategy):
     
@@ -15,12 +17,8 @@ class SarStrategy(Strategy):
         
         self._sar = SAR(acceleration_factor, max_acceleration_factor)
         
-        self.reset_vars_to_process_pipeline()
-
-    def reset_vars_to_process_pipeline(self):
-        self.high = 0
-        self.low = float("inf")
-        self.data_points_in_period = 0
+        # Groups the values passed to process_pipeline_data()
+        self._tick_bars = None
 
     def process_pipeline_data(self, value, data_points_per_period=60):
         '''
@@ -28,18 +26,26 @@ class SarStrategy(Strategy):
         and low to pass to adjust()
         
         Post: adjust() is called after process_pipeline_data() is called data_points_per_period times
+        
+        To use periods of time instead, subscribe on_bar to a cryptotrader.tradesignals.bars.TimeBarBuilder
         '''
         
-        if value > self.high:
-            self.high = value
-        if value < self.low:
-            self.low = value
+        tick_trace.tracer.mark(tick_trace.STRATEGY)
+        
+        if self._tick_bars is None or self._tick_bars.ticks != data_points_per_period:
+            self._tick_bars = TickBarBuilder(data_points_per_period, self.on_bar)
+        self._tick_bars.add(value)
         
-        self.data_points_in_period += 1
+    def warm_up(self, candles):
+        '''
+        candles has numpy arrays of highs and lows, e.g. cryptotrader.bittrex.candle_loader.Candles
+        Post: The SAR includes every candle. Observers are not notified of trend changes in the candles.
+        '''
+        self._sar.compute(candles.highs, candles.lows)
         
-        if self.data_points_in_period >= data_points_per_period:
-            self.adjust(self.high, self.low, value)
-            self.reset_vars_to_process_pipeline()
+    def on_bar(self, bar):
+        ''' Post: adjust() is called with the bar's high, low and close. '''
+        self.adjust(bar.high, bar.low, bar.close)
 
     def adjust(self, high, low, close):
         #Keep assistant indicator updated
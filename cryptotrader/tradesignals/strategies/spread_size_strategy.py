@@ -8,6 +8,7 @@ from decimal import Decimal, localcontext
 from cryptotrader.tradesignals.strategies import Strategy
 from cryptotrader.tradesignals.indicators import SpreadSize
 from cryptotrader import DefaultPosition
+from cryptotrader.latency import tick_trace
 
 class SpreadSizeStrategy(Strategy):
     
@@ -27,6 +28,8 @@ class SpreadSizeStrategy(Strategy):
         self.default_position = default_position
         self.current_position = default_position
         self._first_time_unprofitable = True #Prevents repeating the same message.
+        # How large the last spread was compared to the smallest profitable spread.
+        self.spread_to_threshold = None
         
         # undercut_market_by is used to make the strategy's order be the next one filled on the market.
         with localcontext() as context:
@@ -39,6 +42,8 @@ class SpreadSizeStrategy(Strategy):
              have the balance to buy with or the assets to sell.
         '''
         
+        tick_trace.tracer.mark(tick_trace.STRATEGY)
+        
         # Financial calculations need accurate decimals
         with localcontext() as context:
             context.prec = 8
@@ -47,6 +52,10 @@ class SpreadSizeStrategy(Strategy):
             # is already being used.
             highest_bid = Decimal(highest_bid)+self.undercut_market_by
             lowest_ask = Decimal(lowest_ask)-self.undercut_market_by
+            
+            threshold = self._spread_size_indicator.threshold(highest_bid)
+            if threshold > 0:
+                self.spread_to_threshold = float((lowest_ask - highest_bid) / threshold)
 
             if self._spread_size_indicator.is_profitable(highest_bid, lowest_ask):
                 
@@ -81,4 +90,12 @@ class SpreadSizeStrategy(Strategy):
                         self.notify_observers(None, highest_bid)
                     self.current_position = self.default_position
                 self._first_time_unprofitable = False
-            
\ No newline at end of file
+            
+
+    def is_near_profitable(self, within=0.2):
+        '''
+        Returns: True if the last spread was profitable or less than [within] (a fraction of the
+                 smallest profitable spread) away from it. Pipelines poll more often while it is.
+        '''
+        
+        return self.spread_to_threshold is not None and self.spread_to_threshold >= 1 - within
@@ -6,6 +6,7 @@ Enables observers to be notified when an action should take place.
 '''
 from cryptotrader.tradesignals.single_trade_strategy_observer import SingleTradeStrategyObserver
 from decimal import Decimal
+from cryptotrader.latency import tick_trace
 
 class Strategy(object):
     
@@ -23,6 +24,7 @@ class Strategy(object):
         self.observers.append(observer)
         
     def notify_observers(self, should_buy, market_value, market="LTC_BTC", amount_to_buy=Decimal(-1)):
+        tick_trace.tracer.mark(tick_trace.NOTIFIED)
         for observer in self.observers:
             if isinstance(observer, SingleTradeStrategyObserver):
                 observer.notify_significant_change(should_buy, market_value, market, amount_to_buy)
@@ -10,6 +10,7 @@ class StrategyObserver(object):
         self.trader = trader
     
     def notify_significant_change(self, should_buy, market_value):
+        self.trader.mark_signal()
         if should_buy == True:
             self.trader.buy(market_value)
         elif should_buy == False:
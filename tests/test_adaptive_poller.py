@@ -0,0 +1,105 @@
+'''
+Checks an AdaptivePoller's request budget and how it changes the interval of its jobs.
+
+Run with: python -m unittest discover tests
+
+@author: Tobias Carryer
+'''
+
+import unittest
+
+from cryptotrader import adaptive_poller
+from cryptotrader.adaptive_poller import AdaptivePoller
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class AdaptivePollerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self._monotonic = adaptive_poller.monotonic
+        adaptive_poller.monotonic = self.clock
+
+    def tearDown(self):
+        adaptive_poller.monotonic = self._monotonic
+
+    def test_burst_then_one_request_per_token(self):
+        poller = AdaptivePoller(requests_per_second=2, burst=3)
+        with poller._condition:
+            self.assertEqual([poller._take_token() for _ in range(3)], [0, 0, 0])
+            self.assertAlmostEqual(poller._take_token(), 0.5)
+
+            self.clock.now += 0.5
+            self.assertEqual(poller._take_token(), 0)
+
+            # The bucket holds no more than burst however long it was quiet.
+            self.clock.now += 60
+            self.assertEqual([poller._take_token() for _ in range(3)], [0, 0, 0])
+            self.assertGreater(poller._take_token(), 0)
+
+    def test_interval_shrinks_on_change_and_grows_without(self):
+        poller = AdaptivePoller(speed_up=0.5, slow_down=2, min_interval=1, max_interval=20)
+        fingerprints = iter([1, 1, 2, 3, 3, 3, 3, 3, 3])
+        job = poller.add(lambda: next(fingerprints), interval=8)
+
+        intervals = []
+        for _ in range(9):
+            poller.run_job(job)
+            intervals.append(job.interval)
+        # The first poll has nothing to compare with.
+        self.assertEqual(intervals, [16, 20, 10, 5, 10, 20, 20, 20, 20])
+        self.assertEqual(job.changes, 2)
+
+    def test_interval_stays_within_bounds(self):
+        poller = AdaptivePoller(speed_up=0.1, min_interval=2, max_interval=30)
+        values = iter(range(10))
+        job = poller.add(lambda: next(values), interval=100)
+        self.assertEqual(job.interval, 30)
+        for _ in range(5):
+            poller.run_job(job)
+        self.assertEqual(job.interval, 2)
+
+    def test_urgent_job_is_polled_at_min_interval(self):
+        poller = AdaptivePoller(min_interval=1, max_interval=60)
+        urgent = [False]
+        job = poller.add(lambda: 0, interval=10, is_urgent=lambda: urgent[0])
+        poller.run_job(job)
+        self.assertEqual(job.interval, 15)
+        urgent[0] = True
+        poller.run_job(job)
+        self.assertEqual(job.interval, 1)
+
+    def test_failing_poll_is_backed_off(self):
+        poller = AdaptivePoller(slow_down=2, max_interval=60)
+        def fail():
+            raise Warning("down")
+        job = poller.add(fail, interval=5)
+        poller.run_job(job)
+        self.assertEqual(job.interval, 10)
+        self.assertEqual(job.polls, 0)
+
+    def test_longest_waiting_due_job_goes_first(self):
+        poller = AdaptivePoller(requests_per_second=1, burst=1)
+        first = poller.add(lambda: 0, name="first")
+        self.clock.now += 1
+        second = poller.add(lambda: 0, name="second")
+        self.assertIs(poller._next_job(), first)
+        self.clock.now += 1
+        self.assertIs(poller._next_job(), second)
+
+    def test_removed_job_is_not_polled(self):
+        poller = AdaptivePoller()
+        removed = poller.add(lambda: 0, name="removed")
+        kept = poller.add(lambda: 0, name="kept")
+        poller.remove(removed)
+        self.assertEqual(len(poller), 1)
+        self.assertIs(poller._next_job(), kept)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+'''
+Checks that a BinanceStream starts local books from a snapshot and the diffs buffered
+while it was fetched, and starts over when a diff is missed.
+
+Run with: python -m unittest discover tests
+
+@author: Tobias Carryer
+'''
+
+import unittest
+
+from cryptotrader.binance import binance_stream
+from cryptotrader.binance.binance_stream import BinanceStream, LocalDepth
+
+def diff(first, last, bids=(), asks=()):
+    return {"U": first, "u": last, "b": [list(level) for level in bids], "a": [list(level) for level in asks]}
+
+class LocalDepthTest(unittest.TestCase):
+
+    def setUp(self):
+        self.book = LocalDepth("ETHBTC")
+        self.book.apply_snapshot({"lastUpdateId": 10, "bids": [["1.0", "2"]], "asks": [["1.1", "3"]]})
+
+    def test_diffs_already_in_the_snapshot_are_skipped(self):
+        self.assertTrue(self.book.apply_diff(diff(5, 10, bids=[("1.0", "9")])))
+        self.assertEqual(self.book.bids, {1.0: 2.0})
+
+    def test_diff_overlapping_the_snapshot_is_applied(self):
+        self.assertTrue(self.book.apply_diff(diff(9, 11, bids=[("1.0", "0"), ("0.9", "4")])))
+        self.assertEqual(self.book.top_bids(), [(0.9, 4.0)])
+        self.assertEqual(self.book.last_update_id, 11)
+
+    def test_missed_diff_is_reported(self):
+        self.assertFalse(self.book.apply_diff(diff(12, 13, asks=[("1.2", "1")])))
+        self.assertEqual(self.book.asks, {1.1: 3.0})
+
+class BinanceStreamSyncTest(unittest.TestCase):
+
+    def setUp(self):
+        self.snapshots = []
+        self._get_depth_snapshot = binance_stream.get_depth_snapshot
+        binance_stream.get_depth_snapshot = lambda symbol: self.snapshots.pop(0)
+        self.started = []
+        self.stream = BinanceStream(on_depth=lambda symbol, book: None)
+        # Fetch snapshots when the test says so instead of on a thread.
+        self.stream._buffer = self.buffer
+        self.stream.subscribe("ETHBTC", book_ticker=False, depth=True)
+
+    def tearDown(self):
+        binance_stream.get_depth_snapshot = self._get_depth_snapshot
+
+    def buffer(self, symbol, diff):
+        pending = self.stream._pending_diffs.get(symbol)
+        if pending is not None:
+            pending.append(diff)
+        else:
+            self.stream._pending_diffs[symbol] = [diff]
+            self.started.append(symbol)
+
+    def test_book_starts_from_snapshot_and_buffered_diffs(self):
+        self.stream._on_diff("ETHBTC", diff(8, 9, bids=[("1.0", "5")]))
+        self.stream._on_diff("ETHBTC", diff(10, 12, bids=[("0.9", "1")]))
+        self.assertEqual(self.started, ["ETHBTC"])
+
+        self.snapshots.append({"lastUpdateId": 10, "bids": [["1.0", "2"]], "asks": []})
+        self.stream._sync("ETHBTC")
+
+        book = self.stream.books["ETHBTC"]
+        self.assertTrue(book.is_synced())
+        self.assertEqual(book.top_bids(), [(1.0, 2.0), (0.9, 1.0)])
+        self.assertEqual(book.last_update_id, 12)
+
+        self.stream._on_diff("ETHBTC", diff(13, 13, asks=[("1.1", "1")]))
+        self.assertEqual(book.top_asks(), [(1.1, 1.0)])
+
+    def test_snapshot_older_than_the_buffered_diffs_is_fetched_again(self):
+        self.stream._on_diff("ETHBTC", diff(20, 21))
+        self.snapshots.append({"lastUpdateId": 10, "bids": [], "asks": []})
+        self.stream._sync("ETHBTC")
+        self.assertFalse(self.stream.books["ETHBTC"].is_synced())
+        self.assertEqual(self.started, ["ETHBTC", "ETHBTC"])
+
+        self.snapshots.append({"lastUpdateId": 20, "bids": [], "asks": []})
+        self.stream._sync("ETHBTC")
+        self.assertEqual(self.stream.books["ETHBTC"].last_update_id, 21)
+
+    def test_missed_diff_starts_the_book_over(self):
+        self.stream._on_diff("ETHBTC", diff(11, 11))
+        self.snapshots.append({"lastUpdateId": 10, "bids": [], "asks": []})
+        self.stream._sync("ETHBTC")
+        self.assertTrue(self.stream.books["ETHBTC"].is_synced())
+
+        self.stream._on_diff("ETHBTC", diff(15, 16))
+        self.assertEqual(self.stream.resyncs, 1)
+        self.assertFalse(self.stream.books["ETHBTC"].is_synced())
+        self.assertEqual(self.started, ["ETHBTC", "ETHBTC"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,156 @@
+'''
+Checks that a BitfinexClient keeps routing messages after its websocket is replaced.
+
+Run with: python -m unittest discover tests
+
+@author: Tobias Carryer
+'''
+
+import itertools
+import json
+import threading
+import time
+import unittest
+from Queue import Queue, Empty
+
+from cryptotrader.streaming import managed_websocket
+from cryptotrader.bitfinex.bitfinex_client import BitfinexClient
+
+class FakeBitfinex(object):
+    '''
+    Stands in for a websocket to Bitfinex's v2 API. Sends a ticker update every 10ms, and a
+    trade every 10ms with IDs counting up from 0 at FakeBitfinex.started. The book has one
+    bid, which moves up a price every 10ms. Every other connection sends the trades and
+    book 100ms late.
+    '''
+
+    chan_ids = itertools.count(1)
+    connections = itertools.count()
+    started = None
+
+    def __init__(self, url, **options):
+        self.messages = Queue()
+        self.closed = threading.Event()
+        self.lag = 0.1 if next(FakeBitfinex.connections) % 2 else 0
+        self.messages.put({"event": "info", "version": 2})
+
+    def send(self, payload):
+        request = json.loads(payload)
+        if request.get("event") == "subscribe":
+            # Every connection numbers its channels on its own.
+            chan_id = next(FakeBitfinex.chan_ids)
+            self.messages.put({"event": "subscribed", "channel": request["channel"],
+                               "chanId": chan_id, "symbol": request["symbol"]})
+            tick = {"trades": self._trade, "book": self._book}.get(request["channel"], self._tick)
+            thread = threading.Thread(target=tick, args=(chan_id,))
+            thread.daemon = True
+            thread.start()
+
+    def _tick(self, chan_id):
+        while not self.closed.is_set():
+            self.messages.put([chan_id, [1, 1, 2, 1, 0, 0, 1.5, 10, 2, 1]])
+            time.sleep(0.01)
+
+    def _trade(self, chan_id):
+        # The snapshot is the last 30 trades, most recent first.
+        trade_id = int((time.time() - FakeBitfinex.started - self.lag) / 0.01)
+        self.messages.put([chan_id, [[i, 0, 1, 1] for i in range(trade_id, max(trade_id - 30, -1), -1)]])
+        while not self.closed.is_set():
+            trade_id += 1
+            delay = FakeBitfinex.started + trade_id * 0.01 + self.lag - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            self.messages.put([chan_id, "te", [trade_id, 0, 1, 1]])
+
+    def _book(self, chan_id):
+        price = int((time.time() - FakeBitfinex.started - self.lag) / 0.01)
+        self.messages.put([chan_id, [[price, 1, 1]]])
+        while not self.closed.is_set():
+            price += 1
+            delay = FakeBitfinex.started + price * 0.01 + self.lag - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            self.messages.put([chan_id, [price - 1, 0, 1]])
+            self.messages.put([chan_id, [price, 1, 1]])
+
+    def recv_raw(self):
+        while not self.closed.is_set():
+            try:
+                return json.dumps(self.messages.get(timeout=0.05))
+            except Empty:
+                pass
+        raise Exception("closed")
+
+    def ping(self, payload=""):
+        pass
+
+    def abort(self):
+        self.closed.set()
+
+    def shutdown(self):
+        self.closed.set()
+
+class BitfinexClientRotationTest(unittest.TestCase):
+
+    def setUp(self):
+        self._create_connection = managed_websocket.create_connection
+        managed_websocket.create_connection = FakeBitfinex
+        FakeBitfinex.started = time.time()
+
+    def tearDown(self):
+        managed_websocket.create_connection = self._create_connection
+
+    def test_tickers_keep_arriving_after_rotations(self):
+        tickers = []
+        client = BitfinexClient(on_ticker=lambda symbol, ticker: tickers.append(ticker), rotate_after=1)
+        client.ws.overlap = 0.2
+        client.subscribe_ticker("tETHBTC")
+        client.start()
+        try:
+            deadline = time.time() + 10
+            while client.ws.rotations < 2 and time.time() < deadline:
+                time.sleep(0.1)
+            self.assertGreaterEqual(client.ws.rotations, 2)
+
+            received = len(tickers)
+            time.sleep(0.5)
+            self.assertGreater(len(tickers), received)
+        finally:
+            client.stop()
+
+    def test_trades_are_delivered_once_without_gaps_across_rotations(self):
+        trade_ids = []
+        client = BitfinexClient(on_trade=lambda symbol, trade: trade_ids.append(trade[0]), rotate_after=1)
+        client.ws.overlap = 0.2
+        client.subscribe_trades("tETHBTC")
+        client.start()
+        try:
+            deadline = time.time() + 10
+            while client.ws.rotations < 3 and time.time() < deadline:
+                time.sleep(0.1)
+            self.assertGreaterEqual(client.ws.rotations, 3)
+        finally:
+            client.stop()
+
+        self.assertEqual(trade_ids, list(range(trade_ids[0], trade_ids[0] + len(trade_ids))))
+
+    def test_book_is_replaced_by_the_new_connections_snapshot(self):
+        client = BitfinexClient(verify_checksums=False, rotate_after=1)
+        client.ws.overlap = 0.2
+        client.subscribe_book("tETHBTC")
+        client.start()
+        try:
+            deadline = time.time() + 10
+            while client.ws.rotations < 3 and time.time() < deadline:
+                time.sleep(0.1)
+            self.assertGreaterEqual(client.ws.rotations, 3)
+            time.sleep(0.3)
+        finally:
+            client.stop()
+
+        # A level the old connection had that the new one removed before taking over stays
+        # in the book unless the new snapshot replaces it.
+        self.assertEqual(len(client.books["tETHBTC"].bids), 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+'''
+Checks that a ConditionalFetcher only parses what changed, and that a pipeline reading
+through one still reports every change to the top of the book.
+
+Run with: python -m unittest discover tests
+
+@author: Tobias Carryer
+'''
+
+import json
+import unittest
+
+from cryptotrader.conditional_fetch import ConditionalFetcher
+from cryptotrader.cryptopia.cryptopia_pipeline import CryptopiaPipeline
+
+class FakeResponse(object):
+
+    def __init__(self, status_code, content=None, headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise Exception(str(self.status_code))
+
+class FakeServer(object):
+    '''
+    Stands in for a requests.Session. Answers with self.body, and with 304 Not Modified when
+    etags is True and the client sends the body's ETag.
+    '''
+
+    def __init__(self, body, etags=True):
+        self.body = body
+        self.etags = etags
+        self.sent_headers = []
+
+    def get(self, url, params=None, headers=None):
+        self.sent_headers.append(headers)
+        if not self.etags:
+            return FakeResponse(200, self.body)
+        etag = '"' + str(hash(self.body)) + '"'
+        if headers.get("If-None-Match") == etag:
+            return FakeResponse(304)
+        return FakeResponse(200, self.body, {"ETag": etag})
+
+class ConditionalFetcherTest(unittest.TestCase):
+
+    def test_not_modified_returns_the_last_data(self):
+        server = FakeServer('{"price": 1}')
+        fetcher = ConditionalFetcher("https://example.com", session=server)
+
+        self.assertEqual(fetcher.fetch(), ({"price": 1}, True))
+        self.assertEqual(fetcher.fetch(), ({"price": 1}, False))
+        self.assertEqual(server.sent_headers[1]["If-None-Match"], '"' + str(hash(server.body)) + '"')
+        self.assertEqual(fetcher.counters(), {"requests": 2, "not_modified": 1, "unchanged": 0, "parsed": 1})
+
+    def test_unchanged_body_is_not_parsed_again(self):
+        server = FakeServer('{"price": 1}', etags=False)
+        fetcher = ConditionalFetcher("https://example.com", session=server)
+
+        fetcher.fetch()
+        self.assertEqual(fetcher.fetch(), ({"price": 1}, False))
+        server.body = '{"price": 2}'
+        self.assertEqual(fetcher.fetch(), ({"price": 2}, True))
+        self.assertEqual(fetcher.counters(), {"requests": 3, "not_modified": 0, "unchanged": 1, "parsed": 2})
+
+class PipelineFetchTest(unittest.TestCase):
+
+    def book(self, bid, ask):
+        return json.dumps({"Success": True, "Data": {"Buy": [{"Price": bid, "Volume": 1}],
+                                                     "Sell": [{"Price": ask, "Volume": 1}]}})
+
+    def test_change_seen_by_get_order_book_is_still_dispatched(self):
+        updates = []
+        pipeline = CryptopiaPipeline(lambda bids, asks: updates.append((bids[0]["Price"], asks[0]["Price"])),
+                                     "ETH_BTC")
+        server = FakeServer(self.book(1, 2))
+        pipeline.fetcher.session = server
+
+        pipeline._poll()
+        server.body = self.book(1.5, 2)
+        pipeline.get_order_book()
+        pipeline._poll()
+        pipeline._poll()
+
+        self.assertEqual(updates, [(1, 2), (1.5, 2)])
+        self.assertEqual(pipeline.suppressed_updates, 1)
+
+if __name__ == "__main__":
+    unittest.main()
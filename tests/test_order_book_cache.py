@@ -0,0 +1,83 @@
+'''
+Checks when an OrderBookCache answers from memory and when it fetches a book.
+
+Run with: python -m unittest discover tests
+
+@author: Tobias Carryer
+'''
+
+import time
+import unittest
+
+from cryptotrader.cryptopia.order_book_cache import OrderBookCache, API_URL
+
+class FakeResponse(object):
+
+    def __init__(self, data):
+        self.data = data
+
+    def json(self):
+        return {"Success": True, "Message": None, "Data": self.data}
+
+class FakeCryptopia(object):
+    ''' Stands in for the requests.Session of a cache. Every book has one ask at 1. '''
+
+    def __init__(self):
+        self.paths = []
+
+    def get(self, url):
+        path = url[len(API_URL):]
+        self.paths.append(path)
+        if path.startswith("GetMarkets/"):
+            return FakeResponse([{"Label": "ETH/BTC"}, {"Label": "GRC/BTC"}])
+        if path.startswith("GetMarketOrderGroups/"):
+            markets = path.split("/")[1].split("-")
+            return FakeResponse([{"Market": market, "Buy": [], "Sell": [{"Price": 1, "Volume": 1}]}
+                                 for market in markets])
+        return FakeResponse({"Buy": [], "Sell": [{"Price": 1, "Volume": 1}]})
+
+class OrderBookCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cryptopia = FakeCryptopia()
+        self.cache = OrderBookCache("BTC")
+        self.cache._session = lambda: self.cryptopia
+
+    def fetches(self):
+        return [path for path in self.cryptopia.paths if path.startswith("GetMarketOrders/")]
+
+    def test_refreshed_books_are_read_from_memory(self):
+        self.cache.load_markets()
+        self.cache.refresh(self.cache.markets)
+        self.assertEqual(self.cache.markets, ["ETH_BTC", "GRC_BTC"])
+
+        self.assertEqual(self.cache.get_asks("GRC_BTC"), [{"Price": 1, "Volume": 1}])
+        self.assertEqual(self.fetches(), [])
+
+    def test_market_is_not_case_sensitive(self):
+        self.cache.refresh(["GRC_BTC"])
+        # McAfeeStrategy lowercases the tweet it finds the coin in.
+        self.cache.get_asks("grc_BTC")
+        self.assertEqual(self.fetches(), [])
+
+    def test_missing_book_is_fetched(self):
+        self.cache.get_asks("ETH_BTC")
+        self.assertEqual(self.fetches(), ["GetMarketOrders/ETH_BTC/100"])
+        self.cache.get_asks("ETH_BTC")
+        self.assertEqual(len(self.fetches()), 1)
+
+    def test_asks_older_than_order_max_age_are_fetched(self):
+        self.cache.refresh(["ETH_BTC"])
+        self.cache._fetched["ETH_BTC"] = time.time() - self.cache.order_max_age - 1
+
+        # Still fresh enough for the book but not to price an order from.
+        self.cache.get_order_book("ETH_BTC")
+        self.assertEqual(self.fetches(), [])
+        self.cache.get_asks("ETH_BTC")
+        self.assertEqual(len(self.fetches()), 1)
+
+    def test_books_are_refreshed_before_they_are_too_old_to_price_from(self):
+        self.assertLess(self.cache.refresh_interval, self.cache.order_max_age)
+
+if __name__ == "__main__":
+    unittest.main()